@@ -1,73 +1,308 @@
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from dotenv import load_dotenv
 
-# Import functions from our modules
-from .pdf_processor import process_pdfs_in_directory
-from .weaviate_handler import (
-    connect_to_weaviate, 
-    get_or_create_collection, 
-    ingest_data,
-    retrieve_chunks
-)
-from .gemini_handler import configure_gemini, generate_answer
+# Import functions from our modules. The serving path must not load the ingestion
+# stack (PyMuPDF, Camelot/OpenCV, pandas), so sync() imports incremental_sync itself.
+from .weaviate_handler import DEFAULT_RETRIEVAL
+from .retrieval_backends import open_backend
+from .gemini_handler import generate_answer, stream_answer
+from .generation_scheduler import GenerationOverloaded
+from .context_builder import build_context
+from .conversation import reusable_chunks
+from .retrieval_cache import RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL, RetrievalCache
+from .reranker import RERANK_CANDIDATES, rerank
+from .runtime import get_runtime
+from .observability import span
+
+logger = logging.getLogger(__name__)
+
+
+# --- Configuration ---
+# Ingestion is no longer done per query; call sync() to pick up new or changed PDFs
+# (from incremental_sync.PDF_DIRECTORY unless another folder is given).
 
+# a query naming several collections searches them at once on this pool
+_FANOUT_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_FANOUT_WORKERS", "8")), thread_name_prefix="fanout")
 
-def query(user_query : str):
+# search results reused until the collection changes (see retrieval_cache); None when disabled
+RETRIEVAL_CACHE = RetrievalCache(RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL) if RETRIEVAL_CACHE_SIZE > 0 else None
+
+
+def retrieval_settings(overrides=None):
     """
-    Main function to orchestrate the PDF ingestion and RAG workflow.
+    DEFAULT_RETRIEVAL with the given per-request overrides (mode, limit, alpha, fusion,
+    score_cutoff, collections) applied. collections is None for the runtime's default.
     """
-    load_dotenv()
+    settings = {**DEFAULT_RETRIEVAL, "collections": None}
+    settings.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    return settings
 
-    # --- Configuration ---
-    # Set to True to delete the existing Weaviate collection and re-ingest all PDFs.
-    # Set to False to use the existing data and just ask questions.
-    PERFORM_INGESTION = False
-    PDF_DIRECTORY = r"/Users/sharvajvidyutgmail.com/projects/VITC_ChatBot_frontend/Backend/data" # The folder containing your PDF files
-    
-    # --- API and DB Setup ---
-    if not configure_gemini():
-        return # Exit if Gemini config fails
-    client = connect_to_weaviate()
-    if not client:
-        return # Exit if Weaviate connection fails
 
-    try:
-        collection_name = "VIT_docs"
-        # Get or create the collection, deleting it first if PERFORM_INGESTION is True
-        documents_collection = get_or_create_collection(
-            client, 
-            collection_name, 
-            fresh_start=PERFORM_INGESTION
-        )
-        if documents_collection is None:
-            return 
-
-        # --- Data Ingestion Step ---
-        if PERFORM_INGESTION:
-            # Process all PDFs in the specified directory
-            data_to_ingest = process_pdfs_in_directory(PDF_DIRECTORY)
-            # Ingest the processed data into Weaviate
-            ingest_data(documents_collection, data_to_ingest)
+def dedupe_chunks(context_chunks):
+    """Drops chunks whose text was already retrieved (e.g. the same table found on two pages), keeping rank order."""
+    unique = []
+    seen = set()
+    for chunk in context_chunks:
+        if chunk["text_chunk"] not in seen:
+            seen.add(chunk["text_chunk"])
+            unique.append(chunk)
+    return unique
+
+
+def query(user_query : str, runtime=None, retrieval=None):
+    """
+    Main function for the RAG workflow. Connections come from the shared runtime,
+    so a request only pays for retrieval and generation.
+    retrieval overrides DEFAULT_RETRIEVAL for this query (see retrieval_settings).
+    """
+    runtime = runtime or get_runtime()
 
+    try:
         # --- RAG (Retrieval-Augmented Generation) Workflow ---
-        print("\n--- Ready to answer questions ---")
-        
-        # Example Query
-        print(f"\nUser Query: '{user_query}'")
-
-        # 1. Retrieve relevant context from Weaviate
-        retrieved_chunks = retrieve_chunks(documents_collection, user_query, limit=5)
-        
+        logger.info("Answering query", extra={"query": user_query})
+
+        # 1. Retrieve relevant context from Weaviate (or the local index)
+        retrieved_chunks = retrieve_context(user_query, runtime, retrieval)
+
         # 2. Generate an answer using Gemini with the retrieved context
-        final_answer = generate_answer(retrieved_chunks, user_query)
-        
-        return final_answer
+        return answer_from_chunks(user_query, retrieved_chunks, runtime)
+    except GenerationOverloaded:
+        # not a failure of ours: the caller should tell the client to come back later
+        raise
     except Exception as e:
-        print(f"❌ An unexpected error occurred in the main workflow: {e}")
+        logger.exception(f"An unexpected error occurred in the main workflow: {e}")
+        # the shared client may have dropped; have the next request re-check it
+        runtime.mark_unhealthy()
 
+
+def retrieve_context(user_query : str, runtime=None, retrieval=None):
+    """
+    Retrieves the chunks for user_query as dicts of their properties (text_chunk,
+    source_file, page_number, ...) plus uuid, score and the collection they came
+    from, without duplicates. If retrieval names several collections they are
+    searched concurrently and the results merged (see search_collections).
+    With a reranker, RERANK_CANDIDATES chunks are retrieved and only those it
+    finds relevant are returned, at most limit of them (see reranker.rerank).
+    """
+    runtime = runtime or get_runtime()
+    settings = retrieval_settings(retrieval)
+    collections = settings.pop("collections") or [None]
+    top_k = settings["limit"]
+    if runtime.reranker is not None:
+        settings["limit"] = max(top_k, RERANK_CANDIDATES)
+    try:
+        if len(collections) > 1:
+            with span("retrieve"):
+                chunks = search_collections(user_query, collections, runtime, settings)
+        else:
+            with span("connect"):
+                backend = runtime.get_backend(collections[0])
+            with span("retrieve"):
+                chunks = dedupe_chunks(_search(backend, user_query, settings))
+    except ValueError:
+        # an unknown collection, not a connection problem
+        raise
+    except Exception:
+        runtime.mark_unhealthy()
+        raise
+
+    if runtime.reranker is None:
+        return chunks
+    with span("rerank"):
+        return rerank(user_query, chunks, runtime.reranker, top_k)
+
+
+def _search(backend, user_query, settings):
+    def search():
+        return [{**chunk, "collection": backend.name}
+                for chunk in backend.retrieve(user_query, with_metadata=True, **settings)]
+
+    if RETRIEVAL_CACHE is None:
+        return search()
+    return RETRIEVAL_CACHE.fetch(backend, user_query, settings, search)
+
+
+def search_collections(user_query : str, collections, runtime, settings):
+    """
+    Runs the same search on every collection at once and merges the results by
+    score, keeping the top settings["limit"] without duplicates. Scores are
+    comparable across collections in vector mode (cosine similarity) and roughly
+    so with BM25; with relative_score fusion each collection's best hit scores 1,
+    so their top results interleave. Each search runs in a copy of the caller's
+    context, so the request id follows it onto the pool.
+    """
+    def search(collection_name):
+        return _search(runtime.get_backend(collection_name), user_query, settings)
+
+    futures = [_FANOUT_EXECUTOR.submit(contextvars.copy_context().run, search, name) for name in collections]
+    merged = [chunk for future in futures for chunk in future.result()]
+    # chunks without a score rank last
+    merged.sort(key=lambda chunk: (chunk["score"] is None, -(chunk["score"] or 0.0)))
+    return dedupe_chunks(merged)[:settings["limit"]]
+
+
+def warm_retrieval_cache(queries, runtime=None):
+    """
+    Retrieves the chunks for each query with the default settings, so plain requests
+    asking them are served from the retrieval cache. Returns the number warmed.
+    """
+    if RETRIEVAL_CACHE is None or not queries:
+        return 0
+    runtime = runtime or get_runtime()
+    start = time.perf_counter()
+    for user_query in queries:
+        retrieve_context(user_query, runtime)
+    logger.info(f"Warmed the retrieval cache with {len(queries)} question(s) in {time.perf_counter() - start:.2f}s.")
+    return len(queries)
+
+
+def retrieve_followup_context(user_query : str, previous_chunks, runtime=None, retrieval=None):
+    """
+    retrieve_context for a turn of a conversation. Chunks retrieved for earlier
+    turns that are still relevant are reused (see conversation.reusable_chunks):
+    if they cover the query, nothing is retrieved at all; otherwise only the
+    remaining top_k slots are fetched and the reused chunks rank after them.
+    Returns (chunks, reused), reused being the number of chunks carried over.
+    """
+    runtime = runtime or get_runtime()
+    settings = retrieval_settings(retrieval)
+    # chunks of collections this turn doesn't search are not reused either
+    searched = settings["collections"] or [runtime.collection_name]
+    previous_chunks = [
+        chunk for chunk in previous_chunks or [] if chunk.get("collection", runtime.collection_name) in searched
+    ]
+    reused, covered = reusable_chunks(user_query, previous_chunks)
+    if covered:
+        reused = reused[:settings["limit"]]
+        logger.info(f"Answering follow-up from {len(reused)} earlier chunk(s) without retrieval.",
+                    extra={"reused_chunks": len(reused)})
+        return reused, len(reused)
+
+    # overlap shares and retrieval scores aren't comparable; fresh results come first
+    reused = [{**chunk, "score": None} for chunk in reused[:settings["limit"] - 1]]
+    remaining = {**(retrieval or {}), "limit": settings["limit"] - len(reused)}
+    chunks = dedupe_chunks(retrieve_context(user_query, runtime, remaining) + reused)
+    if reused:
+        logger.info(f"Reusing {len(reused)} earlier chunk(s); retrieved top {remaining['limit']}.",
+                    extra={"reused_chunks": len(reused)})
+    return chunks, len(reused)
+
+
+def answer_from_chunks(user_query : str, context_chunks, runtime=None):
+    """
+    Generates the answer for chunks from retrieve_context(), within the context token
+    budget. Returns {"answer", "sources"}, with sources built from the metadata of the
+    chunks the model cited (or an error dict with "error": True).
+    Raises GenerationOverloaded when Gemini is at capacity (see generation_scheduler).
+    """
+    runtime = runtime or get_runtime()
+    with span("context"):
+        context = build_context(context_chunks)
+    with span("generate"):
+        result = generate_answer(context["texts"], user_query, model=runtime.model)
+    if result.get("error"):
+        return {"answer": result["answer"], "sources": [], "error": True}
+    return {"answer": result["answer"], "sources": sources_from_chunks(context["chunks"], result["cited"])}
+
+
+def stream_query(user_query : str, context_chunks, runtime=None):
+    """
+    Returns a generator for chunks from retrieve_context() that yields answer text
+    deltas (str) and finally the complete {"answer", "sources"} dict.
+    """
+    runtime = runtime or get_runtime()
+    with span("context"):
+        context = build_context(context_chunks)
+
+    def events():
+        with span("generate"):
+            for item in stream_answer(context["texts"], user_query, model=runtime.model):
+                if isinstance(item, dict):
+                    yield {"answer": item["answer"], "sources": sources_from_chunks(context["chunks"], item["cited"])}
+                else:
+                    yield item
+    return events()
+
+
+def sources_from_chunks(context_chunks, cited=None):
+    """
+    Builds the response's source list from retrieval metadata, one entry per file
+    and page in rank order: {"source_file", "page_number", "score", "collection",
+    "chunk_type", "chunk_ids"}. chunk_type is "table" if any of the page's chunks is
+    one; chunk_ids are their ids in the chunk store, for opening the cited text.
+    cited holds 1-based positions into context_chunks; when given, only those chunks
+    count (numbers out of range are ignored, and if none remain every chunk counts).
+    """
+    if cited:
+        picked = [context_chunks[n - 1] for n in sorted(set(cited)) if 1 <= n <= len(context_chunks)]
+        context_chunks = picked or context_chunks
+
+    sources = {}
+    for chunk in context_chunks:
+        source_file = chunk.get("source_file")
+        if not source_file:
+            continue
+        key = (source_file, chunk.get("page_number"))
+        score = chunk.get("score")
+        if key not in sources:
+            sources[key] = {"source_file": source_file, "page_number": chunk.get("page_number"), "score": score,
+                            "collection": chunk.get("collection"), "chunk_type": chunk.get("chunk_type"),
+                            "chunk_ids": []}
+        elif score is not None and (sources[key]["score"] is None or score > sources[key]["score"]):
+            sources[key]["score"] = score
+        if chunk.get("chunk_type") == "table":
+            sources[key]["chunk_type"] = "table"
+        # objects ingested before the chunk store existed have no id
+        if chunk.get("chunk_id") is not None and chunk["chunk_id"] not in sources[key]["chunk_ids"]:
+            sources[key]["chunk_ids"].append(chunk["chunk_id"])
+    return list(sources.values())
+
+
+def sync(pdf_directory=None, workers=1, manifest_path=None, collection_name="VIT_docs", fresh_start=False,
+         batch_size=None, chunking=None, backend=None, index_path=None):
+    """
+    Incrementally syncs the PDFs in pdf_directory (default: incremental_sync.PDF_DIRECTORY)
+    into the collection: only new or changed files are parsed and re-vectorized, and
+    the collection is never emptied.
+    Opens its own connection, so it can run outside the API process.
+    With workers > 1 (or None for one per CPU) PDFs are parsed on a process pool.
+    backend is "weaviate" or "local" (default: RETRIEVAL_BACKEND).
+    The collection's chunk store (see chunk_store.py) is updated along with it.
+    """
+    from .incremental_sync import PDF_DIRECTORY, sync_directory, default_manifest_path
+    from .chunk_store import open_chunk_store
+
+    load_dotenv()
+    pdf_directory = pdf_directory or PDF_DIRECTORY
+    documents_backend = open_backend(backend, collection_name, fresh_start=fresh_start, index_path=index_path)
+    if documents_backend is None:
+        return # Exit if Weaviate connection fails
+
+    chunk_store = open_chunk_store(collection_name, documents_backend.kind)
+    try:
+        manifest_path = manifest_path or default_manifest_path(pdf_directory, collection_name, documents_backend.kind)
+        if fresh_start and os.path.exists(manifest_path):
+            # the manifest describes objects that no longer exist
+            os.remove(manifest_path)
+        if fresh_start and chunk_store is not None:
+            chunk_store.reset()
+        return sync_directory(documents_backend, pdf_directory, manifest_path, workers=workers,
+                              batch_size=batch_size, chunking=chunking, chunk_store=chunk_store)
     finally:
         # Always close the connection
-        if client and client.is_connected():
-            client.close()
-            print("\nConnection to Weaviate closed.")
+        documents_backend.close()
+        if chunk_store is not None:
+            chunk_store.close()
 
 
+def ingest(pdf_directory=None, workers=1, collection_name="VIT_docs", backend=None):
+    """
+    Deletes the existing collection and re-ingests all PDFs.
+    Only needed when the collection schema changes; use sync() for content updates.
+    """
+    return sync(pdf_directory, workers=workers, collection_name=collection_name, fresh_start=True, backend=backend)
@@ -0,0 +1,283 @@
+"""
+Local chunk store: every ingested chunk's text and citation metadata on disk,
+addressed by a small integer chunk id that the backend objects carry. The API
+reads a chunk by id from memory-mapped files, without a round trip to Weaviate,
+and ingestion answers "is this chunk already stored?" and "which chunks does this
+file have?" from an in-memory map instead of querying the collection.
+
+Files, for store name N in directory path:
+  N.chunks   append-only UTF-8 chunk texts, back to back
+  N.idx      8-byte header, then one fixed-size record per chunk id (see RECORD):
+             text offset and length, file number, page, char span, flags, content hash
+  N.files    source file names, one JSON string per line; line n is file number n
+Chunks are only ever appended; deleting one sets a flag in its record, so ids and
+offsets never change. Readers map the files and check the index with one stat()
+per read, remapping them when it has grown, changed or been replaced (reset), so
+a reader in another process sees new and deleted chunks on its next read.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+# directory of the chunk stores, one per collection and backend ("off" disables them)
+CHUNK_STORE_PATH = os.getenv("CHUNK_STORE_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chunk_store"
+)
+
+MAGIC = b"VCHUNKS1"
+# offset, length, file number, page (-1 = none), char_start, char_end (-1 = none), flags, first 16 bytes of sha256
+RECORD = struct.Struct("<QIIiiiB3x16s")
+FLAG_TABLE = 1
+FLAG_DELETED = 2
+
+
+def content_hash(text):
+    """sha256 hex digest of a chunk's text, as incremental_sync.chunk_hash computes it."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ChunkStore:
+    """
+    One chunk store (see the module docstring). Only one process should write to a
+    store at a time; any number may read it. readonly stores never create files.
+    """
+
+    def __init__(self, path, name, readonly=False):
+        self.path = path
+        self.name = name
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._files = []
+        self._file_numbers = {}
+        self._index_map = self._text_map = None
+        self._mapped_records = 0
+        self._mapped_stat = None
+        # writer only: (file number, hash) -> chunk id of live chunks, and file number -> those ids
+        self._by_hash = {}
+        self._by_file = {}
+
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+            self._open_for_writing()
+
+    @property
+    def exists(self):
+        return os.path.exists(self._path("idx"))
+
+    def __len__(self):
+        """Number of live chunks (writers) or of chunk ids handed out (readers)."""
+        with self._lock:
+            if not self.readonly:
+                return sum(len(ids) for ids in self._by_file.values())
+            self._remap()
+            return self._mapped_records
+
+    def add(self, source_file, data_objects, hashes=None):
+        """
+        Stores the chunks of source_file and returns their chunk ids in order. A chunk
+        whose text is already stored for that file keeps its id instead of being
+        written again. hashes, if given, are the chunks' content_hash values.
+        """
+        hashes = hashes or [content_hash(obj["text_chunk"]) for obj in data_objects]
+        with self._lock:
+            file_number = self._file_number(source_file)
+            ids = []
+            for obj, hash_ in zip(data_objects, hashes):
+                key = (file_number, hash_[:32])
+                chunk_id = self._by_hash.get(key)
+                if chunk_id is None:
+                    chunk_id = self._append(file_number, obj, hash_)
+                    self._by_hash[key] = chunk_id
+                    self._by_file.setdefault(file_number, set()).add(chunk_id)
+                ids.append(chunk_id)
+            self._index.flush()
+            return ids
+
+    def ids_for_source(self, source_file):
+        """Ids of the live chunks of source_file."""
+        with self._lock:
+            return sorted(self._by_file.get(self._file_numbers.get(source_file), ()))
+
+    def delete_source(self, source_file, keep_ids=None):
+        """Deletes the chunks of source_file except those in keep_ids; returns how many were deleted."""
+        keep = set(keep_ids or ())
+        with self._lock:
+            file_number = self._file_numbers.get(source_file)
+            doomed = [chunk_id for chunk_id in self._by_file.get(file_number, ()) if chunk_id not in keep]
+            for chunk_id in doomed:
+                self._index.seek(len(MAGIC) + chunk_id * RECORD.size)
+                record = RECORD.unpack(self._index.read(RECORD.size))
+                self._index.seek(len(MAGIC) + chunk_id * RECORD.size)
+                self._index.write(RECORD.pack(*record[:6], record[6] | FLAG_DELETED, record[7]))
+                self._by_hash.pop((file_number, record[7].hex()), None)
+                self._by_file[file_number].discard(chunk_id)
+            self._index.flush()
+        if doomed:
+            logger.info(f"Chunk store '{self.name}': deleted {len(doomed)} chunk(s) of '{source_file}'.")
+        return len(doomed)
+
+    def get(self, chunk_id):
+        """The chunk as a dict (chunk_id, text_chunk, source_file, page_number, chunk_type, char_start, char_end), or None."""
+        return self.get_many([chunk_id])[0]
+
+    def get_many(self, chunk_ids):
+        """get() for several ids at once; unknown and deleted ids give None."""
+        with self._lock:
+            self._remap()
+            return [self._read(chunk_id) for chunk_id in chunk_ids]
+
+    def reset(self):
+        """Deletes every chunk and starts the store over, e.g. before a full re-ingest."""
+        with self._lock:
+            self._close_files()
+            for kind in ("idx", "chunks", "files"):
+                if os.path.exists(self._path(kind)):
+                    os.remove(self._path(kind))
+            self._files, self._file_numbers, self._by_hash, self._by_file = [], {}, {}, {}
+            self._open_for_writing()
+
+    def close(self):
+        with self._lock:
+            self._close_files()
+
+    def _path(self, kind):
+        return os.path.join(self.path, f"{self.name}.{kind}")
+
+    def _open_for_writing(self):
+        if not os.path.exists(self._path("idx")):
+            with open(self._path("idx"), "wb") as f:
+                f.write(MAGIC)
+        self._index = open(self._path("idx"), "r+b")
+        self._text = open(self._path("chunks"), "ab")
+        self._names = open(self._path("files"), "a", encoding="utf-8")
+        self._load_files()
+
+        header = self._index.read(len(MAGIC))
+        if header != MAGIC:
+            raise ValueError(f"'{self._path('idx')}' is not a chunk store index.")
+        # a record cut short by a crash is dropped; its text is simply never referenced
+        size = os.fstat(self._index.fileno()).st_size
+        records = (size - len(MAGIC)) // RECORD.size
+        self._index.truncate(len(MAGIC) + records * RECORD.size)
+        for chunk_id in range(records):
+            _, _, file_number, _, _, _, flags, digest = RECORD.unpack(self._index.read(RECORD.size))
+            if not flags & FLAG_DELETED:
+                self._by_hash[(file_number, digest.hex())] = chunk_id
+                self._by_file.setdefault(file_number, set()).add(chunk_id)
+        self._records = records
+
+    def _append(self, file_number, obj, hash_):
+        data = obj["text_chunk"].encode("utf-8")
+        offset = self._text.seek(0, os.SEEK_END)
+        self._text.write(data)
+        # the text must be on disk before a reader can find the record pointing at it
+        self._text.flush()
+        page = obj.get("page_number")
+        record = RECORD.pack(
+            offset, len(data), file_number,
+            -1 if page is None else page, obj.get("char_start", -1), obj.get("char_end", -1),
+            FLAG_TABLE if obj.get("chunk_type") == "table" else 0, bytes.fromhex(hash_)[:16],
+        )
+        self._index.seek(0, os.SEEK_END)
+        self._index.write(record)
+        self._records += 1
+        return self._records - 1
+
+    def _file_number(self, source_file):
+        if source_file not in self._file_numbers:
+            self._names.write(json.dumps(source_file) + "\n")
+            self._names.flush()
+            self._file_numbers[source_file] = len(self._files)
+            self._files.append(source_file)
+        return self._file_numbers[source_file]
+
+    def _load_files(self):
+        try:
+            with open(self._path("files"), "r", encoding="utf-8") as f:
+                self._files = [json.loads(line) for line in f if line.endswith("\n")]
+        except FileNotFoundError:
+            self._files = []
+        self._file_numbers = {name: i for i, name in enumerate(self._files)}
+
+    def _remap(self):
+        """Maps the files again if they have changed, or been replaced by a reset(), since they were last mapped."""
+        try:
+            stat = os.stat(self._path("idx"))
+        except FileNotFoundError:
+            self._close_maps()
+            return
+        # a reset store can reuse the inode and grow back to the same size, but not at the same instant
+        if (stat.st_ino, stat.st_size, stat.st_mtime_ns) == self._mapped_stat:
+            return
+        self._close_maps()
+        records = (stat.st_size - len(MAGIC)) // RECORD.size
+        with open(self._path("idx"), "rb") as f:
+            self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._index_map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{self._path('idx')}' is not a chunk store index.")
+        if os.path.getsize(self._path("chunks")):
+            with open(self._path("chunks"), "rb") as f:
+                self._text_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped_records = records
+        self._mapped_stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        self._load_files()
+
+    def _read(self, chunk_id):
+        if self._index_map is None or not 0 <= chunk_id < self._mapped_records:
+            return None
+        offset, length, file_number, page, char_start, char_end, flags, _ = RECORD.unpack_from(
+            self._index_map, len(MAGIC) + chunk_id * RECORD.size
+        )
+        if flags & FLAG_DELETED:
+            return None
+        # an empty text file can't be mapped
+        text = str(memoryview(self._text_map)[offset:offset + length], "utf-8") if length else ""
+        chunk = {
+            "chunk_id": chunk_id,
+            "text_chunk": text,
+            "source_file": self._files[file_number],
+            "page_number": None if page < 0 else page,
+            "chunk_type": "table" if flags & FLAG_TABLE else "text",
+        }
+        if char_start >= 0:
+            chunk.update(char_start=char_start, char_end=char_end)
+        return chunk
+
+    def _close_maps(self):
+        for mapped in (self._index_map, self._text_map):
+            if mapped is not None:
+                mapped.close()
+        self._index_map = self._text_map = None
+        self._mapped_records = 0
+        self._mapped_stat = None
+
+    def _close_files(self):
+        self._close_maps()
+        if not self.readonly:
+            for f in (self._index, self._text, self._names):
+                f.close()
+
+
+def store_name(collection_name, backend_kind="weaviate"):
+    """Stores are per collection and backend, like the ingest manifests."""
+    return collection_name if backend_kind == "weaviate" else f"{backend_kind}.{collection_name}"
+
+
+def open_chunk_store(collection_name, backend_kind="weaviate", path=None, readonly=False):
+    """
+    The chunk store of collection_name in path (default: CHUNK_STORE_PATH), or None if
+    stores are off, or if readonly and nothing has been stored for the collection yet.
+    """
+    path = path or CHUNK_STORE_PATH
+    if path == "off":
+        return None
+    store = ChunkStore(path, store_name(collection_name, backend_kind), readonly=readonly)
+    if readonly and not store.exists:
+        return None
+    return store
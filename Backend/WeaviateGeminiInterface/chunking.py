@@ -0,0 +1,179 @@
+import math
+import os
+import re
+
+# Gemini averages roughly four characters of English text per token; exact counts
+# would need a tokenizer round trip per chunk, which is far too slow for ingestion
+CHARS_PER_TOKEN = 4
+
+STRATEGIES = ("page", "tokens", "sentences", "paragraphs", "headings")
+
+DEFAULT_CHUNKING = {
+    "strategy": os.getenv("CHUNK_STRATEGY", "paragraphs"),
+    "max_tokens": int(os.getenv("CHUNK_MAX_TOKENS", "300")),
+    "overlap_tokens": int(os.getenv("CHUNK_OVERLAP_TOKENS", "50")),
+}
+
+_WORD_RE = re.compile(r"\S+")
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;:])\s+(?=[\"'(\[]?[A-Z0-9•\-–])")
+# short lines that look like headings: numbered ("3.2 Attendance"), named ("Chapter IV",
+# "ANNEXURE - I") or all caps ("GENERAL RULES"); sentences ending in a period don't count
+_HEADING_RE = re.compile(
+    r"^[ \t]*(?:(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.)[ \t]+[A-Z][^\n.]{2,60}"
+    r"|(?i:chapter|section|annexure|appendix)\b[^\n.]{0,60}"
+    r"|[A-Z][A-Z0-9 ,&/()'\-]{3,60})[ \t]*$",
+    re.MULTILINE,
+)
+
+
+def estimate_tokens(text):
+    """Approximate Gemini token count of text."""
+    return math.ceil(len(text.strip()) / CHARS_PER_TOKEN)
+
+
+def _trim(text, start, end):
+    """Shrinks [start, end) so it does not begin or end with whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _split_at(text, start, end, boundaries):
+    """Splits [start, end) at the given boundary regex matches into trimmed, non-empty spans."""
+    spans = []
+    cursor = start
+    for match in boundaries.finditer(text, start, end):
+        spans.append(_trim(text, cursor, match.start()))
+        cursor = match.end()
+    spans.append(_trim(text, cursor, end))
+    return [span for span in spans if span[0] < span[1]]
+
+
+def _heading_spans(text, start, end):
+    """Splits [start, end) into sections that each begin at a heading line."""
+    spans = []
+    cursor = start
+    for match in _HEADING_RE.finditer(text, start, end):
+        if match.start() > cursor:
+            spans.append(_trim(text, cursor, match.start()))
+            cursor = match.start()
+    spans.append(_trim(text, cursor, end))
+    return [span for span in spans if span[0] < span[1]]
+
+
+def _token_windows(text, start, end, max_tokens, overlap_tokens):
+    """Fixed windows of about max_tokens over the words of [start, end), overlapping by overlap_tokens."""
+    words = [(m.start(), m.end()) for m in _WORD_RE.finditer(text, start, end)]
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+    spans = []
+    first = 0
+    while first < len(words):
+        last = first
+        while last + 1 < len(words) and words[last + 1][1] - words[first][0] <= max_chars:
+            last += 1
+        spans.append((words[first][0], words[last][1]))
+        if last == len(words) - 1:
+            break
+        # step back from the window's end until the overlap budget is used up
+        next_first = last + 1
+        while next_first - 1 > first and words[last][1] - words[next_first - 1][0] <= overlap_chars:
+            next_first -= 1
+        first = next_first
+    return spans
+
+
+def _pack(text, spans, max_tokens, overlap_tokens, split_large):
+    """
+    Greedily merges consecutive spans into chunks of at most max_tokens. The last
+    spans of a chunk (up to overlap_tokens) are repeated at the start of the next one.
+    Spans that are too large on their own are handed to split_large.
+    """
+    chunks = []
+    current = []
+    has_new = False
+
+    def flush():
+        if current and has_new:
+            chunks.append((current[0][0], current[-1][1]))
+
+    for span in spans:
+        if estimate_tokens(text[span[0]:span[1]]) > max_tokens:
+            flush()
+            chunks.extend(split_large(span))
+            current, has_new = [], False
+            continue
+
+        # measured on the merged text, separators included, so chunks never exceed max_tokens
+        if current and estimate_tokens(text[current[0][0]:span[1]]) > max_tokens:
+            flush()
+            kept = []
+            for previous in reversed(current):
+                if (estimate_tokens(text[previous[0]:current[-1][1]]) > overlap_tokens
+                        or estimate_tokens(text[previous[0]:span[1]]) > max_tokens):
+                    break
+                kept.insert(0, previous)
+            current = kept
+
+        current.append(span)
+        has_new = True
+
+    flush()
+    return chunks
+
+
+def chunk_spans(text, strategy="paragraphs", max_tokens=300, overlap_tokens=50):
+    """
+    Splits text into (char_start, char_end) spans according to strategy:
+      page        the whole text as one span (the old behaviour)
+      tokens      fixed windows of max_tokens, overlapping by overlap_tokens
+      sentences   sentences packed up to max_tokens, overlapping by whole sentences
+      paragraphs  paragraphs packed up to max_tokens; long paragraphs fall back to sentences
+      headings    sections starting at heading lines, packed up to max_tokens; long ones fall back to paragraphs
+    Anything still over max_tokens is cut into token windows.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy '{strategy}'. Choose from {', '.join(STRATEGIES)}.")
+    start, end = _trim(text, 0, len(text))
+    if start == end:
+        return []
+    if strategy == "page":
+        return [(start, end)]
+
+    def by_tokens(span):
+        return _token_windows(text, span[0], span[1], max_tokens, overlap_tokens)
+
+    def by_sentences(span):
+        return _pack(text, _split_at(text, span[0], span[1], _SENTENCE_END_RE), max_tokens, overlap_tokens, by_tokens)
+
+    def by_paragraphs(span):
+        return _pack(text, _split_at(text, span[0], span[1], _PARAGRAPH_BREAK_RE), max_tokens, overlap_tokens, by_sentences)
+
+    def by_headings(span):
+        # short sections are packed together; a section too long for one chunk is split by paragraphs
+        return _pack(text, _heading_spans(text, span[0], span[1]), max_tokens, overlap_tokens, by_paragraphs)
+
+    split = {"tokens": by_tokens, "sentences": by_sentences, "paragraphs": by_paragraphs, "headings": by_headings}
+    return split[strategy]((start, end))
+
+
+def chunk_page(text, page_number, source_file, strategy="paragraphs", max_tokens=300, overlap_tokens=50):
+    """
+    Chunks one page's text into data objects that record where each chunk came from:
+    text_chunk, source_file, page_number, chunk_type and the char_start/char_end
+    offsets of the chunk in the page's extracted text.
+    """
+    return [
+        {
+            "text_chunk": text[start:end],
+            "source_file": source_file,
+            "page_number": page_number,
+            "chunk_type": "text",
+            "char_start": start,
+            "char_end": end,
+        }
+        for start, end in chunk_spans(text, strategy, max_tokens, overlap_tokens)
+    ]
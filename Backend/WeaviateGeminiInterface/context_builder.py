@@ -0,0 +1,88 @@
+import logging
+import os
+
+from .chunking import CHARS_PER_TOKEN, estimate_tokens
+from .embeddings import tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_BUDGET = int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+# share of a chunk's words that must already be in a kept chunk for it to count as a duplicate
+DEFAULT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.85"))
+# a chunk that doesn't fit is only cut down if at least this many tokens of it would remain
+MIN_TRIMMED_TOKENS = 40
+
+
+def _overlap(words, other_words):
+    """Share of the smaller word set that also occurs in the other one."""
+    if not words or not other_words:
+        return 0.0
+    return len(words & other_words) / min(len(words), len(other_words))
+
+
+def _source_tag(number, chunk):
+    """"[n] file, page p" - the model cites passages by n."""
+    tag = f"[{number}] {chunk.get('source_file') or 'unknown source'}"
+    if chunk.get("page_number"):
+        tag += f", page {chunk['page_number']}"
+    if chunk.get("chunk_type") == "table":
+        tag += " (table)"
+    return tag
+
+
+def _cut(text, max_tokens):
+    """Cuts text to about max_tokens, at a word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip() + " ..."
+
+
+def build_context(context_chunks, max_tokens=None, duplicate_threshold=None):
+    """
+    Assembles retrieved chunks into prompt context:
+      1. orders them by score (retrieval order when there is no score)
+      2. drops chunks whose words are mostly already covered by a higher-ranked one,
+         e.g. a table that was also extracted as page text, or overlapping windows
+      3. fills max_tokens in that order, cutting the last chunk if enough room is left
+      4. prefixes each chunk with its passage number, source file and page
+    Returns {"texts": [...], "chunks": [...kept chunks...], "tokens_in", "tokens_out",
+    "duplicates", "trimmed"}; passage n is chunks[n - 1], and tokens are estimates.
+    """
+    max_tokens = DEFAULT_CONTEXT_BUDGET if max_tokens is None else max_tokens
+    duplicate_threshold = DEFAULT_DUPLICATE_THRESHOLD if duplicate_threshold is None else duplicate_threshold
+
+    ranked = sorted(context_chunks, key=lambda chunk: -(chunk.get("score") or 0.0)) \
+        if any(chunk.get("score") is not None for chunk in context_chunks) else list(context_chunks)
+
+    texts, kept, kept_words = [], [], []
+    tokens_in = sum(estimate_tokens(chunk["text_chunk"]) for chunk in context_chunks)
+    tokens_out = duplicates = trimmed = 0
+    for chunk in ranked:
+        words = set(tokenize(chunk["text_chunk"]))
+        if any(_overlap(words, other) >= duplicate_threshold for other in kept_words):
+            duplicates += 1
+            continue
+
+        tag = _source_tag(len(kept) + 1, chunk)
+        text = chunk["text_chunk"].strip()
+        room = max_tokens - tokens_out - estimate_tokens(tag) - 1  # the newline after the tag
+        if estimate_tokens(text) > room:
+            trimmed += 1
+            if room < MIN_TRIMMED_TOKENS:
+                continue
+            text = _cut(text, room)
+
+        entry = f"{tag}\n{text}"
+        texts.append(entry)
+        kept.append(chunk)
+        kept_words.append(words)
+        tokens_out += estimate_tokens(entry)
+
+    if context_chunks:
+        logger.info(f"Context: kept {len(kept)} of {len(context_chunks)} chunk(s), ~{tokens_out} tokens "
+                    f"(saved ~{max(tokens_in - tokens_out, 0)}: {duplicates} duplicate(s), {trimmed} trimmed or dropped for budget).",
+                    extra={"tokens_in": tokens_in, "tokens_out": tokens_out, "tokens_saved": max(tokens_in - tokens_out, 0)})
+    return {"texts": texts, "chunks": kept, "tokens_in": tokens_in, "tokens_out": tokens_out,
+            "duplicates": duplicates, "trimmed": trimmed}
@@ -0,0 +1,82 @@
+import os
+import re
+
+from .embeddings import tokenize
+
+# an earlier turn's chunk is reused when it contains at least this share of the new query's terms
+REUSE_MIN_OVERLAP = float(os.getenv("SESSION_REUSE_MIN_OVERLAP", "0.5"))
+# retrieval is skipped when the reused chunks together contain this share of the query's terms
+REUSE_SKIP_COVERAGE = float(os.getenv("SESSION_REUSE_SKIP_COVERAGE", "1.0"))
+
+_FOLLOW_UP_RE = re.compile(r"^\s*(?:and\s+)?(?:(?:what|how)\s+about|what\s+if|also|and)\b[\s,]*", re.IGNORECASE)
+# words that only make sense with an earlier turn; "this", "that" and "there" are left
+# out because standalone questions use them all the time ("is there a gym?")
+_REFERRING_WORDS = {"it", "its", "they", "them", "their", "those", "these", "he", "she", "his", "her", "same"}
+_WORD_RE = re.compile(r"[A-Za-z0-9']+")
+
+
+def is_follow_up(user_query):
+    """True for questions that lean on the previous turn: "what about ...?", "and ...", "what is its fee?", "timings?"."""
+    if _FOLLOW_UP_RE.match(user_query):
+        return True
+    words = {word.lower() for word in _WORD_RE.findall(user_query)}
+    return bool(words & _REFERRING_WORDS) or len(tokenize(user_query)) <= 1
+
+
+def rewrite_query(user_query, previous_query):
+    """
+    Turns a follow-up into a standalone question, using the previous turn's
+    (already standalone) question. No model call is made:
+      - if the follow-up's first word that is not a stopword repeats a word of the
+        previous question, the phrase from there on is swapped: "what about for hostel B?"
+        after "What are the mess timings for hostel A?" -> "What are the mess timings for hostel B?"
+      - otherwise the previous question's terms are carried along:
+        "what is its fee?" after "Is there a gym in block C?" -> "what is its fee (a gym block c)"
+    Questions that are not follow-ups are returned unchanged.
+    """
+    if not previous_query or not is_follow_up(user_query):
+        return user_query
+
+    rest = _FOLLOW_UP_RE.sub("", user_query, count=1).strip()
+    rest_words = rest.rstrip(" ?.!").split()
+    previous = previous_query.strip()
+    question_mark = "?" if previous.endswith("?") else ""
+    previous_words = previous.rstrip(" ?.!").split()
+    lowered = [word.lower().strip(",;:") for word in previous_words]
+
+    for i, word in enumerate(rest_words):
+        # stopwords ("for", "the") are too common to anchor the swap on
+        if not tokenize(word):
+            continue
+        if word.lower() not in lowered:
+            # the follow-up asks something of its own ("the timings for hostel B"); swapping
+            # would drop those words, so carry the previous terms along instead
+            break
+        j = lowered.index(word.lower())
+        swapped = previous_words[:j] + rest_words[i:] + previous_words[j + len(rest_words) - i:]
+        return " ".join(swapped) + question_mark
+
+    return f"{' '.join(rest_words) or user_query.strip()} ({' '.join(tokenize(previous_query))})"
+
+
+def reusable_chunks(user_query, previous_chunks):
+    """
+    Picks the chunks of earlier turns that are still relevant to user_query: those
+    containing at least REUSE_MIN_OVERLAP of its terms. Their retrieval scores
+    belonged to the earlier query, so each copy is scored by that share instead and
+    the list is ordered by it. Returns (chunks, covered), where covered is True if
+    together they contain REUSE_SKIP_COVERAGE of the terms, i.e. the follow-up can
+    be answered without retrieving again.
+    """
+    terms = set(tokenize(user_query))
+    if not terms or not previous_chunks:
+        return [], False
+
+    relevant, found = [], set()
+    for chunk in previous_chunks:
+        shared = terms & set(tokenize(chunk["text_chunk"]))
+        if len(shared) / len(terms) >= REUSE_MIN_OVERLAP:
+            relevant.append({**chunk, "score": len(shared) / len(terms)})
+            found |= shared
+    relevant.sort(key=lambda chunk: -chunk["score"])
+    return relevant, bool(relevant) and len(found) / len(terms) >= REUSE_SKIP_COVERAGE
@@ -0,0 +1,82 @@
+import logging
+import os
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# where each collection's corpus version is kept, so the API process sees changes made
+# by the ingest command ("off" keeps versions in this process only)
+CORPUS_VERSION_DIR = os.getenv("CORPUS_VERSION_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".corpus_versions"
+)
+
+# hooks that let caches in the serving process react to collection changes
+_LISTENERS = []
+# collection name -> version, for versions kept in this process
+_VERSIONS = {}
+_VERSIONS_LOCK = threading.Lock()
+
+
+def on_corpus_change(callback):
+    """Registers callback(collection_name) to run whenever a collection's contents change."""
+    _LISTENERS.append(callback)
+    return callback
+
+
+def notify_corpus_changed(collection_name):
+    """Called by the ingestion/deletion helpers after they modify a collection."""
+    _bump_version(collection_name)
+    notify_corpus_reloaded(collection_name)
+
+
+def notify_corpus_reloaded(collection_name):
+    """
+    Runs the listeners for a change that another process made and has already
+    recorded, e.g. when a local index is reloaded after the ingest command wrote
+    it. The corpus version is left alone, so each change bumps it exactly once.
+    """
+    for callback in list(_LISTENERS):
+        try:
+            callback(collection_name)
+        except Exception as e:
+            logger.error(f"Error in corpus change listener: {e}")
+
+
+def corpus_version(collection_name):
+    """
+    An opaque token that changes whenever collection_name's contents change, in this
+    process or (through CORPUS_VERSION_DIR) in another one on the same host. Results
+    tagged with it are stale once it differs. Costs one small file read (~10 us).
+    """
+    if CORPUS_VERSION_DIR == "off":
+        with _VERSIONS_LOCK:
+            return _VERSIONS.get(collection_name, "0")
+    try:
+        # the uuid each bump writes, not the file's inode and mtime: inodes are reused right
+        # after an unlink and mtimes can be coarse, so two bumps could look the same
+        with open(_version_path(collection_name), "rb") as f:
+            return f.read().decode("ascii") or "0"
+    except FileNotFoundError:
+        return "0"
+
+
+def _bump_version(collection_name):
+    version = uuid.uuid4().hex
+    if CORPUS_VERSION_DIR == "off":
+        with _VERSIONS_LOCK:
+            _VERSIONS[collection_name] = version
+        return
+    path = _version_path(collection_name)
+    try:
+        os.makedirs(CORPUS_VERSION_DIR, exist_ok=True)
+        tmp_path = f"{path}.{version}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error(f"Could not record the new corpus version of '{collection_name}': {e}")
+
+
+def _version_path(collection_name):
+    return os.path.join(CORPUS_VERSION_DIR, f"{collection_name}.version")
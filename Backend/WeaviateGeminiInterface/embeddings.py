@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+
+logger = logging.getLogger(__name__)
+
+# client-side embedding of chunks and queries (see get_embedder). Empty leaves
+# vectorization to Weaviate's text2vec_weaviate module; "hashing" is HashingEmbedder;
+# anything else names a sentence-transformers model run locally on the CPU.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "")
+# texts per model call
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# SQLite file of cached chunk embeddings; "off" disables the cache
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "embedding_cache.sqlite3"
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# common question words that carry no meaning for matching; single letters are kept
+# on purpose because they often name blocks and hostels ("hostel A" vs "hostel B")
+_STOPWORDS = {
+    "the", "is", "are", "was", "were", "what", "which", "who", "whom", "how", "when",
+    "where", "why", "do", "does", "did", "can", "could", "would", "should", "will",
+    "of", "in", "on", "at", "to", "for", "from", "by", "with", "about", "an", "and",
+    "or", "me", "my", "i", "you", "your", "please", "tell", "there", "this", "that",
+    "be", "it", "its", "any", "some",
+}
+
+
+def tokenize(text):
+    """Lowercases text and splits it into alphanumeric tokens without stopwords."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def cosine_similarity(a, b):
+    """Dot product of two L2-normalized vectors."""
+    return sum(x * y for x, y in zip(a, b))
+
+
+class HashingEmbedder:
+    """
+    Dependency-free text embedder based on feature hashing of word unigrams and
+    bigrams. It is cheap enough to run on every request and good enough to tell
+    rephrasings of the same short question apart from different questions.
+    """
+
+    model_id = "hashing-v1"
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def embed(self, text):
+        """Returns an L2-normalized vector of length dim."""
+        tokens = tokenize(text)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = [0.0] * self.dim
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[index] += sign
+
+        norm = math.sqrt(sum(x * x for x in vector))
+        if norm == 0:
+            return vector
+        return [x / norm for x in vector]
+
+    def embed_many(self, texts):
+        return [self.embed(text) for text in texts]
+
+
+class SentenceTransformerEmbedder:
+    """
+    A sentence-transformers model run locally on the CPU. Needs the optional
+    sentence-transformers package, which is only imported when this is created.
+    Vectors are L2-normalized.
+    """
+
+    def __init__(self, model_name, batch_size=EMBEDDING_BATCH_SIZE, device="cpu"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                f"EMBEDDING_MODEL={model_name} needs sentence-transformers: pip install sentence-transformers"
+            ) from e
+        self.model = SentenceTransformer(model_name, device=device)
+        self.model_id = f"sentence-transformers:{model_name}"
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.batch_size = batch_size
+
+    def embed(self, text):
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+                                    convert_to_numpy=True, show_progress_bar=False)
+        return vectors.tolist()
+
+
+def normalize_text(text):
+    """The form of a text its cached embedding is keyed by: NFC, whitespace runs collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    SQLite store of embeddings keyed by a hash of the model id and the normalized
+    text, so a chunk is embedded once per model no matter how often it is
+    re-ingested. Vectors are stored as float32 blobs.
+    """
+
+    # SQLite's default limit on bound parameters per statement is 999
+    _LOOKUP_SIZE = 500
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(model_id, text):
+        return hashlib.sha256(f"{model_id}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+    def get_many(self, keys):
+        """Returns {key: vector} for the keys that are cached."""
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self._LOOKUP_SIZE):
+                part = keys[i:i + self._LOOKUP_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def put_many(self, items):
+        """Stores (key, vector) pairs."""
+        rows = [(key, array("f", vector).tobytes()) for key, vector in items]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", rows)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedder:
+    """
+    An embedder backed by an EmbeddingCache. embed_many looks every text up first
+    and embeds only the misses, batch_size texts per model call, so re-ingesting
+    unchanged content costs no embedding work. embed (used for queries) goes
+    straight to the model, so one-off questions don't fill the cache.
+    """
+
+    def __init__(self, embedder, cache, batch_size=EMBEDDING_BATCH_SIZE):
+        self.embedder = embedder
+        self.cache = cache
+        self.batch_size = batch_size
+        self.model_id = embedder.model_id
+        self.dim = embedder.dim
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, text):
+        return self.embedder.embed(text)
+
+    def embed_many(self, texts):
+        keys = [EmbeddingCache.key(self.model_id, text) for text in texts]
+        vectors = self.cache.get_many(list(set(keys)))
+        # one model call per distinct text, even if it repeats within texts
+        missing = [(key, text) for key, text in dict(zip(keys, texts)).items() if key not in vectors]
+        for i in range(0, len(missing), self.batch_size):
+            part = missing[i:i + self.batch_size]
+            embedded = list(zip((key for key, _ in part), self.embedder.embed_many([text for _, text in part])))
+            self.cache.put_many(embedded)
+            vectors.update(embedded)
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [vectors[key] for key in keys]
+
+
+_EMBEDDERS = {}
+_EMBEDDERS_LOCK = threading.Lock()
+
+
+def get_embedder(model=None):
+    """
+    The client-side embedder for model (default: EMBEDDING_MODEL), behind the
+    persistent cache unless EMBEDDING_CACHE_PATH is "off", or None when
+    vectorization is left to Weaviate. Each model is loaded once per process.
+    """
+    model = EMBEDDING_MODEL if model is None else model
+    if not model:
+        return None
+    with _EMBEDDERS_LOCK:
+        if model not in _EMBEDDERS:
+            embedder = HashingEmbedder() if model == "hashing" else SentenceTransformerEmbedder(model)
+            if EMBEDDING_CACHE_PATH != "off":
+                embedder = CachedEmbedder(embedder, EmbeddingCache(EMBEDDING_CACHE_PATH))
+            logger.info(f"Embedding with '{embedder.model_id}' on this machine.")
+            _EMBEDDERS[model] = embedder
+        return _EMBEDDERS[model]
@@ -1,7 +1,17 @@
+import logging
 import os
+import time
 import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
 import json
 
+from . import generation_scheduler
+from .generation_scheduler import GenerationOverloaded, GenerationScheduler
+from .json_stream import JSONFieldStreamer
+from .observability import STAGE_SECONDS, record_gemini_usage
+
+logger = logging.getLogger(__name__)
+
 #gemini congfig
 global GEMINI_MODEL
 def configure_gemini():
@@ -10,68 +20,169 @@ def configure_gemini():
     GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
     GEMINI_MODEL = os.getenv("GEMINI_MODEL")
     if not GOOGLE_API_KEY or not GEMINI_MODEL:
-        print("❌ GOOGLE_API_KEY/MODEL SELECTION not found in .env file.")
+        logger.error("GOOGLE_API_KEY/MODEL SELECTION not found in .env file.")
         return False
     
     try:
         genai.configure(api_key=GOOGLE_API_KEY)
         GEMINI_MODEL = genai.GenerativeModel(GEMINI_MODEL)
-        print("✅ Gemini API configured successfully.")
+        logger.info("Gemini API configured successfully.")
         return True
     except Exception as e:
-        print(f"❌ Error configuring Gemini API: {e}")
+        logger.error(f"Error configuring Gemini API: {e}")
         return False
 
-def generate_answer(context_chunks, query_text):
-    """Generates an answer using Gemini based on the provided context."""
-    global GEMINI_MODEL
-    if not GEMINI_MODEL:
-        print("❌ Gemini model is not configured. Please call configure_gemini() first.")
-        return {"answer": "Error: Gemini model not configured.", "sources": []}
-        
-    if not context_chunks:
-        return {"answer": "I could not find any relevant information to answer your question.", "sources": []}
+# Gemini is constrained to this JSON shape, so the reply always parses. The model only
+# cites passage numbers; file, page and score come from retrieval (see RAG_CORE).
+ANSWER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answer": {"type": "string"},
+        "cited_sources": {"type": "array", "items": {"type": "integer"}},
+    },
+    "required": ["answer", "cited_sources"],
+}
+ANSWER_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": ANSWER_SCHEMA}
 
-    context = "\n".join(context_chunks)
-    
-    # This prompt template is crucial for instructing the model effectively
-    prompt = f"""
+NO_CONTEXT_ANSWER = "I could not find any relevant information to answer your question."
+
+# quota, overload and timeout errors are worth another try; bad requests are not
+_TRANSIENT_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.TooManyRequests,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def is_transient_error(e):
+    return isinstance(e, _TRANSIENT_ERRORS)
+
+
+# every Gemini call of this process goes through here (see generation_scheduler)
+SCHEDULER = GenerationScheduler(
+    rpm=generation_scheduler.GEMINI_RPM,
+    burst=generation_scheduler.GEMINI_BURST,
+    max_queue=generation_scheduler.GEMINI_MAX_QUEUE,
+    max_wait=generation_scheduler.GEMINI_MAX_WAIT,
+    retries=generation_scheduler.GEMINI_RETRIES,
+    backoff=generation_scheduler.GEMINI_RETRY_BACKOFF,
+    max_backoff=generation_scheduler.GEMINI_RETRY_MAX_BACKOFF,
+    is_transient=is_transient_error,
+)
+
+
+def _build_prompt(context_chunks, query_text):
+    # chunks start with their [n] source tag, so keep them visibly apart
+    context = "\n\n".join(context_chunks)
+    return f"""
     CONTEXT:
     ---
     {context}
     ---
-    Based ONLY on the context provided above, please answer the following question. Do not use any other information. 
-    Return a valid JSON object in the format: {{ "answer": "<the_answer>", "sources": [<list_of_sources>] }}.
-    The sources should be a list of dictionaries.
+    Based ONLY on the context provided above, please answer the following question. Do not use any other information.
+    Each passage in the context starts with its number in square brackets. In "cited_sources", list the numbers
+    of the passages your answer is based on.
 
     QUESTION: {query_text}
     """
 
+
+def _parse_reply(data, fallback_text):
+    """Maps the structured reply to {"answer", "cited"}; if it is unusable, the raw text becomes the answer."""
+    if not isinstance(data, dict) or not isinstance(data.get("answer"), str):
+        return {"answer": fallback_text, "cited": []}
+    cited = [n for n in data.get("cited_sources") or [] if isinstance(n, int)]
+    return {"answer": data["answer"], "cited": cited}
+
+
+def generate_answer(context_chunks, query_text, model=None):
+    """
+    Generates an answer using Gemini based on the provided context.
+    Uses the given model (e.g. the shared runtime's) or the one set by configure_gemini().
+    The call goes through SCHEDULER, so identical prompts in flight share one call.
+    Returns {"answer": str, "cited": [passage numbers]}, with "error": True added on failure.
+    Raises GenerationOverloaded if the scheduler sheds the call.
+    """
+    model = model or globals().get("GEMINI_MODEL")
+    if not model:
+        logger.error("Gemini model is not configured. Please call configure_gemini() first.")
+        return {"answer": "Error: Gemini model not configured.", "cited": [], "error": True}
+
+    if not context_chunks:
+        return {"answer": NO_CONTEXT_ANSWER, "cited": []}
+
+    prompt = _build_prompt(context_chunks, query_text)
     try:
-        print("\nGenerating answer with Gemini...")
-        response = GEMINI_MODEL.generate_content(prompt)
-        
-        # Extract the raw text from the response object
-        response_text = response.text
+        logger.debug("Generating answer with Gemini...")
+        # a copy, so callers sharing the answer can't change each other's
+        return dict(SCHEDULER.run(prompt, lambda: _generate(model, prompt)))
+    except GenerationOverloaded:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating content with Gemini: {e}")
+        return {"answer": "Sorry, I encountered an error while generating the answer.", "cited": [], "error": True}
 
-        # 1. Clean up the response text by removing markdown and the json tag
-        cleaned_text = response_text.strip().replace("```json\n", "").replace("```", "").strip()
 
-        # 2. Try to parse the cleaned text as JSON
+def _generate(model, prompt):
+    response = model.generate_content(prompt, generation_config=ANSWER_GENERATION_CONFIG)
+    record_gemini_usage(getattr(response, "usage_metadata", None))
+    response_text = response.text
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        # should not happen with a response schema, but never lose the answer over it
+        logger.error(f"Error decoding JSON from Gemini response: {e}")
+        data = None
+    return _parse_reply(data, response_text)
+
+
+def stream_answer(context_chunks, query_text, model=None):
+    """
+    Streams the same structured answer as generate_answer. Yields the answer text
+    in deltas (str) as Gemini produces it, decoded from the JSON stream by
+    JSONFieldStreamer, then one final {"answer", "cited"} dict.
+    The call is paced, shed and retried by SCHEDULER like generate_answer's, but
+    streams are not coalesced.
+    """
+    model = model or globals().get("GEMINI_MODEL")
+    if not model:
+        raise RuntimeError("Gemini model is not configured. Please call configure_gemini() first.")
+
+    if not context_chunks:
+        yield NO_CONTEXT_ANSWER
+        yield {"answer": NO_CONTEXT_ANSWER, "cited": []}
+        return
+
+    logger.debug("Streaming answer from Gemini...")
+    start = time.perf_counter()
+    prompt = _build_prompt(context_chunks, query_text)
+    # the first chunk is fetched by generate_content, so errors before any text are retried
+    response = SCHEDULER.call(
+        lambda: model.generate_content(prompt, generation_config=ANSWER_GENERATION_CONFIG, stream=True)
+    )
+    parser = JSONFieldStreamer("answer")
+    first_delta = True
+    for chunk in response:
+        # chunks without text (e.g. safety or finish metadata) raise on .text
         try:
-            result_dict = json.loads(cleaned_text)
-            
-            # Additional check to ensure the returned JSON has the expected keys
-            if "answer" not in result_dict or "sources" not in result_dict:
-                return {"answer": "Gemini returned an unexpected JSON format.", "sources": []}
-
-            return result_dict
-        
-        except json.JSONDecodeError as e:
-            print(f"❌ Error decoding JSON from Gemini response: {e}")
-            # If JSON decoding fails, return a default structured response
-            return {"answer": response_text, "sources": []}
+            text = chunk.text
+        except ValueError:
+            continue
+        delta = parser.feed(text) if text else ""
+        if delta:
+            if first_delta:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage="first_token")
+                first_delta = False
+            yield delta
+    # a streamed response has its usage totals once it is fully consumed
+    record_gemini_usage(getattr(response, "usage_metadata", None))
 
-    except Exception as e:
-        print(f"❌ Error generating content with Gemini: {e}")
-        return {"answer": "Sorry, I encountered an error while generating the answer.", "sources": []}
\ No newline at end of file
+    result = _parse_reply(parser.result(), parser.value or parser.raw)
+    if not parser.value and result["answer"]:
+        # nothing was streamed (the reply was not the expected JSON); send it whole
+        yield result["answer"]
+    yield result
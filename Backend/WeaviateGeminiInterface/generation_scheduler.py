@@ -0,0 +1,168 @@
+"""
+Admission control in front of Gemini. Every generation goes through one
+GenerationScheduler per process, which
+
+  - coalesces identical in-flight requests: while a prompt is being answered,
+    callers with the same prompt wait for that answer instead of sending their own
+  - paces calls with a token bucket sized to the Gemini quota (GEMINI_RPM)
+  - sheds load: a call that would wait longer than GEMINI_MAX_WAIT for a token, or
+    find GEMINI_MAX_QUEUE calls already waiting, fails fast with
+    GenerationOverloaded, which the API turns into a 429 with Retry-After
+  - retries transient errors (quota, unavailable, timeouts) with jittered backoff
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from .observability import GEMINI_REQUESTS, GEMINI_RETRY_ATTEMPTS, GEMINI_WAITING
+
+logger = logging.getLogger(__name__)
+
+# Gemini requests per minute this process may send (0 = no limit), and how many may go out back to back
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "0"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "10"))
+# calls allowed to wait for a token, and the longest wait accepted before shedding
+GEMINI_MAX_QUEUE = int(os.getenv("GEMINI_MAX_QUEUE", "100"))
+GEMINI_MAX_WAIT = float(os.getenv("GEMINI_MAX_WAIT", "10"))
+# retries of transient errors, with full-jitter exponential backoff
+GEMINI_RETRIES = int(os.getenv("GEMINI_RETRIES", "3"))
+GEMINI_RETRY_BACKOFF = float(os.getenv("GEMINI_RETRY_BACKOFF", "0.5"))
+GEMINI_RETRY_MAX_BACKOFF = float(os.getenv("GEMINI_RETRY_MAX_BACKOFF", "8"))
+
+
+class GenerationOverloaded(Exception):
+    """Raised instead of queueing a call that could not be sent soon enough; retry_after is in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Answer generation is at capacity; retry in {retry_after:.0f}s.")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket handing out reservations: a caller takes a token now, even one
+    that will only be refilled later, and is told how long to wait before using
+    it. Callers are thus served in arrival order, and the wait is known up front.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=None):
+        """Returns (seconds to wait, True), or (seconds it would take, False) without taking a token if over max_wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return wait, False
+            self._tokens -= 1
+            return wait, True
+
+
+class GenerationScheduler:
+    """
+    Runs Gemini calls under the limits above. run() coalesces by key (unless
+    coalesce is False); call() does not (for streams, whose chunks can't be shared).
+    is_transient(exception) decides which errors are retried.
+    """
+
+    def __init__(self, rpm=0, burst=10, max_queue=100, max_wait=10.0, retries=3, backoff=0.5, max_backoff=8.0,
+                 is_transient=None, coalesce=True):
+        self.bucket = TokenBucket(rpm / 60.0, burst) if rpm > 0 else None
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.is_transient = is_transient or (lambda e: False)
+        self.coalesce = coalesce
+        self._flights = {}
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def run(self, key, fn):
+        """
+        Returns fn()'s result. If a call with the same key is already in flight,
+        waits for it and returns (or raises) the same thing instead of calling fn.
+        """
+        if not self.coalesce:
+            return self.call(fn)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+        if not leader:
+            GEMINI_REQUESTS.inc(outcome="coalesced")
+            return flight.result()
+
+        try:
+            result = self.call(fn)
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def call(self, fn):
+        """Returns fn()'s result once a token is free, retrying transient errors; sheds load with GenerationOverloaded."""
+        self._admit()
+        GEMINI_REQUESTS.inc(outcome="sent")
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.retries or not self.is_transient(e):
+                    raise
+                # full jitter keeps the retries of a burst from arriving together
+                sleep_for = random.uniform(0, delay)
+                logger.warning(f"Transient Gemini error, retrying in {sleep_for:.2f}s "
+                               f"(attempt {attempt + 1}/{self.retries}): {e}")
+                GEMINI_RETRY_ATTEMPTS.inc()
+                time.sleep(sleep_for)
+                delay = min(delay * 2, self.max_backoff)
+                # a retry is another request against the quota, but it is never shed
+                self._wait_for_token(None)
+
+    def stats(self):
+        """Calls currently waiting for a token and distinct prompts in flight."""
+        with self._lock:
+            return {"waiting": self._waiting, "in_flight": len(self._flights)}
+
+    def _admit(self):
+        with self._lock:
+            if self.bucket is not None and self._waiting >= self.max_queue:
+                GEMINI_REQUESTS.inc(outcome="shed")
+                raise GenerationOverloaded(self._waiting / self.bucket.rate)
+        self._wait_for_token(self.max_wait)
+
+    def _wait_for_token(self, max_wait):
+        if self.bucket is None:
+            return
+        wait, granted = self.bucket.reserve(max_wait)
+        if not granted:
+            GEMINI_REQUESTS.inc(outcome="shed")
+            raise GenerationOverloaded(wait)
+        if wait > 0:
+            with self._lock:
+                self._waiting += 1
+            GEMINI_WAITING.inc()
+            try:
+                time.sleep(wait)
+            finally:
+                GEMINI_WAITING.dec()
+                with self._lock:
+                    self._waiting -= 1
@@ -0,0 +1,255 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+from weaviate.util import generate_uuid5
+
+from .chunking import DEFAULT_CHUNKING
+from .pdf_processor import process_pdf_file, count_pages
+from .parallel_ingest import list_pdf_files, iter_files_parallel
+from .retrieval_backends import as_backend
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+# the folder containing your PDF files (defaults to Backend/data)
+PDF_DIRECTORY = os.getenv("PDF_DIRECTORY") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def default_manifest_path(directory_path, collection_name, backend_kind="weaviate"):
+    """The manifest lives next to the PDFs it describes, one per collection and backend."""
+    if backend_kind == "weaviate":
+        return os.path.join(directory_path, f".ingest_manifest.{collection_name}.json")
+    return os.path.join(directory_path, f".ingest_manifest.{backend_kind}.{collection_name}.json")
+
+
+def file_sha256(file_path):
+    """Content hash of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(data_object):
+    """Content hash of one chunk's text."""
+    return hashlib.sha256(data_object["text_chunk"].encode("utf-8")).hexdigest()
+
+
+def chunk_uuid(source_file, hash_):
+    """Deterministic Weaviate id for a chunk, so an unchanged chunk keeps its id (and its vector)."""
+    return generate_uuid5(f"{source_file}:{hash_}")
+
+
+def load_manifest(manifest_path, collection_name, chunking=None):
+    """
+    Reads the manifest, starting over if it is missing, unreadable, for another
+    collection or written with other chunking settings (every file must then be
+    re-chunked; files without a record get their old objects replaced).
+    """
+    chunking = chunking or DEFAULT_CHUNKING
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if (manifest.get("version") == MANIFEST_VERSION and manifest.get("collection") == collection_name
+                and manifest.get("chunking") == chunking):
+            return manifest
+        logger.info("Manifest is for a different collection, version or chunking. Starting a new one.")
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read manifest '{manifest_path}': {e}. Starting a new one.")
+    return {"version": MANIFEST_VERSION, "collection": collection_name, "chunking": dict(chunking), "files": {}}
+
+
+def save_manifest(manifest, manifest_path):
+    """Writes the manifest atomically so an interrupted sync never leaves a truncated file."""
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def find_changes(directory_path, manifest, min_age=0):
+    """
+    Compares the PDFs on disk with the manifest.
+    Returns (changed, unchanged, removed): changed maps file path -> (sha256, size, mtime)
+    for new or modified files, the other two are lists of filenames.
+    Files whose size and mtime match the manifest are not re-hashed, and files modified
+    less than min_age seconds ago are left for a later run (they may still be copying).
+    """
+    known = manifest["files"]
+    changed = {}
+    unchanged = []
+    present = set()
+    for file_path in list_pdf_files(directory_path):
+        filename = os.path.basename(file_path)
+        present.add(filename)
+        stat = os.stat(file_path)
+        record = known.get(filename)
+        if min_age and time.time() - stat.st_mtime < min_age:
+            continue
+        if record and record["size"] == stat.st_size and record["mtime"] == stat.st_mtime:
+            unchanged.append(filename)
+            continue
+
+        sha256 = file_sha256(file_path)
+        if record and record["sha256"] == sha256:
+            # touched but not modified; remember the new mtime so it isn't hashed again
+            record["mtime"] = stat.st_mtime
+            unchanged.append(filename)
+            continue
+        changed[file_path] = (sha256, stat.st_size, stat.st_mtime)
+
+    removed = [filename for filename in known if filename not in present]
+    return changed, unchanged, removed
+
+
+def _dedupe_chunks(data_objects):
+    """Returns (objects, hashes) with repeated chunks of a file dropped; identical text would share one id."""
+    objects = []
+    hashes = []
+    seen = set()
+    for obj in data_objects:
+        hash_ = chunk_hash(obj)
+        if hash_ not in seen:
+            seen.add(hash_)
+            objects.append(obj)
+            hashes.append(hash_)
+    return objects, hashes
+
+
+def _apply_file(backend, filename, data_objects, record, batch_size=None, chunk_store=None):
+    """
+    Brings one file's chunks in the backend up to date: inserts the chunks that
+    are not there yet, then deletes the file's other objects. The file's old chunks
+    stay searchable until the new ones are written.
+    With a chunk_store the chunks are stored there too, and each object carries
+    its chunk id; chunks already in the store keep theirs.
+    Returns (hashes, inserted, ok).
+    """
+    objects, hashes = _dedupe_chunks(data_objects)
+    old_hashes = set(record["chunks"]) if record else set()
+    if chunk_store is not None:
+        chunk_ids = chunk_store.add(filename, objects, hashes)
+        objects = [{**obj, "chunk_id": chunk_id} for obj, chunk_id in zip(objects, chunk_ids)]
+
+    to_insert = [(obj, hash_) for obj, hash_ in zip(objects, hashes) if hash_ not in old_hashes]
+    ok = backend.ingest(
+        [obj for obj, _ in to_insert],
+        uuids=[chunk_uuid(filename, hash_) for _, hash_ in to_insert],
+        batch_size=batch_size,
+    )
+    if not ok:
+        return hashes, len(to_insert), False
+
+    # a file without a manifest record may still have objects from an older full ingest
+    if record is None or old_hashes - set(hashes):
+        backend.delete_by_source(filename, keep_ids=[chunk_uuid(filename, hash_) for hash_ in hashes])
+    if chunk_store is not None:
+        chunk_store.delete_source(filename, keep_ids=chunk_ids)
+    return hashes, len(to_insert), True
+
+
+def iter_parsed_files(file_paths, workers=1, chunking=None):
+    """
+    Parses PDFs one after another (or on a process pool) and lazily yields
+    (file_path, data_objects) in input order; data_objects is None if the file failed.
+    Only the file being consumed, plus the pool's small look-ahead, is held in memory.
+    """
+    if workers == 1:
+        for file_path in file_paths:
+            try:
+                yield file_path, process_pdf_file(file_path, chunking)
+            except Exception as e:
+                logger.error(f"Error processing {os.path.basename(file_path)}: {e}")
+                yield file_path, None
+        return
+
+    by_name = {os.path.basename(file_path): file_path for file_path in file_paths}
+    seen = set()
+    for file_result in iter_files_parallel(file_paths, workers=workers, chunking=chunking):
+        seen.add(file_result["filename"])
+        if file_result["error"]:
+            logger.error(f"Error processing {file_result['filename']}: {file_result['error']}")
+        yield by_name[file_result["filename"]], file_result["objects"]
+    # files that could not even be opened never reach the pool
+    for filename, file_path in by_name.items():
+        if filename not in seen:
+            yield file_path, None
+
+
+def sync_directory(backend, directory_path, manifest_path=None, workers=1, batch_size=None, min_age=0,
+                   chunking=None, chunk_store=None):
+    """
+    Incrementally syncs the PDFs in directory_path into backend (a retrieval backend
+    or a bare Weaviate collection).
+    Only new or changed PDFs are parsed, only their new chunks are inserted (and
+    vectorized), and only chunks that disappeared are deleted. Removed PDFs have all
+    their chunks deleted. The manifest is saved after every file, so an interrupted
+    run resumes where it stopped. A chunk_store (see chunk_store.py) is kept in step
+    with the backend.
+    Returns a summary dict of what was done, including page/chunk/object counts and
+    the seconds spent parsing and writing.
+    """
+    summary = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0, "failed": 0,
+               "pages": 0, "chunks": 0, "chunks_inserted": 0,
+               "parse_seconds": 0.0, "write_seconds": 0.0}
+    if not os.path.isdir(directory_path):
+        logger.error(f"Directory '{directory_path}' not found.")
+        return summary
+
+    backend = as_backend(backend)
+    manifest_path = manifest_path or default_manifest_path(directory_path, backend.name, backend.kind)
+    manifest = load_manifest(manifest_path, backend.name, chunking)
+    changed, unchanged, removed = find_changes(directory_path, manifest, min_age=min_age)
+    summary["unchanged"] = len(unchanged)
+    logger.info(f"Sync plan: {len(changed)} new/changed, {len(unchanged)} unchanged, {len(removed)} removed PDF(s).")
+    if not changed and not removed:
+        return summary
+
+    # parsing is lazy, so whatever time the loop spends outside writing is parse time
+    loop_start = time.perf_counter()
+    for i, (file_path, data_objects) in enumerate(iter_parsed_files(list(changed), workers=workers, chunking=chunking), 1):
+        filename = os.path.basename(file_path)
+        sha256, size, mtime = changed[file_path]
+        if data_objects is None:
+            summary["failed"] += 1
+            continue
+
+        start = time.perf_counter()
+        record = manifest["files"].get(filename)
+        pages = count_pages(file_path)
+        hashes, inserted, ok = _apply_file(backend, filename, data_objects, record, batch_size=batch_size,
+                                           chunk_store=chunk_store)
+        summary["pages"] += pages
+        summary["chunks"] += len(hashes)
+        summary["chunks_inserted"] += inserted
+        logger.info(f"[{i}/{len(changed)}] {filename}: {pages} page(s), {len(hashes)} chunk(s), {inserted} new object(s)")
+        if ok:
+            summary["changed" if record else "new"] += 1
+            manifest["files"][filename] = {"sha256": sha256, "size": size, "mtime": mtime, "chunks": hashes}
+            save_manifest(manifest, manifest_path)
+        else:
+            summary["failed"] += 1
+        summary["write_seconds"] += time.perf_counter() - start
+        # drop this file's objects before the next one is parsed
+        del data_objects
+    summary["parse_seconds"] = time.perf_counter() - loop_start - summary["write_seconds"]
+
+    start = time.perf_counter()
+    for filename in removed:
+        backend.delete_by_source(filename)
+        if chunk_store is not None:
+            chunk_store.delete_source(filename)
+        del manifest["files"][filename]
+        summary["removed"] += 1
+    save_manifest(manifest, manifest_path)
+    summary["write_seconds"] += time.perf_counter() - start
+
+    logger.info(f"Sync finished: {summary}")
+    return summary
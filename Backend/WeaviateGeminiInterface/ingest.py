@@ -0,0 +1,187 @@
+"""
+Standalone ingestion command, run separately from the API so parsing and
+vectorization never compete with serving.
+
+    python -m WeaviateGeminiInterface.ingest                      # one incremental sync
+    python -m WeaviateGeminiInterface.ingest --watch              # keep syncing a drop folder
+    python -m WeaviateGeminiInterface.ingest --dry-run            # parse and report only
+    python -m WeaviateGeminiInterface.ingest --full               # drop and rebuild the collection
+    python -m WeaviateGeminiInterface.ingest --backend local      # build the offline local index instead
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from dotenv import load_dotenv
+
+# before the package imports below, which read their defaults from the environment
+load_dotenv()
+
+from .chunk_store import open_chunk_store
+from .chunking import DEFAULT_CHUNKING, STRATEGIES
+from .incremental_sync import PDF_DIRECTORY, default_manifest_path, sync_directory
+from .parallel_ingest import STAGES, format_timing_report, iter_files_parallel, list_pdf_files
+from .retrieval_backends import BACKENDS, DEFAULT_BACKEND, DEFAULT_LOCAL_INDEX_PATH, open_backend
+from .observability import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else 0.0
+
+
+def print_throughput(summary):
+    """Prints pages/s and chunks/s for parsing and objects/s for writing."""
+    parse_seconds = summary["parse_seconds"]
+    write_seconds = summary["write_seconds"]
+    print(
+        f"Parsed {summary['pages']} page(s) into {summary['chunks']} chunk(s) in {parse_seconds:.2f}s "
+        f"({_rate(summary['pages'], parse_seconds):.1f} pages/s, {_rate(summary['chunks'], parse_seconds):.1f} chunks/s)."
+    )
+    if "chunks_inserted" in summary:
+        print(
+            f"Wrote {summary['chunks_inserted']} object(s) in {write_seconds:.2f}s "
+            f"({_rate(summary['chunks_inserted'], write_seconds):.1f} objects/s)."
+        )
+    if resource is not None:
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mib = peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+        print(f"Peak memory (this process): {peak_mib:.0f} MiB")
+
+
+def dry_run(directory_path, workers=1, chunking=None):
+    """
+    Parses every PDF in directory_path and reports what would be ingested, plus the
+    per-stage timing report (including the pages Camelot skipped), without
+    connecting to Weaviate.
+    """
+    summary = {"pages": 0, "chunks": 0, "parse_seconds": 0.0, "write_seconds": 0.0}
+    timings = {"files": {}, "total": dict.fromkeys(STAGES, 0.0)}
+    file_paths = list_pdf_files(directory_path)
+    start = time.perf_counter()
+    print(f"\n{'file':<40} {'pages':>6} {'chunks':>7} {'tables':>7}")
+    by_name = {os.path.basename(file_path): file_path for file_path in file_paths}
+    for file_result in iter_files_parallel(file_paths, workers=workers, chunking=chunking):
+        filename = file_result["filename"]
+        del by_name[filename]
+        if file_result["error"]:
+            print(f"{filename[:40]:<40} {'failed':>6}")
+            continue
+        objects = file_result["objects"]
+        pages = len(file_result["pages"]["table_pages"]) + len(file_result["pages"]["skipped_pages"])
+        tables = sum(1 for obj in objects if obj.get("chunk_type") == "table")
+        summary["pages"] += pages
+        summary["chunks"] += len(objects)
+        timings["files"][filename] = {**file_result["timings"], **file_result["pages"]}
+        for stage in STAGES:
+            timings["total"][stage] += file_result["timings"][stage]
+        print(f"{filename[:40]:<40} {pages:>6} {len(objects):>7} {tables:>7}")
+    # files that could not even be opened never reach the pool
+    for filename in by_name:
+        print(f"{filename[:40]:<40} {'failed':>6}")
+    summary["parse_seconds"] = timings["wall"] = time.perf_counter() - start
+
+    print(f"\n{format_timing_report(timings)}")
+    print_throughput(summary)
+    return summary
+
+
+def watch(backend, directory_path, manifest_path, interval, settle, workers, batch_size, chunking, chunk_store=None):
+    """Polls directory_path and syncs whenever a PDF is added, changed or removed. Stops on Ctrl+C."""
+    logger.info(f"Watching '{directory_path}' every {interval:.0f}s (Ctrl+C to stop)...")
+    while True:
+        try:
+            summary = sync_directory(backend, directory_path, manifest_path, workers=workers, batch_size=batch_size,
+                                     min_age=settle, chunking=chunking, chunk_store=chunk_store)
+            if summary["pages"] or summary["removed"]:
+                print_throughput(summary)
+        except Exception as e:
+            # the manifest only records finished files, so the next scan retries the rest
+            logger.error(f"Sync failed, retrying in {interval:.0f}s: {e}")
+        time.sleep(interval)
+
+
+def main(argv=None):
+    configure_logging(os.getenv("LOG_LEVEL", "INFO").upper(), json_format=False)
+    parser = argparse.ArgumentParser(
+        prog="python -m WeaviateGeminiInterface.ingest",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--dir", default=PDF_DIRECTORY, help="folder containing the PDFs (default: %(default)s)")
+    parser.add_argument("--collection", default="VIT_docs", help="collection name (default: %(default)s)")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="where chunks are stored: Weaviate Cloud or the offline local index (default: %(default)s)")
+    parser.add_argument("--index-path", default=DEFAULT_LOCAL_INDEX_PATH,
+                        help="local index directory for --backend local (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1, help="parser processes; 0 means one per CPU (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=None, help="fixed Weaviate batch size (default: dynamic batching)")
+    parser.add_argument("--manifest", default=None,
+                        help="manifest path (default: <dir>/.ingest_manifest[.local].<collection>.json)")
+    parser.add_argument("--chunk-strategy", choices=STRATEGIES, default=DEFAULT_CHUNKING["strategy"],
+                        help="how page text is split into chunks (default: %(default)s)")
+    parser.add_argument("--chunk-max-tokens", type=int, default=DEFAULT_CHUNKING["max_tokens"],
+                        help="approximate token limit per chunk (default: %(default)s)")
+    parser.add_argument("--chunk-overlap", type=int, default=DEFAULT_CHUNKING["overlap_tokens"],
+                        help="approximate tokens repeated between neighbouring chunks (default: %(default)s)")
+    parser.add_argument("--full", action="store_true", help="drop the collection and re-ingest everything")
+    parser.add_argument("--dry-run", action="store_true", help="only parse the PDFs and report, don't touch the backend")
+    parser.add_argument("--watch", action="store_true", help="keep running and sync whenever the folder changes")
+    parser.add_argument("--interval", type=float, default=30.0, help="seconds between folder scans in watch mode (default: %(default)s)")
+    parser.add_argument("--settle", type=float, default=10.0,
+                        help="in watch mode, ignore files modified within this many seconds (default: %(default)s)")
+    args = parser.parse_args(argv)
+    workers = args.workers or None
+    chunking = {"strategy": args.chunk_strategy, "max_tokens": args.chunk_max_tokens, "overlap_tokens": args.chunk_overlap}
+
+    if not os.path.isdir(args.dir):
+        parser.error(f"directory '{args.dir}' not found")
+
+    if args.dry_run:
+        dry_run(args.dir, workers=workers, chunking=chunking)
+        return 0
+
+    backend = open_backend(args.backend, args.collection, fresh_start=args.full, index_path=args.index_path)
+    if backend is None:
+        return 1
+
+    # chunk texts and citation metadata, kept in step with the backend for the API to read
+    chunk_store = open_chunk_store(args.collection, backend.kind)
+    try:
+        manifest_path = args.manifest or default_manifest_path(args.dir, args.collection, backend.kind)
+        if args.full and os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        if args.full and chunk_store is not None:
+            chunk_store.reset()
+
+        if args.watch:
+            # stay out of the way of an API process on the same machine
+            if hasattr(os, "nice"):
+                os.nice(10)
+            watch(backend, args.dir, manifest_path, args.interval, args.settle, workers, args.batch_size, chunking,
+                  chunk_store)
+        else:
+            summary = sync_directory(backend, args.dir, manifest_path, workers=workers,
+                                     batch_size=args.batch_size, chunking=chunking, chunk_store=chunk_store)
+            print_throughput(summary)
+            return 1 if summary["failed"] else 0
+    except KeyboardInterrupt:
+        logger.info("Stopping ingestion.")
+    finally:
+        backend.close()
+        if chunk_store is not None:
+            chunk_store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
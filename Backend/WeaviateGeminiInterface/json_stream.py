@@ -0,0 +1,117 @@
+import json
+
+_SIMPLE_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JSONFieldStreamer:
+    """
+    Incremental parser for a JSON object that arrives in pieces (e.g. a streamed
+    structured-output response). feed() each piece and get back the newly decoded
+    characters of one top-level string field, so the field can be shown while the
+    rest of the object is still being generated. Keys, nesting and strings are
+    tracked, so the same name inside another value is never mistaken for the field.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.raw = ""
+        self.value = ""
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string = []       # current top-level string, while it may be a key
+        self._expect_key = False
+        self._last_key = None
+        self._state = "scan"   # scan -> before_value (after the field's colon) -> value -> scan
+        self._pending = ""     # escape sequence not complete yet
+
+    def feed(self, text):
+        """Adds the next piece of raw JSON and returns the field's newly decoded characters."""
+        self.raw += text
+        out = []
+        while self._pos < len(self.raw) and not self.done:
+            char = self.raw[self._pos]
+            if self._state == "value":
+                # an unfinished escape sequence waits in self._pending for the next piece
+                self._feed_value(char, out)
+            elif self._state == "before_value":
+                if char == '"':
+                    self._state = "value"
+                elif not char.isspace():
+                    # the field is not a string; nothing to stream
+                    self._state = "scan"
+                    continue
+            else:
+                self._scan(char)
+            self._pos += 1
+        decoded = "".join(out)
+        self.value += decoded
+        return decoded
+
+    def result(self):
+        """Parses the complete object; returns None if it is not valid JSON."""
+        try:
+            return json.loads(self.raw)
+        except ValueError:
+            return None
+
+    def _feed_value(self, char, out):
+        if self._pending:
+            self._pending += char
+            decoded = self._decode_escape()
+            if decoded is not None:
+                out.append(decoded)
+                self._pending = ""
+        elif char == "\\":
+            self._pending = char
+        elif char == '"':
+            self.done = True
+        else:
+            out.append(char)
+
+    def _decode_escape(self):
+        """Returns the decoded escape in self._pending, or None while more characters are needed."""
+        kind = self._pending[1:2]
+        if kind != "u":
+            return _SIMPLE_ESCAPES.get(kind, kind)
+        if len(self._pending) < 6:
+            return None
+        code = int(self._pending[2:6], 16)
+        if 0xD800 <= code < 0xDC00:
+            # high surrogate: wait for the \\uXXXX of its low half
+            if len(self._pending) < 12:
+                return None
+            return json.loads(f'"{self._pending}"')
+        return chr(code)
+
+    def _scan(self, char):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1 and self._expect_key:
+                    self._last_key = "".join(self._string)
+                    self._expect_key = False
+                return
+            if self._depth == 1 and self._expect_key:
+                self._string.append(char)
+            return
+
+        if char == '"':
+            self._in_string = True
+            self._string = []
+        elif char in "{[":
+            self._depth += 1
+            self._expect_key = char == "{" and self._depth == 1
+        elif char in "}]":
+            self._depth -= 1
+        elif char == "," and self._depth == 1:
+            self._expect_key = True
+        elif char == ":" and self._depth == 1 and self._last_key == self.field:
+            self._state = "before_value"
+            self._last_key = None
@@ -0,0 +1,423 @@
+import json
+import logging
+import math
+import os
+import threading
+import uuid as uuid_lib
+
+import numpy as np
+
+from .corpus_events import notify_corpus_changed, notify_corpus_reloaded
+from .embeddings import HashingEmbedder, tokenize
+from .weaviate_handler import SEARCH_MODES, FUSION_TYPES
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+
+# BM25 parameters, the same defaults Weaviate uses
+BM25_K1 = 1.2
+BM25_B = 0.75
+# rank constant of reciprocal-rank fusion
+RRF_K = 60
+# share of deleted rows at which a write rewrites the index without them
+COMPACT_RATIO = 0.25
+
+
+class LocalIndex:
+    """
+    Offline retrieval backend. Normalized chunk embeddings live in a float32 matrix
+    on disk that is memory-mapped on load, with the chunks' properties in a JSON-lines
+    file next to it; top-k is a single matrix-vector product. Supports the same
+    vector, keyword (BM25) and hybrid search modes as the Weaviate backend.
+
+    Files, for collection name N in directory path:
+      N.json          version, embedder model id, generation, and how many rows,
+                      chunk bytes and deletions of the files below are committed
+      N.<gen>.f32     float32 matrix, one row per chunk
+      N.<gen>.jsonl   the chunks' properties, one JSON object per line, in row order
+      N.<gen>.del     int64 numbers of the rows deleted (or replaced) since
+    A write appends to these files and then atomically replaces N.json, so adding or
+    deleting a file's chunks costs as much as those chunks, not the whole index, and
+    a reader in another process always sees a consistent state. Bytes beyond the
+    committed counts, left by an interrupted write, are ignored by readers and cut
+    off by the next writer. Once COMPACT_RATIO of the rows are deleted, the next
+    write rewrites the index without them under a new generation.
+    Readers pick up changes on their next query, reading only what was appended.
+    Indexes of version 1 (one .npy matrix, chunks inside N.json) are still read, and
+    converted by the first write.
+    """
+
+    kind = "local"
+
+    def __init__(self, path, name="VIT_docs", embedder=None, fresh_start=False):
+        self.path = path
+        self.name = name
+        self.embedder = embedder or HashingEmbedder()
+        self._lock = threading.RLock()
+        self._loaded_stat = None
+        self._clear_state()
+
+        os.makedirs(path, exist_ok=True)
+        if fresh_start and os.path.exists(self._meta_path):
+            logger.info(f"Deleting existing local index '{name}'...")
+            self._rewrite()
+            self._load()
+            # results cached from the old contents point at chunks that are gone
+            notify_corpus_changed(name)
+        else:
+            self._load()
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.path, f"{self.name}.json")
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def ingest(self, data_objects, uuids=None, batch_size=None):
+        """
+        Embeds and adds data_objects. uuids, if given, is a parallel list of ids;
+        re-adding an existing id overwrites that chunk, as in Weaviate.
+        batch_size is the number of texts embedded at a time (default: all at once).
+        Returns True once the index is written.
+        """
+        if not data_objects:
+            logger.warning("No data provided for ingestion.")
+            return True
+
+        logger.info(f"Ingesting {len(data_objects)} objects into local index '{self.name}'...")
+        uuids = uuids or [uuid_lib.uuid4() for _ in data_objects]
+        texts = [obj["text_chunk"] for obj in data_objects]
+        step = batch_size or len(texts)
+        new_vectors = np.vstack([
+            self._embed(texts[i:i + step]) for i in range(0, len(texts), step)
+        ])
+        new_chunks = [{**obj, "uuid": str(id_)} for obj, id_ in zip(data_objects, uuids)]
+
+        try:
+            with self._lock:
+                self._refresh()
+                replaced = [self._row_of[chunk["uuid"]] for chunk in new_chunks if chunk["uuid"] in self._row_of]
+                self._append(new_vectors, new_chunks, replaced)
+        except OSError as e:
+            logger.error(f"Error writing local index: {e}")
+            return False
+
+        logger.info(f"Data ingestion successful ({len(new_chunks)} object(s)).")
+        notify_corpus_changed(self.name)
+        return True
+
+    def retrieve(self, query_text, limit=3, with_metadata=False, mode="vector", alpha=0.5,
+                 fusion="relative_score", score_cutoff=None):
+        """Same contract as weaviate_handler.retrieve_chunks, answered from the local index."""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'. Choose from {', '.join(SEARCH_MODES)}.")
+        if fusion not in FUSION_TYPES:
+            raise ValueError(f"Unknown fusion type '{fusion}'. Choose from {', '.join(FUSION_TYPES)}.")
+
+        with self._lock:
+            self._refresh()
+            vectors, chunks, live, live_count = self._vectors, self._chunks, self._live, len(self._row_of)
+            if not live_count:
+                logger.info("No relevant documents found in the local index for your query.")
+                return []
+
+            if mode == "vector":
+                scores = vectors @ self._embed_query(query_text)
+            elif mode == "keyword":
+                scores = self._bm25_scores(query_text)
+            else:
+                vector_scores = vectors @ self._embed_query(query_text)
+                keyword_scores = self._bm25_scores(query_text)
+                if fusion == "ranked":
+                    scores = (alpha * _reciprocal_ranks(vector_scores, live)
+                              + (1 - alpha) * _reciprocal_ranks(keyword_scores, live))
+                else:
+                    scores = alpha * _min_max(vector_scores, live) + (1 - alpha) * _min_max(keyword_scores, live)
+            if live is not None:
+                # deleted and replaced rows stay in the matrix until the next compaction
+                scores = np.where(live, scores, -np.inf)
+
+        limit = min(limit, live_count)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        retrieved_objects = []
+        for i in top:
+            score = float(scores[i])
+            # keyword search only returns chunks that share a term with the query
+            if chunks[i] is None or (mode == "keyword" and score <= 0):
+                continue
+            if score_cutoff is not None and score < score_cutoff:
+                continue
+            retrieved_objects.append({**chunks[i], "score": score})
+
+        if not retrieved_objects:
+            logger.info("No relevant documents found in the local index for your query.")
+            return []
+        if with_metadata:
+            return retrieved_objects
+        return [obj["text_chunk"] for obj in retrieved_objects]
+
+    def delete_by_source(self, source_file, keep_ids=None):
+        """Deletes every chunk of source_file except those whose ids are in keep_ids."""
+        if not source_file:
+            logger.warning("No source filename provided for deletion.")
+            return
+
+        keep_ids = {str(id_) for id_ in keep_ids or ()}
+        with self._lock:
+            self._refresh()
+            doomed = [row for row in self._rows_of_source.get(source_file, ())
+                      if self._chunks[row]["uuid"] not in keep_ids]
+            if doomed:
+                self._append(None, [], doomed)
+        logger.info(f"Deletion successful. Deleted {len(doomed)} object(s) from source '{source_file}'.")
+        if doomed:
+            notify_corpus_changed(self.name)
+
+    def close(self):
+        """Releases the memory map."""
+        with self._lock:
+            self._clear_state()
+            self._loaded_stat = None
+
+    def _embed(self, texts):
+        return np.asarray(self.embedder.embed_many(texts), dtype=np.float32).reshape(len(texts), self.embedder.dim)
+
+    def _embed_query(self, query_text):
+        return np.asarray(self.embedder.embed(query_text), dtype=np.float32)
+
+    def _clear_state(self):
+        self._generation = None
+        # committed rows, chunk file bytes and deletions that are loaded
+        self._rows = self._chunk_bytes = self._deleted_count = 0
+        self._vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        # one entry per row, None for deleted rows
+        self._chunks = []
+        # uuid -> row and source file -> rows, of live rows only
+        self._row_of = {}
+        self._rows_of_source = {}
+        # False for deleted rows; None while there are none
+        self._live = None
+        self._bm25 = None
+
+    def _file(self, generation, kind):
+        return os.path.join(self.path, f"{self.name}.{generation}.{kind}")
+
+    def _load(self):
+        """
+        Brings the loaded state up to date with the files: appended rows, chunks and
+        deletions are read on top of what is loaded, anything else loads from scratch.
+        An index that doesn't exist yet is empty.
+        """
+        try:
+            stat = os.stat(self._meta_path)
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            self._clear_state()
+            self._loaded_stat = None
+            return
+
+        if meta.get("version") not in (1, INDEX_VERSION) or meta.get("model_id") != self.embedder.model_id:
+            raise ValueError(
+                f"Local index '{self.name}' was built with embedder '{meta.get('model_id')}' "
+                f"(version {meta.get('version')}), not '{self.embedder.model_id}'. Re-ingest it with --full."
+            )
+        if meta["version"] == 1:
+            self._clear_state()
+            for chunk in meta["chunks"]:
+                self._add_row(chunk)
+            self._vectors = np.load(os.path.join(self.path, meta["vectors_file"]), mmap_mode="r")
+            self._rows = len(self._chunks)
+        else:
+            if (meta["generation"] != self._generation or meta["rows"] < self._rows
+                    or meta["chunk_bytes"] < self._chunk_bytes or meta["deleted"] < self._deleted_count):
+                self._clear_state()
+                self._generation = meta["generation"]
+            with open(self._file(self._generation, "jsonl"), "rb") as f:
+                f.seek(self._chunk_bytes)
+                for line in f.read(meta["chunk_bytes"] - self._chunk_bytes).splitlines():
+                    self._add_row(json.loads(line))
+            with open(self._file(self._generation, "del"), "rb") as f:
+                f.seek(self._deleted_count * 8)
+                for row in np.frombuffer(f.read((meta["deleted"] - self._deleted_count) * 8), dtype=np.int64):
+                    self._delete_row(int(row))
+            self._rows, self._chunk_bytes, self._deleted_count = meta["rows"], meta["chunk_bytes"], meta["deleted"]
+            self._vectors = np.memmap(self._file(self._generation, "f32"), dtype=np.float32, mode="r",
+                                      shape=(self._rows, self.embedder.dim)) if self._rows else self._vectors
+        if self._live is not None and len(self._live) < len(self._chunks):
+            self._live = np.concatenate([self._live, np.ones(len(self._chunks) - len(self._live), dtype=bool)])
+        self._bm25 = None
+        self._loaded_stat = (stat.st_ino, stat.st_mtime_ns)
+
+    def _add_row(self, chunk):
+        row = len(self._chunks)
+        self._chunks.append(chunk)
+        self._row_of[chunk["uuid"]] = row
+        self._rows_of_source.setdefault(chunk.get("source_file"), set()).add(row)
+
+    def _delete_row(self, row):
+        chunk = self._chunks[row]
+        if chunk is None:
+            return
+        self._chunks[row] = None
+        # a replaced chunk's id already points at its new row
+        if self._row_of.get(chunk["uuid"]) == row:
+            del self._row_of[chunk["uuid"]]
+        self._rows_of_source[chunk.get("source_file")].discard(row)
+        if self._live is None:
+            self._live = np.ones(len(self._chunks), dtype=bool)
+        self._live[row] = False
+
+    def _refresh(self):
+        """Loads what another process (e.g. the ingest command) has written since the last load."""
+        try:
+            stat = os.stat(self._meta_path)
+            stat = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            stat = None
+        if stat != self._loaded_stat:
+            self._load()
+            # the writer has already recorded the new corpus version
+            notify_corpus_reloaded(self.name)
+
+    def _append(self, new_vectors, new_chunks, deleted_rows):
+        """Commits new rows and deletions; rewrites the index instead if it is due for compaction."""
+        deleted_rows = sorted(set(deleted_rows))
+        rows = self._rows + len(new_chunks)
+        if self._generation is None or self._deleted_count + len(deleted_rows) > COMPACT_RATIO * rows:
+            self._rewrite(new_vectors, new_chunks, deleted_rows)
+            return
+
+        lines = b"".join(json.dumps(chunk).encode("utf-8") + b"\n" for chunk in new_chunks)
+        vectors = b"" if new_vectors is None else np.ascontiguousarray(new_vectors, dtype=np.float32).tobytes()
+        self._append_bytes("f32", self._rows * self.embedder.dim * 4, vectors)
+        self._append_bytes("jsonl", self._chunk_bytes, lines)
+        self._append_bytes("del", self._deleted_count * 8, np.asarray(deleted_rows, dtype=np.int64).tobytes())
+        self._commit({
+            "generation": self._generation,
+            "rows": rows,
+            "chunk_bytes": self._chunk_bytes + len(lines),
+            "deleted": self._deleted_count + len(deleted_rows),
+        })
+        self._load()
+
+    def _append_bytes(self, kind, committed, data):
+        # whatever an interrupted write left past the committed length is overwritten
+        with open(self._file(self._generation, kind), "r+b") as f:
+            f.truncate(committed)
+            f.seek(committed)
+            f.write(data)
+
+    def _rewrite(self, new_vectors=None, new_chunks=(), deleted_rows=()):
+        """Writes the live rows, less deleted_rows, and the new ones as a new generation."""
+        drop = set(deleted_rows)
+        keep = [row for row, chunk in enumerate(self._chunks) if chunk is not None and row not in drop]
+        vectors = np.asarray(self._vectors, dtype=np.float32)[keep]
+        if new_vectors is not None:
+            vectors = np.vstack([vectors, new_vectors])
+        chunks = [self._chunks[row] for row in keep] + list(new_chunks)
+
+        old_files = self._files_on_disk()
+        generation = uuid_lib.uuid4().hex
+        lines = b"".join(json.dumps(chunk).encode("utf-8") + b"\n" for chunk in chunks)
+        with open(self._file(generation, "f32"), "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self._file(generation, "jsonl"), "wb") as f:
+            f.write(lines)
+        open(self._file(generation, "del"), "wb").close()
+        self._commit({"generation": generation, "rows": len(chunks), "chunk_bytes": len(lines), "deleted": 0})
+
+        # readers that already mapped the old files keep them until they reload
+        for old_file in old_files:
+            try:
+                os.remove(old_file)
+            except OSError:
+                pass
+        self._clear_state()
+        self._load()
+
+    def _commit(self, counts):
+        meta = {"version": INDEX_VERSION, "model_id": self.embedder.model_id, "dim": self.embedder.dim, **counts}
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _files_on_disk(self):
+        """The data files the committed N.json refers to."""
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if meta.get("version") == 1:
+            return [os.path.join(self.path, meta["vectors_file"])]
+        if "generation" in meta:
+            return [self._file(meta["generation"], kind) for kind in ("f32", "jsonl", "del")]
+        return []
+
+    def _bm25_scores(self, query_text):
+        """BM25 score of every chunk for query_text; the inverted index is built on first use."""
+        if self._bm25 is None:
+            self._bm25 = _build_bm25(self._chunks)
+        postings, doc_lengths, avg_length = self._bm25
+        scores = np.zeros(len(self._chunks), dtype=np.float32)
+        for term in set(tokenize(query_text)):
+            if term not in postings:
+                continue
+            docs, freqs = postings[term]
+            idf = math.log(1 + (len(self._row_of) - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[docs] / avg_length)
+            scores[docs] += idf * freqs * (BM25_K1 + 1) / (freqs + norm)
+        return scores
+
+
+def _build_bm25(chunks):
+    """
+    Returns (postings, doc_lengths, avg_length); postings maps term -> (doc indices,
+    term frequencies). Deleted chunks (None) have no terms and don't count toward the average length.
+    """
+    term_docs = {}
+    doc_lengths = np.zeros(len(chunks), dtype=np.float32)
+    for i, chunk in enumerate(chunks):
+        if chunk is None:
+            continue
+        tokens = tokenize(chunk["text_chunk"])
+        doc_lengths[i] = len(tokens)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            term_docs.setdefault(token, ([], []))
+            term_docs[token][0].append(i)
+            term_docs[token][1].append(count)
+
+    postings = {
+        term: (np.array(docs, dtype=np.int64), np.array(freqs, dtype=np.float32))
+        for term, (docs, freqs) in term_docs.items()
+    }
+    live_count = sum(chunk is not None for chunk in chunks)
+    avg_length = float(doc_lengths.sum()) / live_count if live_count and doc_lengths.sum() > 0 else 1.0
+    return postings, doc_lengths, avg_length
+
+
+def _min_max(scores, live=None):
+    """Scales scores to 0-1, like Weaviate's relative score fusion; live masks out deleted rows."""
+    considered = scores if live is None else scores[live]
+    low, high = float(considered.min()), float(considered.max())
+    if high == low:
+        return np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+
+def _reciprocal_ranks(scores, live=None):
+    """1 / (RRF_K + rank) for every score, rank 0 being the best; deleted rows (see live) rank last."""
+    if live is not None:
+        scores = np.where(live, scores, -np.inf)
+    ranks = np.empty(len(scores), dtype=np.float32)
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(len(scores), dtype=np.float32)
+    return 1.0 / (RRF_K + ranks)
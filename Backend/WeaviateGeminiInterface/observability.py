@@ -0,0 +1,215 @@
+"""
+Logging, request ids, stage timing spans and Prometheus-style metrics.
+
+Every log record carries the id of the request it belongs to. The id lives in a
+contextvar, so it follows the request through awaits; code that hands work to a
+thread pool must run it in a copy of the context (see rag_adaptor.run_blocking).
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+request_id_var = ContextVar("request_id", default="-")
+# per-request {stage: milliseconds}, filled by span() while collect_stage_timings() is active
+_stage_timings = ContextVar("stage_timings", default=None)
+
+logger = logging.getLogger(__name__)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request id to every record."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request id, message and any `extra` fields."""
+
+    _STANDARD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self._STANDARD})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level="INFO", json_format=True):
+    """Sets up the root logger: JSON lines for the API, readable text for the command line."""
+    handler = logging.StreamHandler()
+    handler.addFilter(RequestIdFilter())
+    if json_format:
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s", "%H:%M:%S"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+
+# --- metrics -------------------------------------------------------------------
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [cumulative bucket counts, sum, count]
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_sample(self, key, value):
+        counts, total, count = value
+        lines = []
+        for bound, bucket_count in zip(self.buckets, counts):
+            labels = _label_text(self.labelnames + ("le",), key + (bound,))
+            lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+        lines.append(f"{self.name}_bucket{_label_text(self.labelnames + ('le',), key + ('+Inf',))} {count}")
+        lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+        lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines
+
+
+REGISTRY = []
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("rag_stage_duration_seconds", "Time spent in each RAG pipeline stage.", ["stage"])
+STAGE_ERRORS = Counter("rag_stage_errors_total", "RAG pipeline stages that raised.", ["stage"])
+RAG_IN_FLIGHT = Gauge("rag_queries_in_flight", "RAG queries currently being answered.")
+CACHE_LOOKUPS = Counter("rag_answer_cache_lookups_total", "Answer cache lookups by result.", ["result"])
+RETRIEVAL_CACHE_LOOKUPS = Counter("rag_retrieval_cache_lookups_total",
+                                  "Retrieval cache lookups by result (hit, miss, stale).", ["result"])
+GEMINI_TOKENS = Counter("gemini_tokens_total", "Gemini tokens used, by kind (prompt or output).", ["kind"])
+GEMINI_REQUESTS = Counter("gemini_scheduler_requests_total",
+                          "Generation requests by outcome (sent, coalesced, shed).", ["outcome"])
+GEMINI_RETRY_ATTEMPTS = Counter("gemini_retries_total", "Gemini calls retried after a transient error.")
+GEMINI_WAITING = Gauge("gemini_scheduler_waiting", "Gemini calls waiting for a rate-limit token.")
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled.")
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency until the response starts.",
+                         ["method", "path", "status"])
+
+
+def collect_stage_timings():
+    """Starts collecting span durations for the current request; returns the {stage: ms} dict they go to."""
+    timings = {}
+    _stage_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def span(stage, **fields):
+    """
+    Times one pipeline stage: records it in rag_stage_duration_seconds, adds it to
+    the request's stage timings and logs it at debug level.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage=stage)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + duration * 1000, 2)
+        logger.debug("stage %s took %.1f ms", stage, duration * 1000,
+                     extra={"stage": stage, "duration_ms": round(duration * 1000, 2), **fields})
+
+
+def record_gemini_usage(usage_metadata):
+    """Adds a Gemini response's usage metadata to gemini_tokens_total."""
+    if usage_metadata is None:
+        return
+    GEMINI_TOKENS.inc(getattr(usage_metadata, "prompt_token_count", 0) or 0, kind="prompt")
+    GEMINI_TOKENS.inc(getattr(usage_metadata, "candidates_token_count", 0) or 0, kind="output")
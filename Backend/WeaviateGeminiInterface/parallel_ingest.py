@@ -0,0 +1,193 @@
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+
+from .pdf_processor import extract_pdf_pages
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("table_scan", "camelot", "redaction", "text_extraction", "chunking")
+
+
+def _process_shard(file_path, first_page, last_page, chunking):
+    """Worker entry point: extracts one page range and never raises, so one bad shard can't kill the pool."""
+    try:
+        return extract_pdf_pages(file_path, first_page, last_page, chunking)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def list_pdf_files(directory_path):
+    """Returns the paths of the PDFs in directory_path, in the order process_pdfs_in_directory uses."""
+    return [
+        os.path.join(directory_path, filename)
+        for filename in os.listdir(directory_path)
+        if filename.lower().endswith(".pdf")
+    ]
+
+
+def plan_shards(file_paths, pages_per_shard=10):
+    """
+    Splits every PDF into page ranges.
+    Returns (filenames, shards), where shards are (filename, file_path, first_page, last_page).
+    """
+    filenames = []
+    shards = []
+    for file_path in file_paths:
+        filename = os.path.basename(file_path)
+        try:
+            with fitz.open(file_path) as doc:
+                page_count = doc.page_count
+        except Exception as e:
+            logger.error(f"Error processing {filename}: {e}")
+            continue
+
+        filenames.append(filename)
+        for first_page in range(1, page_count + 1, pages_per_shard):
+            last_page = min(first_page + pages_per_shard - 1, page_count)
+            shards.append((filename, file_path, first_page, last_page))
+    return filenames, shards
+
+
+def process_pdfs_parallel(directory_path, workers=None, pages_per_shard=10, return_timings=False, chunking=None):
+    """
+    Process-pool version of process_pdfs_in_directory. Every file is split into
+    page ranges that are extracted concurrently, then merged back in file and page
+    order (all of a file's tables, then its page texts), so the output is identical
+    to the serial path. A file with a failing shard is skipped as a whole, as the
+    serial path would.
+    With return_timings=True returns (data_objects, timings), where timings holds
+    the summed per-stage seconds per file and overall.
+    """
+    if not os.path.isdir(directory_path):
+        logger.error(f"Directory '{directory_path}' not found.")
+        return ([], {}) if return_timings else []
+
+    return process_files_parallel(list_pdf_files(directory_path), workers, pages_per_shard, return_timings, chunking)
+
+
+def process_files_parallel(file_paths, workers=None, pages_per_shard=10, return_timings=False, chunking=None):
+    """process_pdfs_parallel for an explicit list of PDF paths."""
+    start = time.perf_counter()
+    all_data_objects = []
+    timings = {"files": {}, "total": dict.fromkeys(STAGES, 0.0)}
+    for file_result in iter_files_parallel(file_paths, workers, pages_per_shard, chunking):
+        if file_result["error"]:
+            logger.error(f"Error processing {file_result['filename']}: {file_result['error']}")
+            continue
+
+        all_data_objects.extend(file_result["objects"])
+        timings["files"][file_result["filename"]] = {**file_result["timings"], **file_result["pages"]}
+        for stage in STAGES:
+            timings["total"][stage] += file_result["timings"][stage]
+
+    timings["wall"] = time.perf_counter() - start
+    logger.info(f"Extraction timings:\n{format_timing_report(timings)}")
+    logger.info(f"Total data chunks processed from all files: {len(all_data_objects)}")
+
+    if return_timings:
+        return all_data_objects, timings
+    return all_data_objects
+
+
+def iter_files_parallel(file_paths, workers=None, pages_per_shard=10, chunking=None):
+    """
+    Extracts PDFs on a process pool and yields one result per file, in input order:
+    {"filename", "objects", "timings", "pages", "error"}, where pages lists the
+    table_pages Camelot looked at and the skipped_pages it didn't. At most two shards per worker are
+    queued at a time, so a slow consumer (e.g. a Weaviate batch) holds back parsing
+    instead of letting finished shards pile up in memory.
+    """
+    filenames, shards = plan_shards(file_paths, pages_per_shard)
+    workers = workers or os.cpu_count() or 1
+    max_pending = 2 * workers
+    logger.info(f"Processing {len(filenames)} file(s) as {len(shards)} shard(s) on {workers} worker(s)...")
+
+    shard_counts = {filename: 0 for filename in filenames}
+    for shard in shards:
+        shard_counts[shard[0]] += 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        queued = iter(shards)
+        pending = deque()
+
+        def fill():
+            while len(pending) < max_pending:
+                shard = next(queued, None)
+                if shard is None:
+                    return
+                pending.append(executor.submit(_process_shard, shard[1], shard[2], shard[3], chunking))
+
+        fill()
+        for filename in filenames:
+            results = []
+            for _ in range(shard_counts[filename]):
+                results.append(pending.popleft().result())
+                fill()
+            yield _merge_file_results(filename, results)
+
+
+def _merge_file_results(filename, results):
+    """Merges a file's shard results in page order: all of its tables, then its page texts."""
+    errors = [result["error"] for result in results if "error" in result]
+    if errors:
+        return {"filename": filename, "objects": None, "timings": None, "pages": None, "error": errors[0]}
+
+    objects = []
+    file_timings = dict.fromkeys(STAGES, 0.0)
+    pages = {"table_pages": [], "skipped_pages": []}
+    for result in results:
+        objects.extend(result["tables"])
+        for stage in STAGES:
+            file_timings[stage] += result["timings"][stage]
+        for key in pages:
+            pages[key].extend(result[key])
+    for result in results:
+        objects.extend(result["texts"])
+    return {"filename": filename, "objects": objects, "timings": file_timings, "pages": pages, "error": None}
+
+
+def _page_ranges(page_numbers):
+    """[1, 2, 3, 7, 9, 10] -> "1-3,7,9-10"."""
+    ranges = []
+    for page_num in page_numbers:
+        if ranges and page_num == ranges[-1][1] + 1:
+            ranges[-1][1] = page_num
+        else:
+            ranges.append([page_num, page_num])
+    return ",".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+def format_timing_report(timings):
+    """
+    Formats the per-file and total seconds spent in each extraction stage, the pages
+    the table scan kept away from Camelot, and the Camelot time that saved. The
+    saving is an estimate: skipped pages times the run's Camelot seconds per page
+    it did look at.
+    """
+    files = timings["files"]
+    total = timings["total"]
+    scanned = sum(len(stages.get("table_pages", ())) for stages in files.values())
+    per_page = total["camelot"] / scanned if scanned else 0.0
+
+    lines = [f"{'file':<40} {'scan':>6} {'camelot':>9} {'redaction':>10} {'text':>8} {'chunking':>9} "
+             f"{'skipped':>8} {'saved':>7}"]
+    skipped_total = 0
+    for filename, stages in files.items():
+        skipped = len(stages.get("skipped_pages", ()))
+        skipped_total += skipped
+        lines.append(f"{filename[:40]:<40} {stages['table_scan']:>6.2f} {stages['camelot']:>9.2f} "
+                     f"{stages['redaction']:>10.2f} {stages['text_extraction']:>8.2f} {stages['chunking']:>9.2f} "
+                     f"{skipped:>8} {skipped * per_page:>7.2f}")
+    lines.append(f"{'total (CPU seconds across workers)':<40} {total['table_scan']:>6.2f} {total['camelot']:>9.2f} "
+                 f"{total['redaction']:>10.2f} {total['text_extraction']:>8.2f} {total['chunking']:>9.2f} "
+                 f"{skipped_total:>8} {skipped_total * per_page:>7.2f}")
+    for filename, stages in files.items():
+        if stages.get("skipped_pages"):
+            lines.append(f"  {filename}: Camelot skipped pages {_page_ranges(stages['skipped_pages'])}")
+    lines.append(f"Wall time: {timings['wall']:.2f}s")
+    return "\n".join(lines)
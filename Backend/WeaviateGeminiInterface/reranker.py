@@ -0,0 +1,136 @@
+"""
+Optional rerank stage between retrieval and generation. When enabled, retrieval
+over-fetches RERANK_CANDIDATES chunks, a reranker scores each against the query,
+and only the chunks scoring at least RERANK_THRESHOLD, and at least
+RERANK_RELATIVE_THRESHOLD of the best score, are passed on, up to the request's
+top-k. Easy questions with one clearly matching chunk thus send one or two
+chunks to Gemini instead of all top-k.
+"""
+import inspect
+import logging
+import math
+import os
+import threading
+
+from .embeddings import tokenize
+
+logger = logging.getLogger(__name__)
+
+# empty disables reranking; "lexical" is LexicalReranker; anything else names a
+# sentence-transformers cross-encoder run locally on the CPU, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2
+RERANKER = os.getenv("RERANKER", "")
+# chunks retrieved for the reranker to choose from
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+# lowest score (0-1) a chunk may have, and lowest share of the best chunk's score; both
+# rerankers score in [0, 1] (a cross-encoder's logits go through a sigmoid)
+RERANK_THRESHOLD = float(os.getenv("RERANK_THRESHOLD", "0.3"))
+RERANK_RELATIVE_THRESHOLD = float(os.getenv("RERANK_RELATIVE_THRESHOLD", "0.8"))
+
+
+class LexicalReranker:
+    """
+    Dependency-free reranker: a chunk's score is the share of the query's terms it
+    contains, each term weighted by how rare it is among the candidates, so a chunk
+    holding the one distinctive term outranks chunks sharing only common ones.
+    """
+
+    model_id = "lexical-v1"
+
+    def score(self, query, texts):
+        """Returns one score in [0, 1] per text."""
+        terms = set(tokenize(query))
+        token_sets = [set(tokenize(text)) for text in texts]
+        if not terms:
+            return [0.0] * len(texts)
+        weights = {term: math.log(1 + len(texts) / (1 + sum(term in tokens for tokens in token_sets)))
+                   for term in terms}
+        total = sum(weights.values())
+        return [sum(weight for term, weight in weights.items() if term in tokens) / total for tokens in token_sets]
+
+
+class CrossEncoderReranker:
+    """
+    A sentence-transformers cross-encoder run locally on the CPU, which reads query
+    and chunk together. Needs the optional sentence-transformers package, which is
+    only imported when this is created. Cross-encoders such as the ms-marco models
+    output unbounded logits (often negative), so score() puts them through a sigmoid
+    to make RERANK_THRESHOLD and RERANK_RELATIVE_THRESHOLD mean the same as with
+    LexicalReranker. model, if given, is a loaded CrossEncoder returning logits.
+    """
+
+    def __init__(self, model_name, batch_size=32, device="cpu", model=None):
+        self._predict_options = {}
+        if model is None:
+            try:
+                import torch
+                from sentence_transformers import CrossEncoder
+            except ImportError as e:
+                raise ImportError(
+                    f"RERANKER={model_name} needs sentence-transformers: pip install sentence-transformers"
+                ) from e
+            model = CrossEncoder(model_name, device=device)
+            # ask for the logits whatever activation the model config names; the
+            # argument was renamed from activation_fct in sentence-transformers 4
+            parameters = inspect.signature(model.predict).parameters
+            activation = "activation_fn" if "activation_fn" in parameters else "activation_fct"
+            self._predict_options = {activation: torch.nn.Identity()}
+        self.model = model
+        self.model_id = f"cross-encoder:{model_name}"
+        self.batch_size = batch_size
+
+    def score(self, query, texts):
+        """Returns one score in (0, 1) per text."""
+        if not texts:
+            return []
+        logits = self.model.predict([(query, text) for text in texts], batch_size=self.batch_size,
+                                    show_progress_bar=False, **self._predict_options)
+        return [sigmoid(float(logit)) for logit in logits]
+
+
+def sigmoid(x):
+    """Logistic function, without overflowing for large negative x."""
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    exp_x = math.exp(x)
+    return exp_x / (1.0 + exp_x)
+
+
+def rerank(query, chunks, reranker, max_chunks, threshold=None, relative_threshold=None):
+    """
+    Orders chunks by reranker score and keeps at most max_chunks of them, dropping
+    those below threshold or below relative_threshold times the best score. The best
+    chunk is always kept, so there is something to answer from. Kept chunks get the
+    reranker's score as "score" and their retrieval score as "retrieval_score".
+    """
+    threshold = RERANK_THRESHOLD if threshold is None else threshold
+    relative_threshold = RERANK_RELATIVE_THRESHOLD if relative_threshold is None else relative_threshold
+    if not chunks:
+        return []
+
+    scores = reranker.score(query, [chunk["text_chunk"] for chunk in chunks])
+    # ties keep the retrieval order
+    ranked = sorted(zip(scores, range(len(chunks))), key=lambda pair: -pair[0])
+    floor = max(threshold, ranked[0][0] * relative_threshold)
+    kept = [
+        {**chunks[i], "score": score, "retrieval_score": chunks[i].get("score")}
+        for n, (score, i) in enumerate(ranked[:max_chunks]) if n == 0 or score >= floor
+    ]
+    logger.info(f"Reranked {len(chunks)} candidate(s) with {reranker.model_id}; kept {len(kept)}.",
+                extra={"rerank_candidates": len(chunks), "rerank_kept": len(kept)})
+    return kept
+
+
+_RERANKERS = {}
+_RERANKERS_LOCK = threading.Lock()
+
+
+def get_reranker(name=None):
+    """The reranker for name (default: RERANKER), or None when reranking is off. Each model is loaded once per process."""
+    name = RERANKER if name is None else name
+    if not name:
+        return None
+    with _RERANKERS_LOCK:
+        if name not in _RERANKERS:
+            _RERANKERS[name] = LexicalReranker() if name == "lexical" else CrossEncoderReranker(name)
+            logger.info(f"Reranking retrieved chunks with '{_RERANKERS[name].model_id}'.")
+        return _RERANKERS[name]
@@ -0,0 +1,101 @@
+"""
+Retrieval backends. Each one offers the same operations, so ingestion and the
+RAG workflow don't care where the chunks live:
+
+    name                                            collection name
+    kind                                            "weaviate" or "local"
+    ingest(data_objects, uuids=None, batch_size=None) -> True if every object was written
+    retrieve(query_text, limit=3, with_metadata=False, mode=..., alpha=..., fusion=..., score_cutoff=...)
+    delete_by_source(source_file, keep_ids=None)
+    close()
+
+"weaviate" is Weaviate Cloud, vectorizing server-side unless EMBEDDING_MODEL
+names a client-side embedder (see embeddings.get_embedder); "local" is a
+memory-mapped NumPy index on disk (see local_index.py) that works offline.
+local_index (and with it NumPy) is only imported when the local backend is used.
+"""
+import logging
+import os
+
+from .embeddings import get_embedder
+from .weaviate_handler import (
+    connect_to_weaviate,
+    get_or_create_collection,
+    ingest_data,
+    retrieve_chunks,
+    delete_chunks_from_source,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("weaviate", "local")
+DEFAULT_BACKEND = os.getenv("RETRIEVAL_BACKEND", "weaviate")
+DEFAULT_LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "local_index"
+)
+
+
+class WeaviateBackend:
+    """
+    The backend interface over a Weaviate collection handle. With an embedder,
+    chunks and queries are embedded on this machine instead of by Weaviate.
+    """
+
+    kind = "weaviate"
+
+    def __init__(self, collection, client=None, embedder=None):
+        self.collection = collection
+        self.name = collection.name
+        self.embedder = embedder
+        # only set when this backend opened the client and should close it
+        self._client = client
+
+    def ingest(self, data_objects, uuids=None, batch_size=None):
+        return ingest_data(self.collection, data_objects, uuids=uuids, batch_size=batch_size, embedder=self.embedder)
+
+    def retrieve(self, query_text, limit=3, with_metadata=False, **search):
+        return retrieve_chunks(self.collection, query_text, limit=limit, with_metadata=with_metadata,
+                               embedder=self.embedder, **search)
+
+    def delete_by_source(self, source_file, keep_ids=None):
+        delete_chunks_from_source(self.collection, source_file, keep_ids=keep_ids)
+
+    def close(self):
+        if self._client is not None and self._client.is_connected():
+            self._client.close()
+            logger.info("Connection to Weaviate closed.")
+
+
+def as_backend(collection_or_backend):
+    """Wraps a bare Weaviate collection in WeaviateBackend; backends are returned as they are."""
+    if hasattr(collection_or_backend, "delete_by_source"):
+        return collection_or_backend
+    return WeaviateBackend(collection_or_backend)
+
+
+def open_backend(backend=None, collection_name="VIT_docs", fresh_start=False, index_path=None):
+    """
+    Opens a backend with its own connection, for ingestion and scripts; the caller
+    must close() it. fresh_start empties the collection first.
+    Chunks are embedded with embeddings.get_embedder() when EMBEDDING_MODEL is set.
+    Returns None if Weaviate is unreachable.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown retrieval backend '{backend}'. Choose from {', '.join(BACKENDS)}.")
+
+    if backend == "local":
+        from .local_index import LocalIndex
+        return LocalIndex(index_path or DEFAULT_LOCAL_INDEX_PATH, collection_name, embedder=get_embedder(),
+                          fresh_start=fresh_start)
+
+    client = connect_to_weaviate()
+    if not client:
+        return None
+    embedder = get_embedder()
+    collection = get_or_create_collection(client, collection_name, fresh_start=fresh_start,
+                                          self_provided=embedder is not None)
+    if collection is None:
+        client.close()
+        return None
+    return WeaviateBackend(collection, client=client, embedder=embedder)
@@ -0,0 +1,145 @@
+"""
+Cache of retrieval results, in front of the backend search. Repeated and trivially
+different questions (case, punctuation, spacing) reuse the chunks found the first
+time instead of embedding and searching again. Entries are tagged with the
+collection's corpus version (see corpus_events) and dropped once it changes, so
+an ingest or deletion, even by the ingest command in another process, is seen
+on the next lookup.
+
+CacheWarmer fills the cache for a list of popular questions at startup and again
+after every corpus change, so the first users after a deploy or an ingest don't
+pay for cold retrieval.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .corpus_events import corpus_version, on_corpus_change
+from .observability import RETRIEVAL_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# most search results kept (0 disables the cache), and seconds before one is searched again anyway
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2000"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "86400"))
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases, drops punctuation and collapses whitespace so trivial variants share a key."""
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+
+class RetrievalCache:
+    """
+    LRU map from (backend, normalized query, search settings) to the chunks the
+    search returned, each entry tagged with the corpus version it was found in.
+    """
+
+    def __init__(self, max_entries=2000, ttl=86400.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (corpus version, chunks, expires_at)
+        self._lock = threading.Lock()
+
+    def fetch(self, backend, query, settings, search):
+        """
+        Returns the chunks for query on backend, from the cache if they were found
+        in the current corpus version, otherwise from search() (which is then cached
+        unless it found nothing).
+        Every call returns new chunk dicts, so callers may modify them.
+        """
+        key = (backend.kind, backend.name, normalize_query(query), json.dumps(settings, sort_keys=True))
+        # taken before searching: a change during the search must not be cached as current
+        version = corpus_version(backend.name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and entry[2] >= time.time():
+                self._entries.move_to_end(key)
+                RETRIEVAL_CACHE_LOOKUPS.inc(result="hit")
+                return [dict(chunk) for chunk in entry[1]]
+            if entry is not None:
+                del self._entries[key]
+        RETRIEVAL_CACHE_LOOKUPS.inc(result="miss" if entry is None else "stale")
+
+        chunks = search()
+        if not chunks:
+            # backends log and swallow query errors into [], so an empty result may be a
+            # failed search; it is cheap to repeat, while caching it would hide the corpus
+            return chunks
+        with self._lock:
+            self._entries[key] = (version, tuple(dict(chunk) for chunk in chunks), time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return chunks
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def load_warmup_queries(path):
+    """Reads the popular questions, one per line (blank lines and # comments skipped); [] if the file is missing."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+    except FileNotFoundError:
+        return []
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+class CacheWarmer:
+    """
+    Background thread that calls warm() once at start and again whenever the corpus
+    version of one of collection_names changes: right away for changes made in this
+    process, within interval seconds for changes made by another one.
+    """
+
+    def __init__(self, warm, collection_names, interval=30.0):
+        self.warm = warm
+        self.collection_names = list(collection_names)
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        on_corpus_change(self._on_change)
+        self._thread = threading.Thread(target=self._run, name="retrieval-warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _on_change(self, collection_name):
+        if collection_name in self.collection_names:
+            self._wake.set()
+
+    def _versions(self):
+        return [corpus_version(name) for name in self.collection_names]
+
+    def _run(self):
+        warmed = None
+        while not self._stopped.is_set():
+            versions = self._versions()
+            if versions != warmed:
+                try:
+                    self.warm()
+                    warmed = versions
+                except Exception as e:
+                    # retried on the next tick
+                    logger.error(f"Retrieval cache warmup failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
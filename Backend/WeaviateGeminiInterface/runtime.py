@@ -0,0 +1,220 @@
+import logging
+import random
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from .weaviate_handler import connect_to_weaviate, get_or_create_collection
+from .retrieval_backends import BACKENDS, DEFAULT_BACKEND, DEFAULT_LOCAL_INDEX_PATH, WeaviateBackend
+from .embeddings import get_embedder
+from .reranker import get_reranker
+from .chunk_store import open_chunk_store
+from . import gemini_handler
+
+logger = logging.getLogger(__name__)
+
+
+class RAGRuntime:
+    """
+    Long-lived connections shared by every request: one Weaviate client,
+    one configured Gemini model and the collection handles built on top of them.
+    With backend="local" chunks are served from local indexes at local_index_path
+    instead, and no Weaviate connection is opened.
+    Requests search collection_name unless they name others; collections lists every
+    collection they may name (collection_name is always allowed). Handles are opened
+    on first use and kept until the connection drops. Queries are embedded on this
+    machine when EMBEDDING_MODEL is set (see embeddings.get_embedder), and retrieved
+    chunks are reranked when RERANKER is set (see reranker.get_reranker).
+    """
+
+    def __init__(self, collection_name="VIT_docs", health_check_interval=30.0,
+                 reconnect_attempts=5, reconnect_backoff=0.5, max_backoff=10.0,
+                 backend=None, local_index_path=None, collections=None):
+        self.backend = backend or DEFAULT_BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown retrieval backend '{self.backend}'. Choose from {', '.join(BACKENDS)}.")
+        self.local_index_path = local_index_path or DEFAULT_LOCAL_INDEX_PATH
+        self.collection_name = collection_name
+        self.collections = list(dict.fromkeys([collection_name, *(collections or [])]))
+        self.health_check_interval = health_check_interval
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_backoff = reconnect_backoff
+        self.max_backoff = max_backoff
+
+        self.client = None
+        self.model = None
+        self.embedder = None
+        self.reranker = None
+        self._collections = {}
+        self._local_indexes = {}
+        self._chunk_stores = {}
+        self._last_healthy = 0.0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Configures Gemini and opens the shared Weaviate connection (or loads the local index)."""
+        load_dotenv()
+        if not gemini_handler.configure_gemini():
+            raise RuntimeError("Gemini could not be configured. Check GEMINI_API_KEY/GEMINI_MODEL.")
+        self.model = gemini_handler.GEMINI_MODEL
+        self.embedder = get_embedder()
+        self.reranker = get_reranker()
+
+        with self._lock:
+            if self.backend == "local":
+                self._open_local_index(self.collection_name)
+            else:
+                self._reconnect()
+        return self
+
+    def get_backend(self, collection_name=None):
+        """
+        Returns the retrieval backend (see retrieval_backends) requests should query
+        for collection_name (default: the runtime's collection_name).
+        """
+        if self.backend == "local":
+            collection_name = self._check_name(collection_name)
+            with self._lock:
+                index = self._local_indexes.get(collection_name)
+                return index if index is not None else self._open_local_index(collection_name)
+        return WeaviateBackend(self.get_collection(collection_name), embedder=self.embedder)
+
+    def get_collection(self, collection_name=None):
+        """
+        Returns the shared handle of collection_name (default: the runtime's
+        collection_name), probing the connection at most once per
+        health_check_interval and reconnecting with backoff if it has dropped.
+        """
+        collection_name = self._check_name(collection_name)
+        with self._lock:
+            if self.client is None or time.monotonic() - self._last_healthy >= self.health_check_interval:
+                if self.client is not None and self._is_healthy():
+                    self._last_healthy = time.monotonic()
+                else:
+                    logger.warning("Weaviate connection is not healthy. Reconnecting...")
+                    self._reconnect()
+
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                collection = get_or_create_collection(self.client, collection_name,
+                                                      self_provided=self.embedder is not None)
+                if collection is None:
+                    raise ConnectionError(f"Could not open collection '{collection_name}'.")
+                self._collections[collection_name] = collection
+            return collection
+
+    def mark_unhealthy(self):
+        """Forces the next get_collection() call to re-check the connection."""
+        self._last_healthy = 0.0
+
+    def get_chunk_store(self, collection_name=None):
+        """
+        The chunk store (see chunk_store.py) ingestion keeps for collection_name (default:
+        the runtime's collection_name), opened read-only on first use, or None if nothing
+        has been stored for it yet.
+        """
+        collection_name = self._check_name(collection_name)
+        with self._lock:
+            store = self._chunk_stores.get(collection_name)
+            if store is None:
+                store = open_chunk_store(collection_name, self.backend, readonly=True)
+                if store is not None:
+                    self._chunk_stores[collection_name] = store
+            return store
+
+    def close(self):
+        """Closes the shared Weaviate client, the local indexes and the chunk stores."""
+        with self._lock:
+            self._close_client()
+            for index in self._local_indexes.values():
+                index.close()
+            self._local_indexes = {}
+            for store in self._chunk_stores.values():
+                store.close()
+            self._chunk_stores = {}
+
+    def _check_name(self, collection_name):
+        collection_name = collection_name or self.collection_name
+        if collection_name not in self.collections:
+            raise ValueError(f"Unknown collection '{collection_name}'. Choose from {', '.join(self.collections)}.")
+        return collection_name
+
+    def _open_local_index(self, collection_name):
+        from .local_index import LocalIndex
+        index = LocalIndex(self.local_index_path, collection_name, embedder=self.embedder)
+        self._local_indexes[collection_name] = index
+        logger.info(f"Loaded local index '{collection_name}' ({len(index)} chunk(s)).")
+        return index
+
+    def _is_healthy(self):
+        try:
+            return self.client is not None and self.client.is_connected() and self.client.is_ready()
+        except Exception as e:
+            logger.error(f"Weaviate health check failed: {e}")
+            return False
+
+    def _reconnect(self):
+        self._close_client()
+        delay = self.reconnect_backoff
+        for attempt in range(1, self.reconnect_attempts + 1):
+            client = connect_to_weaviate()
+            if client:
+                collection = get_or_create_collection(client, self.collection_name,
+                                                      self_provided=self.embedder is not None)
+                if collection is not None:
+                    self.client = client
+                    # handles of the old client are useless now
+                    self._collections = {self.collection_name: collection}
+                    self._last_healthy = time.monotonic()
+                    return
+                client.close()
+
+            if attempt < self.reconnect_attempts:
+                # full jitter keeps several workers from reconnecting in lockstep
+                sleep_for = random.uniform(0, delay)
+                logger.info(f"Retrying Weaviate connection in {sleep_for:.2f}s (attempt {attempt}/{self.reconnect_attempts})...")
+                time.sleep(sleep_for)
+                delay = min(delay * 2, self.max_backoff)
+
+        raise ConnectionError(f"Could not connect to Weaviate after {self.reconnect_attempts} attempts.")
+
+    def _close_client(self):
+        if self.client is not None:
+            try:
+                if self.client.is_connected():
+                    self.client.close()
+                    logger.info("Connection to Weaviate closed.")
+            except Exception as e:
+                logger.error(f"Error closing Weaviate client: {e}")
+            self.client = None
+        self._collections = {}
+
+
+_RUNTIME = None
+_RUNTIME_LOCK = threading.Lock()
+
+
+def init_runtime(**kwargs):
+    """Creates and starts the process-wide runtime. Called once from the API lifespan."""
+    global _RUNTIME
+    with _RUNTIME_LOCK:
+        if _RUNTIME is None:
+            _RUNTIME = RAGRuntime(**kwargs).start()
+        return _RUNTIME
+
+
+def get_runtime():
+    """Returns the process-wide runtime, starting it with defaults if the lifespan did not."""
+    if _RUNTIME is None:
+        return init_runtime()
+    return _RUNTIME
+
+
+def shutdown_runtime():
+    """Closes the process-wide runtime, if one was started."""
+    global _RUNTIME
+    with _RUNTIME_LOCK:
+        if _RUNTIME is not None:
+            _RUNTIME.close()
+            _RUNTIME = None
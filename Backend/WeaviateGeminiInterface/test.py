@@ -6,8 +6,6 @@ from weaviate.exceptions import WeaviateQueryError, WeaviateConnectionError
 from weaviate.classes.query import Filter
 from dotenv import load_dotenv
 
-load_dotenv()
-
 # Weaviate Configuration from environment variables
 
 
@@ -132,16 +130,19 @@ def delete_chunks_from_source(collection, source_filename):
         print(f"❌ An error occurred during deletion: {e}")
 
 
-client = connect_to_weaviate()
-if client:
-    try:
-        name = get_or_create_collection(client, "VIT_docs", True)
-        print(name)
-
-        if name is None:
-            print("BOOLEAN ISSUE")
-        else:
-            print("done")
-        client.close()
-    except Exception as e:
-        print(e)
+# manual check that drops and recreates the collection; only runs when executed directly
+if __name__ == "__main__":
+    load_dotenv()
+    client = connect_to_weaviate()
+    if client:
+        try:
+            name = get_or_create_collection(client, "VIT_docs", True)
+            print(name)
+
+            if name is None:
+                print("BOOLEAN ISSUE")
+            else:
+                print("done")
+            client.close()
+        except Exception as e:
+            print(e)
@@ -1,13 +1,33 @@
+import logging
 import os
+from itertools import islice
+
 import weaviate
 from weaviate.classes.init import Auth
 from weaviate.classes.config import Configure, Property, DataType
 from weaviate.exceptions import WeaviateQueryError, WeaviateConnectionError
-from weaviate.classes.query import Filter
+from weaviate.classes.query import Filter, HybridFusion, MetadataQuery
+
+from .corpus_events import notify_corpus_changed
+from .embeddings import EMBEDDING_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
 
 
 # Weaviate Configuration from environment variables
 
+SEARCH_MODES = ("vector", "keyword", "hybrid")
+FUSION_TYPES = {"ranked": HybridFusion.RANKED, "relative_score": HybridFusion.RELATIVE_SCORE}
+
+# default retrieval settings; each can be overridden per request
+DEFAULT_RETRIEVAL = {
+    "mode": os.getenv("RETRIEVAL_MODE", "hybrid"),
+    "limit": int(os.getenv("RETRIEVAL_TOP_K", "5")),
+    "alpha": float(os.getenv("RETRIEVAL_ALPHA", "0.5")),
+    "fusion": os.getenv("RETRIEVAL_FUSION", "relative_score"),
+    "score_cutoff": float(os.getenv("RETRIEVAL_SCORE_CUTOFF")) if os.getenv("RETRIEVAL_SCORE_CUTOFF") else None,
+}
+
 
 def connect_to_weaviate():
     """Connects to Weaviate and returns the client object."""
@@ -16,116 +36,236 @@ def connect_to_weaviate():
         WEAVIATE_URL = os.getenv("WEAVIATE_URL")
         WEAVIATE_API_KEY = os.getenv("WEAVIATE_API_KEY")
         if not WEAVIATE_URL or not WEAVIATE_API_KEY:
-            print("unable to fetch weaviate api/url")
+            logger.error("Unable to fetch weaviate api/url")
             return None
-        print("Connecting to Weaviate Cloud...")
+        logger.info("Connecting to Weaviate Cloud...")
         client = weaviate.connect_to_weaviate_cloud(
             cluster_url=WEAVIATE_URL,
             auth_credentials=Auth.api_key(WEAVIATE_API_KEY),
         )
         if not client.is_ready():
-            print("❌ Could not connect to Weaviate. Check your credentials.")
+            logger.error("Could not connect to Weaviate. Check your credentials.")
             return None
-        print("✅ Weaviate connection successful.")
+        logger.info("Weaviate connection successful.")
         return client
     except WeaviateConnectionError as e:
-        print(f"❌ Weaviate connection error: {e}")
+        logger.error(f"Weaviate connection error: {e}")
         return None
 
 #collection creation
-def get_or_create_collection(client, collection_name="VIT_docs", fresh_start=False):
+def get_or_create_collection(client, collection_name="VIT_docs", fresh_start=False, self_provided=False):
     """
     Gets or creates a Weaviate collection. 
     If fresh_start is True, it will delete the collection if it already exists.
+    A new collection is vectorized by Weaviate (text2vec_weaviate), or with
+    self_provided=True takes the vectors we send. An existing collection keeps its
+    setting, so switching between the two needs a fresh_start.
     """
     if fresh_start and client.collections.exists(collection_name):
-        print(f"Deleting existing collection '{collection_name}'...")
+        logger.info(f"Deleting existing collection '{collection_name}'...")
         client.collections.delete(collection_name)
+        notify_corpus_changed(collection_name)
 
     if not client.collections.exists(collection_name):
-        print(f"Collection '{collection_name}' not found. Creating...")
+        logger.info(f"Collection '{collection_name}' not found. Creating...")
         try:
             client.collections.create(
                 name=collection_name,
-                vector_config=Configure.Vectors.text2vec_weaviate(),
+                vector_config=(
+                    Configure.Vectors.self_provided() if self_provided else Configure.Vectors.text2vec_weaviate()
+                ),
                 properties=[
                     Property(name="text_chunk", data_type=DataType.TEXT),
-                    Property(name="source_file", data_type=DataType.TEXT)
+                    Property(name="source_file", data_type=DataType.TEXT),
+                    Property(name="page_number", data_type=DataType.INT),
+                    Property(name="chunk_type", data_type=DataType.TEXT),
+                    Property(name="char_start", data_type=DataType.INT),
+                    Property(name="char_end", data_type=DataType.INT),
+                    # the chunk's id in the local chunk store (see chunk_store.py)
+                    Property(name="chunk_id", data_type=DataType.INT),
                 ],
             )
-            print(f"✅ Collection '{collection_name}' created.")
+            logger.info(f"Collection '{collection_name}' created.")
         except Exception as e:
-            print(f"❌ Error creating collection: {e}")
+            logger.error(f"Error creating collection: {e}")
             return None
     else:
-        print(f"Collection '{collection_name}' already exists.")
+        logger.info(f"Collection '{collection_name}' already exists.")
     
     return client.collections.get(collection_name)
 
 #ingesting data into the collection
-def ingest_data(collection, data_objects):
-    """Ingests a list of data objects into the specified collection."""
+def ingest_data(collection, data_objects, uuids=None, batch_size=None, embedder=None):
+    """
+    Ingests a list of data objects into the specified collection.
+    uuids, if given, is a parallel list of object ids (re-adding an id overwrites that object).
+    batch_size switches from Weaviate's dynamic batching to fixed-size batches.
+    With an embedder (see embeddings.get_embedder) the vectors are computed here
+    and sent along instead of being computed by Weaviate.
+    Returns True if every object was written.
+    """
     if not data_objects:
-        print("Warning: No data provided for ingestion.")
-        return
+        logger.warning("No data provided for ingestion.")
+        return True
     
-    print(f"Ingesting {len(data_objects)} objects into '{collection.name}'...")
+    logger.info(f"Ingesting {len(data_objects)} objects into '{collection.name}'...")
+    pairs = zip(data_objects, uuids) if uuids else ((obj, None) for obj in data_objects)
+    written, ok = ingest_stream(collection, pairs, batch_size=batch_size, embedder=embedder)
+    return ok
+
+#streaming objects into the collection without materializing them
+def ingest_stream(collection, object_pairs, batch_size=None, embedder=None):
+    """
+    Streams (properties, uuid) pairs from any iterable into the collection's batcher.
+    The batcher sends every batch_size objects (or dynamically sized batches) and
+    blocks add_object while its send queue is full, so a lazy producer is only
+    pulled as fast as Weaviate accepts objects. With an embedder, texts are embedded
+    EMBEDDING_BATCH_SIZE at a time as they are pulled.
+    Returns (objects_sent, ok), where ok is True if every object was written.
+    """
+    sent = 0
     try:
-        with collection.batch.dynamic() as batch:
-            for obj in data_objects:
-                batch.add_object(properties=obj)
-        print("✅ Data ingestion successful.")
+        batching = collection.batch.fixed_size(batch_size) if batch_size else collection.batch.dynamic()
+        with batching as batch:
+            for properties, uuid, vector in _with_vectors(object_pairs, embedder):
+                batch.add_object(properties=properties, uuid=uuid, vector=vector)
+                sent += 1
+        failed = collection.batch.failed_objects
+        if failed:
+            logger.warning(f"Failed to ingest {len(failed)} of {sent} object(s). First error: {failed[0].message}")
+            return sent, False
+        logger.info(f"Data ingestion successful ({sent} object(s)).")
+        return sent, True
     except Exception as e:
-        print(f"❌ Error during data ingestion: {e}")
+        logger.error(f"Error during data ingestion: {e}")
+        return sent, False
+    finally:
+        # even a failed batch may have written some objects
+        if sent:
+            notify_corpus_changed(collection.name)
+
 
+def _with_vectors(object_pairs, embedder):
+    """Yields (properties, uuid, vector); vector is None when Weaviate vectorizes."""
+    object_pairs = iter(object_pairs)
+    while True:
+        group = list(islice(object_pairs, EMBEDDING_BATCH_SIZE))
+        if not group:
+            return
+        texts = [properties["text_chunk"] for properties, _ in group]
+        vectors = embedder.embed_many(texts) if embedder else [None] * len(group)
+        for (properties, uuid), vector in zip(group, vectors):
+            yield properties, uuid, vector
+
+
+# retrieving chunks through vector, keyword (BM25) or hybrid search from weaviate
+def retrieve_chunks(collection, query_text, limit=3, with_metadata=False, mode="vector", alpha=0.5,
+                    fusion="relative_score", score_cutoff=None, embedder=None):
+    """
+    Retrieves relevant text chunks from the Weaviate collection.
+    mode is one of:
+      vector   near_text similarity; score is the cosine similarity (1 - distance)
+      keyword  BM25 only; score is the BM25 score
+      hybrid   BM25 and vector combined, alpha weighting the vector side (0 = pure
+               BM25, 1 = pure vector); fusion "relative_score" normalizes both score
+               lists to 0-1 before mixing, "ranked" fuses by reciprocal rank
+    Results scoring below score_cutoff (on the mode's scale) are dropped.
+    With with_metadata=True each result is a dict of the object's properties
+    (text_chunk, source_file, page_number, ...) plus its uuid and score, instead
+    of just the chunk text.
+    With an embedder the query is embedded locally and searched with near_vector
+    (or passed as the hybrid query's vector), skipping Weaviate's vectorizer.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}'. Choose from {', '.join(SEARCH_MODES)}.")
+    if fusion not in FUSION_TYPES:
+        raise ValueError(f"Unknown fusion type '{fusion}'. Choose from {', '.join(FUSION_TYPES)}.")
 
-# retrieving chunks through similarity search from weaviate
-def retrieve_chunks(collection, query_text, limit=3):
-    """Retrieves relevant text chunks from the Weaviate collection."""
     try:
-        print("Retrieving relevant documents from Weaviate...")
-        response = collection.query.near_text(
-            query=query_text,
-            limit=limit
-        )
-        
-        retrieved_chunks = []
-        if response.objects:
-             retrieved_chunks = [obj.properties['text_chunk'] for obj in response.objects]
-        
-        if not retrieved_chunks:
-            print("No relevant documents found in Weaviate for your query.")
+        logger.debug(f"Retrieving relevant documents from Weaviate ({mode} search, top {limit})...")
+        vector = embedder.embed(query_text) if embedder and mode != "keyword" else None
+        if mode == "vector" and vector is not None:
+            response = collection.query.near_vector(
+                near_vector=vector,
+                limit=limit,
+                return_metadata=MetadataQuery(distance=True),
+            )
+        elif mode == "vector":
+            response = collection.query.near_text(
+                query=query_text,
+                limit=limit,
+                return_metadata=MetadataQuery(distance=True),
+            )
+        elif mode == "keyword":
+            response = collection.query.bm25(
+                query=query_text,
+                limit=limit,
+                return_metadata=MetadataQuery(score=True),
+            )
+        else:
+            response = collection.query.hybrid(
+                query=query_text,
+                vector=vector,
+                alpha=alpha,
+                fusion_type=FUSION_TYPES[fusion],
+                limit=limit,
+                return_metadata=MetadataQuery(score=True),
+            )
+
+        retrieved_objects = []
+        for obj in response.objects:
+            if mode == "vector":
+                score = 1.0 - obj.metadata.distance if obj.metadata.distance is not None else None
+            else:
+                score = obj.metadata.score
+            if score_cutoff is not None and (score is None or score < score_cutoff):
+                continue
+            retrieved_objects.append({**obj.properties, "uuid": str(obj.uuid), "score": score})
+
+        if not retrieved_objects:
+            logger.info("No relevant documents found in Weaviate for your query.")
             return []
-        
-        print(f"✅ Retrieved {len(retrieved_chunks)} document(s):")
-        for i, chunk in enumerate(retrieved_chunks):
-            print(f"  - Chunk {i+1}: {chunk[:100]}...") # Print a snippet
-        return retrieved_chunks
+
+        logger.info(f"Retrieved {len(retrieved_objects)} document(s).",
+                    extra={"mode": mode, "top_k": limit, "results": len(retrieved_objects)})
+        for i, obj in enumerate(retrieved_objects):
+            logger.debug(f"  - Chunk {i+1} ({obj['score'] or 0:.3f}): {obj['text_chunk'][:100]}...")
+
+        if with_metadata:
+            return retrieved_objects
+        return [obj['text_chunk'] for obj in retrieved_objects]
 
     except WeaviateQueryError as e:
-        print(f"❌ Weaviate query error: {e}")
+        logger.error(f"Weaviate query error: {e}")
         return []
     
 #deletion function to replace outdated documents whenever required
-def delete_chunks_from_source(collection, source_filename):
-    """Deletes all chunks associated with a specific source file from the collection."""
+def delete_chunks_from_source(collection, source_filename, keep_ids=None):
+    """
+    Deletes all chunks associated with a specific source file from the collection.
+    Objects whose ids are in keep_ids are left in place, so a file can be replaced
+    by inserting its new chunks first and then deleting everything else.
+    """
     if not source_filename:
-        print("Warning: No source filename provided for deletion.")
+        logger.warning("No source filename provided for deletion.")
         return
 
-    print(f"Attempting to delete all chunks from source: '{source_filename}'...")
+    logger.info(f"Attempting to delete all chunks from source: '{source_filename}'...")
     try:
         # Use a 'where' filter to target objects by their 'source_file' property
-        response = collection.data.delete_many(
-            where=Filter.by_property("source_file").equal(source_filename)
-        )
+        where = Filter.by_property("source_file").equal(source_filename)
+        if keep_ids:
+            where = Filter.all_of([where, Filter.by_id().contains_none(list(keep_ids))])
+        response = collection.data.delete_many(where=where)
         
         # The response object contains information about the operation
-        print(f"✅ Deletion successful. Matched {response.matched_count} and deleted {response.successful_count} object(s).")
+        logger.info(f"Deletion successful. Matched {response.matched_count} and deleted {response.successful_count} object(s).")
         if response.failed_count > 0:
-            print(f"⚠️ Failed to delete {response.failed_count} object(s). Errors: {response.errors}")
+            logger.warning(f"Failed to delete {response.failed_count} object(s). Errors: {response.errors}")
+        if response.successful_count > 0:
+            notify_corpus_changed(collection.name)
 
     except Exception as e:
-        print(f"❌ An error occurred during deletion: {e}")
+        logger.error(f"An error occurred during deletion: {e}")
 
 
@@ -0,0 +1,55 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# runtime settings for the API process, read from the environment (see .env.example)
+
+# log level, and "json" (one JSON object per line) or "text" output
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+# how long a verified Weaviate connection is trusted before it is probed again
+RAG_HEALTH_CHECK_INTERVAL = float(os.getenv("RAG_HEALTH_CHECK_INTERVAL", "30"))
+
+# reconnect policy used when the shared Weaviate client drops
+RAG_RECONNECT_ATTEMPTS = int(os.getenv("RAG_RECONNECT_ATTEMPTS", "5"))
+RAG_RECONNECT_BACKOFF = float(os.getenv("RAG_RECONNECT_BACKOFF", "0.5"))
+RAG_RECONNECT_MAX_BACKOFF = float(os.getenv("RAG_RECONNECT_MAX_BACKOFF", "10"))
+
+# collection searched when a request names none, and every collection a request may
+# name in its "collections" field (comma-separated; the default is always allowed)
+RAG_DEFAULT_COLLECTION = os.getenv("RAG_DEFAULT_COLLECTION", "VIT_docs")
+RAG_COLLECTIONS = list(dict.fromkeys(
+    [RAG_DEFAULT_COLLECTION] + [name.strip() for name in os.getenv("RAG_COLLECTIONS", "").split(",") if name.strip()]
+))
+
+# upper bound on RAG queries running at once in this worker; extra requests wait their turn
+RAG_MAX_CONCURRENCY = int(os.getenv("RAG_MAX_CONCURRENCY", "8"))
+
+# /retrieve/batch: most queries accepted per request, and most Gemini calls a batch runs at once
+RAG_BATCH_MAX_QUERIES = int(os.getenv("RAG_BATCH_MAX_QUERIES", "50"))
+RAG_BATCH_CONCURRENCY = int(os.getenv("RAG_BATCH_CONCURRENCY", "4"))
+
+# answer cache: "memory", "sqlite" or "off"
+RAG_CACHE_BACKEND = os.getenv("RAG_CACHE_BACKEND", "memory").lower()
+RAG_CACHE_PATH = os.getenv("RAG_CACHE_PATH", "answer_cache.sqlite3")
+RAG_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", "3600"))
+RAG_CACHE_MAX_ENTRIES = int(os.getenv("RAG_CACHE_MAX_ENTRIES", "1000"))
+# minimum query similarity (0-1) for reusing an answer; set it empty to disable the semantic tier
+RAG_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("RAG_CACHE_SEMANTIC_THRESHOLD", "0.92") or 0) or None
+
+# retrieval cache warmup: popular questions (one per line) whose chunks are retrieved at
+# startup and after every corpus change, and seconds between checks for changes made by
+# the ingest command; a missing file disables the warmup
+RETRIEVAL_WARMUP_FILE = os.getenv("RETRIEVAL_WARMUP_FILE", "warmup_queries.txt")
+RETRIEVAL_WARMUP_INTERVAL = float(os.getenv("RETRIEVAL_WARMUP_INTERVAL", "30"))
+
+# conversation sessions: SQLite file, turns kept per session, stored answer length,
+# chunks kept for follow-ups to reuse, and seconds of inactivity before a session expires
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.sqlite3")
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "10"))
+SESSION_MAX_ANSWER_CHARS = int(os.getenv("SESSION_MAX_ANSWER_CHARS", "500"))
+SESSION_MAX_CHUNKS = int(os.getenv("SESSION_MAX_CHUNKS", "8"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "86400"))
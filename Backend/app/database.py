@@ -0,0 +1,156 @@
+# server-side conversation state: sessions, their recent turns and reusable chunks
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from . import config
+from .models import SESSION_TABLES
+from WeaviateGeminiInterface.corpus_events import corpus_version
+
+
+class SessionStore:
+    """
+    SQLite store of chat sessions. History is kept compact: only the last max_turns
+    turns of a session are stored, answers are cut to max_answer_chars, and at most
+    max_chunks retrieved chunks are kept for follow-ups to reuse. Each kept chunk
+    carries the corpus version of its collection, and get() leaves out chunks whose
+    collection has changed since, even if the ingest command changed it from another
+    process. Sessions idle for longer than ttl seconds are removed.
+    """
+
+    def __init__(self, path, max_turns=10, max_answer_chars=500, max_chunks=8, ttl=86400):
+        self.max_turns = max_turns
+        self.max_answer_chars = max_answer_chars
+        self.max_chunks = max_chunks
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        for statement in SESSION_TABLES:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def create(self):
+        """Starts a new session and returns its id."""
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            self._conn.execute("INSERT INTO sessions (id, created_at, updated_at) VALUES (?, ?, ?)",
+                               (session_id, now, now))
+            self._conn.commit()
+        return session_id
+
+    def get(self, session_id):
+        """
+        Returns {"session_id", "created_at", "updated_at", "turns": [...], "chunks": [...]}
+        with turns oldest first, or None if the session doesn't exist or has expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, updated_at, chunks FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None or row[1] + self.ttl < time.time():
+                return None
+            turns = self._conn.execute(
+                "SELECT query, standalone_query, answer, sources FROM turns WHERE session_id = ? ORDER BY turn",
+                (session_id,),
+            ).fetchall()
+        return {
+            "session_id": session_id,
+            "created_at": row[0],
+            "updated_at": row[1],
+            "turns": [
+                {"query": query, "standalone_query": standalone, "answer": answer, "sources": json.loads(sources)}
+                for query, standalone, answer, sources in turns
+            ],
+            "chunks": _current_chunks(json.loads(row[2])),
+        }
+
+    def add_turn(self, session_id, query, standalone_query, answer, sources, chunks, corpus_versions=None):
+        """
+        Appends a turn, drops turns beyond max_turns and replaces the reusable chunks.
+        corpus_versions maps collection names to their corpus versions from before the
+        turn's retrieval; chunks of other collections are tagged with the current one.
+        """
+        now = time.time()
+        chunks = [_compact_chunk(chunk, corpus_versions or {}) for chunk in chunks[:self.max_chunks]]
+        with self._lock:
+            with self._conn:
+                updated = self._conn.execute(
+                    "UPDATE sessions SET updated_at = ?, chunks = ? WHERE id = ?",
+                    (now, json.dumps(chunks), session_id),
+                )
+                if not updated.rowcount:
+                    return False
+                self._conn.execute(
+                    """INSERT INTO turns VALUES (
+                        ?, (SELECT COALESCE(MAX(turn), 0) + 1 FROM turns WHERE session_id = ?), ?, ?, ?, ?, ?
+                    )""",
+                    (session_id, session_id, query, standalone_query, answer[:self.max_answer_chars],
+                     json.dumps(sources), now),
+                )
+                self._conn.execute(
+                    """DELETE FROM turns WHERE session_id = ? AND turn NOT IN (
+                        SELECT turn FROM turns WHERE session_id = ? ORDER BY turn DESC LIMIT ?
+                    )""",
+                    (session_id, session_id, self.max_turns),
+                )
+        return True
+
+    def delete(self, session_id):
+        """Deletes a session and its turns; returns False if there was none."""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount
+            self._conn.commit()
+        return bool(deleted)
+
+    def _purge_expired(self, now):
+        self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+
+
+def _compact_chunk(chunk, corpus_versions):
+    # only what answering and citing need; vectors and other metadata stay in the backend
+    keys = ("text_chunk", "source_file", "page_number", "chunk_type", "uuid", "score", "collection", "chunk_id",
+            "corpus_version")
+    compact = {key: chunk[key] for key in keys if key in chunk}
+    # chunks reused from an earlier turn keep the version they were retrieved under
+    if "corpus_version" not in compact:
+        collection = compact.get("collection", config.RAG_DEFAULT_COLLECTION)
+        compact["corpus_version"] = corpus_versions.get(collection) or corpus_version(collection)
+    return compact
+
+
+def _current_chunks(chunks):
+    """The chunks whose collection hasn't changed since they were retrieved."""
+    versions = {}
+    current = []
+    for chunk in chunks:
+        collection = chunk.get("collection", config.RAG_DEFAULT_COLLECTION)
+        if collection not in versions:
+            versions[collection] = corpus_version(collection)
+        if chunk.get("corpus_version") == versions[collection]:
+            current.append(chunk)
+    return current
+
+
+_SESSION_STORE = None
+_SESSION_STORE_LOCK = threading.Lock()
+
+
+def get_session_store():
+    """The process-wide session store, opened on first use."""
+    global _SESSION_STORE
+    with _SESSION_STORE_LOCK:
+        if _SESSION_STORE is None:
+            _SESSION_STORE = SessionStore(
+                config.SESSION_DB_PATH,
+                max_turns=config.SESSION_MAX_TURNS,
+                max_answer_chars=config.SESSION_MAX_ANSWER_CHARS,
+                max_chunks=config.SESSION_MAX_CHUNKS,
+                ttl=config.SESSION_TTL,
+            )
+        return _SESSION_STORE
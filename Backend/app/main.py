@@ -1,8 +1,52 @@
-from fastapi import FastAPI
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from . import config
+from WeaviateGeminiInterface.observability import (
+    HTTP_IN_FLIGHT,
+    HTTP_SECONDS,
+    collect_stage_timings,
+    configure_logging,
+    render_metrics,
+    request_id_var,
+)
+
+configure_logging(config.LOG_LEVEL, json_format=config.LOG_FORMAT == "json")
+
 from .routers import retrieve, user
+from .utils.rag_adaptor import shutdown_executor, start_retrieval_warmup, stop_retrieval_warmup
+from WeaviateGeminiInterface.runtime import init_runtime, shutdown_runtime
+
+logger = logging.getLogger(__name__)
+
 
-app = FastAPI(title="VIT Chennai AI Assistant API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # open the Weaviate client and Gemini model once per worker instead of per request
+    app.state.rag_runtime = init_runtime(
+        collection_name=config.RAG_DEFAULT_COLLECTION,
+        collections=config.RAG_COLLECTIONS,
+        health_check_interval=config.RAG_HEALTH_CHECK_INTERVAL,
+        reconnect_attempts=config.RAG_RECONNECT_ATTEMPTS,
+        reconnect_backoff=config.RAG_RECONNECT_BACKOFF,
+        max_backoff=config.RAG_RECONNECT_MAX_BACKOFF,
+    )
+    # retrieve the popular questions before the first users ask them
+    start_retrieval_warmup()
+    try:
+        yield
+    finally:
+        stop_retrieval_warmup()
+        shutdown_executor()
+        shutdown_runtime()
+
+
+app = FastAPI(title="VIT Chennai AI Assistant API", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS for frontend connection
 app.add_middleware(
@@ -19,8 +63,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    """Gives every request an id (the caller's X-Request-ID or a new one), times it and logs its stages."""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    timings = collect_stage_timings()
+    HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        duration = time.perf_counter() - start
+        HTTP_IN_FLIGHT.dec()
+        # the route template keeps the label set small
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_SECONDS.observe(duration, method=request.method, path=path, status=status_code)
+        if path != "/metrics":
+            logger.info(f"{request.method} {path} {status_code} in {duration * 1000:.0f} ms",
+                        extra={"duration_ms": round(duration * 1000, 2), "stages_ms": timings})
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get('/')
 def test_server():
     return {"status": "ok", "message": "VIT Chennai AI Assistant API is running"}
 
-app.include_router(retrieve.router)
\ No newline at end of file
+app.include_router(retrieve.router)
+app.include_router(user.router)
@@ -0,0 +1,22 @@
+# tables of the conversation session store (see database.py)
+
+SESSION_TABLES = (
+    """CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        -- JSON list of the chunks retrieved for the latest turns, reused by follow-ups
+        chunks TEXT NOT NULL DEFAULT '[]'
+    )""",
+    """CREATE TABLE IF NOT EXISTS turns (
+        session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+        turn INTEGER NOT NULL,
+        query TEXT NOT NULL,
+        standalone_query TEXT NOT NULL,
+        answer TEXT NOT NULL,
+        sources TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (session_id, turn)
+    )""",
+    "CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions(updated_at)",
+)
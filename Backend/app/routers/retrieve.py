@@ -1,7 +1,13 @@
+import math
+
 from fastapi import APIRouter, status, File, UploadFile, Form, HTTPException
+from fastapi.responses import StreamingResponse
 from ..import schemas, database
 from typing import Optional
-from app.utils.rag_adaptor import query_rag
+from app import config
+from app.utils.rag_adaptor import query_rag_async, query_rag_batch, query_rag_session_async, get_chunk, ANSWER_CACHE
+from WeaviateGeminiInterface.generation_scheduler import GenerationOverloaded
+from app.utils.sse_stream import stream_rag_events
 
 router = APIRouter(
     prefix = '/retrieve',
@@ -12,7 +18,67 @@ router = APIRouter(
 @router.post("/", response_model=schemas.RetrieveResponse)
 async def retrieve(req: schemas.RetrieveRequest):
     try:
-        result = query_rag(req.query)
-        return schemas.RetrieveResponse(answer=result["answer"], sources=result.get("sources", []))
+        if req.session_id:
+            result = await query_rag_session_async(req.session_id, req.query, req.retrieval_overrides())
+        else:
+            result = await query_rag_async(req.query, req.retrieval_overrides())
+    except GenerationOverloaded as e:
+        # shed under load: tell the client when to come back instead of failing slowly
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e),
+                            headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"RAG query failed: {e}")
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found.")
+    return schemas.RetrieveResponse(answer=result["answer"], sources=result.get("sources", []),
+                                    session_id=req.session_id, standalone_query=result.get("standalone_query"))
+
+
+@router.post("/batch", response_model=schemas.BatchRetrieveResponse)
+async def retrieve_batch(req: schemas.BatchRetrieveRequest):
+    """Answers a list of queries concurrently; results come back in request order, each with its own error."""
+    if len(req.queries) > config.RAG_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"A batch can contain at most {config.RAG_BATCH_MAX_QUERIES} queries.",
+        )
+    try:
+        results = await query_rag_batch(req.queries, req.retrieval_overrides())
+        return schemas.BatchRetrieveResponse(results=[
+            schemas.BatchRetrieveItem(query=result["query"], answer=result.get("answer"),
+                                      sources=result.get("sources", []), error=result.get("error"))
+            for result in results
+        ])
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"RAG query failed: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"RAG batch query failed: {e}")
+
+
+@router.post("/stream")
+async def retrieve_stream(req: schemas.RetrieveRequest):
+    """Streams the answer as Server-Sent Events: sources first, then answer deltas, then done."""
+    return StreamingResponse(
+        stream_rag_events(req.query, req.retrieval_overrides(), req.session_id),
+        media_type="text/event-stream",
+        # keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/chunks/{chunk_id}", response_model=schemas.Chunk)
+def read_chunk(chunk_id: int, collection: Optional[str] = None):
+    """A cited chunk's full text and place in its PDF, by an id from a source's chunk_ids."""
+    if collection is not None and collection not in config.RAG_COLLECTIONS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Unknown collection '{collection}'. Choose from {', '.join(config.RAG_COLLECTIONS)}.")
+    chunk = get_chunk(chunk_id, collection)
+    if chunk is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chunk not found.")
+    return chunk
+
+
+@router.get("/cache")
+def cache_stats():
+    """Hit/miss counters of the answer cache."""
+    if ANSWER_CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **ANSWER_CACHE.stats()}
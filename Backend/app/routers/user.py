@@ -0,0 +1,31 @@
+from fastapi import APIRouter, status, HTTPException, Response
+from .. import schemas
+from ..database import get_session_store
+from app.utils.rag_adaptor import run_blocking
+
+router = APIRouter(
+    prefix = '/sessions',
+    tags = ["Sessions"]
+)
+
+
+@router.post("/", response_model=schemas.SessionCreated, status_code=status.HTTP_201_CREATED)
+async def create_session():
+    """Starts a conversation; pass the returned session_id with /retrieve requests."""
+    return schemas.SessionCreated(session_id=await run_blocking(get_session_store().create))
+
+
+@router.get("/{session_id}", response_model=schemas.SessionResponse)
+async def get_session(session_id: str):
+    """The session's recent turns, oldest first."""
+    session = await run_blocking(get_session_store().get, session_id)
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found.")
+    return session
+
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_session(session_id: str):
+    if not await run_blocking(get_session_store().delete, session_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found.")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Literal
+
+from . import config
 
 # class Query(BaseModel):
 #     query : str
@@ -10,9 +12,101 @@ from typing import Optional, List
 #     description : Optional[str]
 
 
-class RetrieveRequest(BaseModel):
+class RetrievalOptions(BaseModel):
+    # optional retrieval overrides; omitted fields use the server defaults
+    top_k: Optional[int] = Field(None, ge=1, le=50)
+    search_mode: Optional[Literal["vector", "keyword", "hybrid"]] = None
+    alpha: Optional[float] = Field(None, ge=0, le=1)
+    fusion: Optional[Literal["ranked", "relative_score"]] = None
+    score_cutoff: Optional[float] = None
+    # search only these collections (see RAG_COLLECTIONS); omitted means the default one
+    collections: Optional[List[str]] = Field(None, min_length=1)
+
+    @field_validator("collections")
+    @classmethod
+    def known_collections(cls, collections):
+        if collections is None:
+            return None
+        unknown = [name for name in collections if name not in config.RAG_COLLECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown collection(s) {', '.join(unknown)}. Choose from {', '.join(config.RAG_COLLECTIONS)}.")
+        # sorted, so the same selection in another order shares cache entries
+        return sorted(set(collections))
+
+    def retrieval_overrides(self):
+        """The retrieval settings this request overrides, keyed like retrieve_chunks' arguments."""
+        overrides = {
+            "limit": self.top_k,
+            "mode": self.search_mode,
+            "alpha": self.alpha,
+            "fusion": self.fusion,
+            "score_cutoff": self.score_cutoff,
+            "collections": self.collections,
+        }
+        return {key: value for key, value in overrides.items() if value is not None}
+
+
+class RetrieveRequest(RetrievalOptions):
     query: str
+    # answer as the next turn of this conversation (see POST /sessions)
+    session_id: Optional[str] = None
+
+
+class BatchRetrieveRequest(RetrievalOptions):
+    # the retrieval overrides apply to every query in the batch
+    queries: List[str] = Field(..., min_length=1)
+
+class Source(BaseModel):
+    source_file: str
+    page_number: Optional[int] = None
+    score: Optional[float] = None
+    collection: Optional[str] = None
+    # "table" if a cited chunk on the page is a table, else "text"
+    chunk_type: Optional[str] = None
+    # the cited chunks on the page; open one with GET /retrieve/chunks/{chunk_id}
+    chunk_ids: List[int] = []
+
+
+class Chunk(BaseModel):
+    chunk_id: int
+    collection: str
+    source_file: str
+    page_number: Optional[int] = None
+    chunk_type: str
+    # character span of the chunk in its page's text (text chunks only)
+    char_start: Optional[int] = None
+    char_end: Optional[int] = None
+    text_chunk: str
 
 class RetrieveResponse(BaseModel):
     answer: str
-    sources: List[dict]
\ No newline at end of file
+    sources: List[Source]
+    # set for session turns: the follow-up as it was answered
+    session_id: Optional[str] = None
+    standalone_query: Optional[str] = None
+
+
+class BatchRetrieveItem(BaseModel):
+    query: str
+    answer: Optional[str] = None
+    sources: List[Source] = []
+    error: Optional[str] = None
+
+class BatchRetrieveResponse(BaseModel):
+    results: List[BatchRetrieveItem]
+
+
+class SessionCreated(BaseModel):
+    session_id: str
+
+class SessionTurn(BaseModel):
+    query: str
+    standalone_query: str
+    answer: str
+    sources: List[Source]
+
+class SessionResponse(BaseModel):
+    session_id: str
+    created_at: float
+    updated_at: float
+    turns: List[SessionTurn]
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from WeaviateGeminiInterface import corpus_events  # noqa: E402
+
+
+@pytest.fixture
+def corpus_version_dir(tmp_path, monkeypatch):
+    """Keeps corpus versions in a fresh directory, as the API and the ingest command share them."""
+    path = str(tmp_path / "corpus_versions")
+    monkeypatch.setattr(corpus_events, "CORPUS_VERSION_DIR", path)
+    return path
+
+
+def bump_in_other_process(collection_name, version_dir):
+    """Reports a change to collection_name from a separate interpreter, like the ingest command does."""
+    import subprocess
+
+    subprocess.run(
+        [sys.executable, "-c",
+         "import sys; from WeaviateGeminiInterface.corpus_events import notify_corpus_changed; "
+         "notify_corpus_changed(sys.argv[1])", collection_name],
+        cwd=BACKEND_DIR, env={**os.environ, "CORPUS_VERSION_DIR": version_dir, "LOG_LEVEL": "WARNING"},
+        check=True,
+    )
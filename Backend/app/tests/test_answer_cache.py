@@ -0,0 +1,196 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from app import config
+from app.tests.conftest import bump_in_other_process
+from app.utils import rag_adaptor
+from app.utils.answer_cache import AnswerCache, EmbeddingMatrix, MemoryCacheBackend, SQLiteCacheBackend
+from WeaviateGeminiInterface.corpus_events import corpus_version
+from WeaviateGeminiInterface.embeddings import HashingEmbedder
+
+ANSWER = {"answer": "The library opens at 8 AM.", "sources": []}
+
+
+def make_backend(kind, tmp_path):
+    if kind == "sqlite":
+        return SQLiteCacheBackend(str(tmp_path / "answers.sqlite3"))
+    return MemoryCacheBackend()
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_exact_and_semantic_hits(kind, tmp_path):
+    cache = AnswerCache(make_backend(kind, tmp_path), embedder=HashingEmbedder(), semantic_threshold=0.7)
+    cache.put("When does the library open?", ANSWER, version="v1")
+
+    assert cache.get("when does the LIBRARY open", version="v1") == ANSWER
+    assert cache.get("When does the library open today?", version="v1") == ANSWER
+    assert cache.get("Where is the hostel mess?", version="v1") is None
+    assert cache.get("When does the library open?", scope='{"limit": 3}', version="v1") is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 2)
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_answer_from_another_corpus_version_is_stale(kind, tmp_path):
+    cache = AnswerCache(make_backend(kind, tmp_path), embedder=HashingEmbedder())
+    cache.put("When does the library open?", ANSWER, version="v1")
+
+    assert cache.get("When does the library open?", version="v2") is None
+    assert cache.stats()["stale"] == 1
+    # dropped, so the answer produced from v2 takes its place
+    assert len(cache.backend) == 0
+    assert cache.get("When does the library open?", version="v1") is None
+
+
+def test_sqlite_answers_go_stale_across_restarts(tmp_path, corpus_version_dir):
+    path = str(tmp_path / "answers.sqlite3")
+    AnswerCache(SQLiteCacheBackend(path)).put("When does the library open?", ANSWER,
+                                              version=corpus_version("VIT_docs"))
+    reopened = AnswerCache(SQLiteCacheBackend(path))
+    assert reopened.get("When does the library open?", version=corpus_version("VIT_docs")) == ANSWER
+
+    bump_in_other_process("VIT_docs", corpus_version_dir)
+    reopened = AnswerCache(SQLiteCacheBackend(path))
+    assert reopened.get("When does the library open?", version=corpus_version("VIT_docs")) is None
+
+
+def test_sqlite_cache_from_before_versioning_is_stale(tmp_path):
+    path = str(tmp_path / "answers.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE answer_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, embedding BLOB NOT NULL, "
+                 "expires_at REAL NOT NULL, last_access REAL NOT NULL)")
+    conn.execute("INSERT INTO answer_cache VALUES ('when does the library open', '{}', x'', 9e99, 0)")
+    conn.commit()
+    conn.close()
+
+    cache = AnswerCache(SQLiteCacheBackend(path))
+    assert cache.get("When does the library open?", version="0") is None
+    cache.put("When does the library open?", ANSWER, version="0")
+    assert cache.get("When does the library open?", version="0") == ANSWER
+
+
+def test_ingest_in_another_process_invalidates_cached_answers(monkeypatch, corpus_version_dir):
+    calls = []
+
+    def fake_query(user_query, runtime=None, retrieval=None):
+        calls.append(user_query)
+        return {"answer": f"answer {len(calls)}", "sources": []}
+
+    monkeypatch.setattr(rag_adaptor, "core_query", fake_query)
+    monkeypatch.setattr(rag_adaptor, "get_runtime", lambda: None)
+    monkeypatch.setattr(rag_adaptor, "ANSWER_CACHE", AnswerCache(MemoryCacheBackend(), embedder=HashingEmbedder()))
+
+    assert rag_adaptor.query_rag("When does the library open?")["answer"] == "answer 1"
+    assert rag_adaptor.query_rag("When does the library open?")["answer"] == "answer 1"
+    assert len(calls) == 1
+
+    bump_in_other_process(config.RAG_DEFAULT_COLLECTION, corpus_version_dir)
+    assert rag_adaptor.query_rag("When does the library open?")["answer"] == "answer 2"
+    assert len(calls) == 2
+
+    # a collection the request doesn't search leaves its answers alone
+    bump_in_other_process("other_docs", corpus_version_dir)
+    assert rag_adaptor.query_rag("When does the library open?")["answer"] == "answer 2"
+
+
+def test_answers_without_context_are_not_cached(monkeypatch, corpus_version_dir):
+    results = iter([
+        # retrieval failed and came back empty
+        {"answer": rag_adaptor.NO_CONTEXT_ANSWER, "sources": []},
+        {"answer": "Sorry, I encountered an error while generating the answer.", "sources": [], "error": True},
+        {"answer": "The library opens at 8 AM.", "sources": []},
+    ])
+    calls = []
+
+    def fake_query(user_query, runtime=None, retrieval=None):
+        calls.append(user_query)
+        return next(results)
+
+    monkeypatch.setattr(rag_adaptor, "core_query", fake_query)
+    monkeypatch.setattr(rag_adaptor, "get_runtime", lambda: None)
+    monkeypatch.setattr(rag_adaptor, "ANSWER_CACHE", AnswerCache(MemoryCacheBackend(), embedder=HashingEmbedder()))
+
+    answers = [rag_adaptor.query_rag("When does the library open?")["answer"] for _ in range(4)]
+    assert answers[0] == rag_adaptor.NO_CONTEXT_ANSWER
+    assert answers[2:] == ["The library opens at 8 AM."] * 2
+    assert len(calls) == 3
+
+
+def test_embedding_matrix_reuses_rows():
+    matrix = EmbeddingMatrix()
+    for n in range(100):
+        matrix.add(f"q{n}", [1.0, 0.0] if n % 2 else [0.0, 1.0])
+    for n in range(0, 100, 2):
+        matrix.remove(f"q{n}")
+    matrix.add("new", [0.6, 0.8])
+
+    assert len(matrix.keys()) == 51
+    assert matrix.nearest([0.0, 1.0], 0.5) == ["new"]
+    assert matrix.nearest([1.0, 0.0], 0.9)[:3] == ["q1", "q3", "q5"]
+    # embeddings of another size are never compared
+    matrix.add("other", [1.0, 0.0, 0.0])
+    assert matrix.nearest([1.0, 0.0, 0.0], 0.5) == []
+
+
+def test_memory_backend_evicts_from_the_semantic_tier():
+    cache = AnswerCache(MemoryCacheBackend(max_entries=2), embedder=HashingEmbedder(), semantic_threshold=0.7)
+    cache.put("When does the library open?", ANSWER)
+    cache.put("Where is the hostel mess?", ANSWER)
+    cache.put("How do I pay the exam fee?", ANSWER)
+
+    assert cache.get("When does the library open today?") is None
+    assert cache.get("How do I pay the exam fee today?") == ANSWER
+
+
+def test_sqlite_semantic_tier_follows_other_connections(tmp_path):
+    path = str(tmp_path / "answers.sqlite3")
+    reader = AnswerCache(SQLiteCacheBackend(path), embedder=HashingEmbedder(), semantic_threshold=0.7)
+    writer = AnswerCache(SQLiteCacheBackend(path), embedder=HashingEmbedder(), semantic_threshold=0.7)
+    assert reader.get("When does the library open today?") is None
+
+    writer.put("When does the library open?", ANSWER)
+    assert reader.get("When does the library open today?") == ANSWER
+
+    writer.clear()
+    writer.put("Where is the hostel mess?", ANSWER)
+    assert reader.get("When does the library open today?") is None
+    assert reader.get("Where is the hostel mess today?") == ANSWER
+    assert len(reader.backend._matrix.keys()) == 1
+
+
+class ThreadRecordingCache(AnswerCache):
+    """An AnswerCache that records the thread each lookup and store runs on."""
+
+    def __init__(self):
+        super().__init__(MemoryCacheBackend(), embedder=HashingEmbedder())
+        self.threads = []
+
+    def get(self, *args, **kwargs):
+        self.threads.append(threading.current_thread())
+        return super().get(*args, **kwargs)
+
+    def put(self, *args, **kwargs):
+        self.threads.append(threading.current_thread())
+        return super().put(*args, **kwargs)
+
+
+def test_batch_uses_the_cache_off_the_event_loop(monkeypatch, corpus_version_dir):
+    cache = ThreadRecordingCache()
+    monkeypatch.setattr(rag_adaptor, "ANSWER_CACHE", cache)
+    monkeypatch.setattr(rag_adaptor, "get_runtime", lambda: None)
+    monkeypatch.setattr(rag_adaptor, "retrieve_context", lambda query, runtime, retrieval: [{"text_chunk": query}])
+    monkeypatch.setattr(rag_adaptor, "answer_from_chunks",
+                        lambda query, chunks, runtime: {"answer": f"about {query}", "sources": []})
+    cache.put("Where is the hostel mess?", ANSWER, version=rag_adaptor._corpus_version(None))
+    cache.threads.clear()
+
+    queries = ["Where is the hostel mess?", "When does the library open?", "when does the library open"]
+    results = asyncio.run(rag_adaptor.query_rag_batch(queries))
+    assert [result["answer"] for result in results] == [
+        ANSWER["answer"], "about When does the library open?", "about When does the library open?"]
+    # one lookup per distinct question and one store per new answer, none on the loop's thread
+    assert len(cache.threads) == 3
+    assert threading.main_thread() not in cache.threads
@@ -0,0 +1,119 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.tests.conftest import BACKEND_DIR
+from WeaviateGeminiInterface.chunk_store import MAGIC, RECORD, ChunkStore, open_chunk_store
+
+
+def chunk(text, page=1, chunk_type="text"):
+    return {"text_chunk": text, "page_number": page, "chunk_type": chunk_type}
+
+
+@pytest.fixture
+def writer(tmp_path):
+    store = ChunkStore(str(tmp_path), "docs")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def reader(tmp_path, writer):
+    store = ChunkStore(str(tmp_path), "docs", readonly=True)
+    yield store
+    store.close()
+
+
+def test_add_dedupes_by_content_hash_per_file(writer):
+    ids = writer.add("rules.pdf", [chunk("Curfew is at 10 PM."), chunk("Mess opens at 7 AM.", page=2)])
+    assert ids == [0, 1]
+    assert writer.add("rules.pdf", [chunk("Mess opens at 7 AM.", page=2), chunk("Gym opens at 6 AM.")]) == [1, 2]
+    # the same text in another file is another chunk
+    assert writer.add("notices.pdf", [chunk("Curfew is at 10 PM.")]) == [3]
+    assert len(writer) == 4
+
+    assert writer.get(1) == {"chunk_id": 1, "text_chunk": "Mess opens at 7 AM.", "source_file": "rules.pdf",
+                             "page_number": 2, "chunk_type": "text"}
+    assert writer.get(4) is None
+
+
+def test_chunk_metadata_round_trips(writer):
+    [table_id] = writer.add("fees.pdf", [{**chunk("| Fee | Amount |", page=None, chunk_type="table"),
+                                          "char_start": 10, "char_end": 26}])
+    [chunk_id] = writer.add("fees.pdf", [chunk("Fees are due in July. ü")])
+    assert writer.get(table_id) == {"chunk_id": 0, "text_chunk": "| Fee | Amount |", "source_file": "fees.pdf",
+                                    "page_number": None, "chunk_type": "table", "char_start": 10, "char_end": 26}
+    assert writer.get(chunk_id)["text_chunk"] == "Fees are due in July. ü"
+
+
+def test_delete_source_keeps_the_given_ids(writer, reader):
+    ids = writer.add("rules.pdf", [chunk("a"), chunk("b"), chunk("c")])
+    writer.add("notices.pdf", [chunk("d")])
+
+    assert writer.delete_source("rules.pdf", keep_ids=[ids[1]]) == 2
+    assert writer.ids_for_source("rules.pdf") == [ids[1]]
+    assert reader.get_many(ids) == [None, reader.get(ids[1]), None]
+    assert reader.get(ids[1])["text_chunk"] == "b"
+    assert writer.ids_for_source("notices.pdf") == [3]
+
+    # deleted text is stored again under a new id
+    assert writer.add("rules.pdf", [chunk("a")]) == [4]
+    assert writer.delete_source("missing.pdf") == 0
+
+
+def test_open_reader_sees_reset(writer, reader):
+    writer.add("rules.pdf", [chunk("old text")])
+    assert reader.get(0)["text_chunk"] == "old text"
+
+    writer.reset()
+    assert reader.get(0) is None
+    assert len(writer) == 0
+    writer.add("rules.pdf", [chunk("new text")])
+    assert reader.get(0)["text_chunk"] == "new text"
+
+
+def test_reader_picks_up_appends_from_another_process(tmp_path, reader):
+    assert len(reader) == 0
+    subprocess.run(
+        [sys.executable, "-c",
+         "import sys; from WeaviateGeminiInterface.chunk_store import ChunkStore; "
+         "store = ChunkStore(sys.argv[1], 'docs'); store.add('rules.pdf', [{'text_chunk': 'Curfew is at 10 PM.'}]); "
+         "store.close()", str(tmp_path)],
+        cwd=BACKEND_DIR, check=True,
+    )
+    assert len(reader) == 1
+    assert reader.get(0)["text_chunk"] == "Curfew is at 10 PM."
+
+
+def test_truncated_record_is_dropped_on_open(tmp_path, writer):
+    writer.add("rules.pdf", [chunk("a"), chunk("b")])
+    writer.close()
+    # a crash halfway through writing a third record
+    with open(os.path.join(tmp_path, "docs.idx"), "ab") as f:
+        f.write(b"\x01" * (RECORD.size // 2))
+
+    reopened = ChunkStore(str(tmp_path), "docs")
+    assert os.path.getsize(os.path.join(tmp_path, "docs.idx")) == len(MAGIC) + 2 * RECORD.size
+    assert reopened.add("rules.pdf", [chunk("a"), chunk("c")]) == [0, 2]
+    assert [c["text_chunk"] for c in reopened.get_many([0, 1, 2])] == ["a", "b", "c"]
+    reopened.close()
+
+
+def test_not_a_chunk_store(tmp_path):
+    with open(os.path.join(tmp_path, "docs.idx"), "wb") as f:
+        f.write(b"NOTASTORE")
+    with pytest.raises(ValueError):
+        ChunkStore(str(tmp_path), "docs")
+
+
+def test_open_chunk_store(tmp_path):
+    assert open_chunk_store("VIT_docs", path="off") is None
+    assert open_chunk_store("VIT_docs", path=str(tmp_path), readonly=True) is None
+    store = open_chunk_store("VIT_docs", "local", path=str(tmp_path))
+    assert store.name == "local.VIT_docs"
+    store.close()
+    reader = open_chunk_store("VIT_docs", "local", path=str(tmp_path), readonly=True)
+    assert reader is not None and reader.readonly
+    reader.close()
@@ -0,0 +1,91 @@
+import re
+
+import pytest
+
+from WeaviateGeminiInterface.chunking import chunk_page, chunk_spans, estimate_tokens
+
+SENTENCES = [f"Rule {n} says students must carry their identity card at all times." for n in range(1, 41)]
+PARAGRAPHS = [" ".join(SENTENCES[i:i + 4]) for i in range(0, len(SENTENCES), 4)]
+DOCUMENT = (
+    "GENERAL RULES\n\n" + "\n\n".join(PARAGRAPHS[:4])
+    + "\n\n3.2 Attendance requirements\n\n" + "\n\n".join(PARAGRAPHS[4:7])
+    + "\n\nChapter IV\n\n" + "\n\n".join(PARAGRAPHS[7:])
+    + "\n\n" + "x" * 900  # one word longer than a whole chunk
+)
+SPLITTING = ["tokens", "sentences", "paragraphs", "headings"]
+
+
+def texts(spans, text=DOCUMENT):
+    return [text[start:end] for start, end in spans]
+
+
+@pytest.mark.parametrize("strategy", SPLITTING)
+def test_chunks_fit_and_cover_the_text(strategy):
+    spans = chunk_spans(DOCUMENT, strategy, max_tokens=80, overlap_tokens=20)
+    assert len(spans) > 1
+    for start, end in spans:
+        chunk = DOCUMENT[start:end]
+        assert chunk == chunk.strip()
+        # a single word longer than max_tokens is the only thing allowed to exceed it
+        assert estimate_tokens(chunk) <= 80 or " " not in chunk
+    assert [start for start, _ in spans] == sorted(start for start, _ in spans)
+    covered = set()
+    for start, end in spans:
+        covered.update(start + m.start() for m in re.finditer(r"\S+", DOCUMENT[start:end]))
+    words = [m.start() for m in re.finditer(r"\S+", DOCUMENT)]
+    assert set(words) <= covered
+
+
+def test_page_strategy_keeps_the_whole_text():
+    assert chunk_spans("  one page  \n", "page") == [(2, 10)]
+
+
+def test_empty_text_and_unknown_strategy():
+    assert chunk_spans(" \n\n ", "paragraphs") == []
+    with pytest.raises(ValueError, match="Unknown chunking strategy"):
+        chunk_spans("text", "words")
+
+
+def test_token_windows_overlap():
+    text = " ".join(f"w{n:03d}" for n in range(200))  # 4 chars + 1 space per word
+    spans = chunk_spans(text, "tokens", max_tokens=25, overlap_tokens=5)
+    chunks = texts(spans, text)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    for previous, following in zip(chunks, chunks[1:]):
+        shared = set(previous.split()) & set(following.split())
+        assert shared and len(" ".join(sorted(shared))) <= 20
+    assert chunks[-1].endswith("w199")
+
+
+def test_sentences_are_never_cut():
+    text = " ".join(SENTENCES)
+    chunks = texts(chunk_spans(text, "sentences", max_tokens=60, overlap_tokens=20), text)
+    for chunk in chunks:
+        assert chunk.startswith("Rule ") and chunk.endswith("times.")
+    # overlap repeats the last whole sentence of the previous chunk
+    assert chunks[1].split(". ")[0] + "." in chunks[0]
+
+
+def test_paragraphs_are_kept_together_when_they_fit():
+    text = "\n\n".join(PARAGRAPHS[:3])
+    chunks = texts(chunk_spans(text, "paragraphs", max_tokens=90, overlap_tokens=0), text)
+    assert chunks == PARAGRAPHS[:3]
+    # a paragraph too long for one chunk falls back to whole sentences
+    chunks = texts(chunk_spans(PARAGRAPHS[0], "paragraphs", max_tokens=20, overlap_tokens=0), PARAGRAPHS[0])
+    assert chunks == SENTENCES[:4]
+
+
+def test_headings_start_chunks():
+    chunks = texts(chunk_spans(DOCUMENT, "headings", max_tokens=400, overlap_tokens=0))
+    assert chunks[0].startswith("GENERAL RULES\n\nRule 1 ")
+    assert any(chunk.startswith("3.2 Attendance requirements\n\nRule 17 ") for chunk in chunks)
+    assert any(chunk.startswith("Chapter IV\n\nRule 29 ") for chunk in chunks)
+
+
+def test_chunk_page_records_offsets():
+    text = "\n\n".join(PARAGRAPHS[:3])
+    chunks = chunk_page(text, 7, "handbook.pdf", "paragraphs", max_tokens=90, overlap_tokens=0)
+    assert [chunk["page_number"] for chunk in chunks] == [7, 7, 7]
+    for chunk in chunks:
+        assert chunk["source_file"] == "handbook.pdf" and chunk["chunk_type"] == "text"
+        assert text[chunk["char_start"]:chunk["char_end"]] == chunk["text_chunk"]
@@ -0,0 +1,54 @@
+from WeaviateGeminiInterface.chunking import estimate_tokens
+from WeaviateGeminiInterface.context_builder import MIN_TRIMMED_TOKENS, build_context
+
+
+def chunk(text, score=None, **metadata):
+    return {"text_chunk": text, "score": score, "source_file": "rules.pdf", "page_number": 3, **metadata}
+
+
+CURFEW = "Hostel curfew is at ten in the evening for every first year student living on campus."
+MESS = "The mess serves breakfast from seven to nine and dinner from seven thirty to nine thirty."
+
+
+def test_chunks_are_ranked_tagged_and_numbered():
+    context = build_context([chunk(MESS, 0.4), chunk(CURFEW, 0.9, chunk_type="table", page_number=None)])
+    assert context["texts"] == [f"[1] rules.pdf (table)\n{CURFEW}", f"[2] rules.pdf, page 3\n{MESS}"]
+    assert [c["text_chunk"] for c in context["chunks"]] == [CURFEW, MESS]
+    assert context["tokens_out"] == sum(estimate_tokens(text) for text in context["texts"])
+
+    # without scores, retrieval order is kept
+    context = build_context([chunk(MESS), chunk(CURFEW)])
+    assert [c["text_chunk"] for c in context["chunks"]] == [MESS, CURFEW]
+
+
+def test_near_duplicates_are_dropped():
+    table = "Hostel curfew | ten in the evening | every first year student living on campus"
+    context = build_context([chunk(CURFEW, 0.9), chunk(table, 0.8), chunk(MESS, 0.7)])
+    assert [c["text_chunk"] for c in context["chunks"]] == [CURFEW, MESS]
+    assert context["duplicates"] == 1
+    # a stricter threshold keeps it
+    assert len(build_context([chunk(CURFEW, 0.9), chunk(table, 0.8)], duplicate_threshold=1.01)["chunks"]) == 2
+
+
+def test_budget_cuts_the_last_chunk_at_a_word():
+    long_text = " ".join(f"rule{n}" for n in range(200))  # ~250 tokens
+    context = build_context([chunk(CURFEW, 0.9), chunk(long_text, 0.8)], max_tokens=120)
+    assert context["trimmed"] == 1 and len(context["chunks"]) == 2
+    cut = context["texts"][1].split("\n", 1)[1]
+    assert cut.endswith(" ...") and long_text.startswith(cut[:-4])
+    assert context["tokens_out"] <= 120 + 1
+    assert context["tokens_in"] == estimate_tokens(CURFEW) + estimate_tokens(long_text)
+
+
+def test_chunks_without_enough_room_are_dropped():
+    budget = estimate_tokens(f"[1] rules.pdf, page 3\n{CURFEW}") + MIN_TRIMMED_TOKENS // 2
+    context = build_context([chunk(CURFEW, 0.9), chunk(MESS * 4, 0.8), chunk("Short note.", 0.7)], max_tokens=budget)
+    # the long chunk has no room to be cut down, but the short one after it still fits
+    assert [c["text_chunk"] for c in context["chunks"]] == [CURFEW, "Short note."]
+    assert context["trimmed"] == 1
+    assert context["texts"][1].startswith("[2] ")
+
+
+def test_empty_context():
+    assert build_context([]) == {"texts": [], "chunks": [], "tokens_in": 0, "tokens_out": 0,
+                                 "duplicates": 0, "trimmed": 0}
@@ -0,0 +1,45 @@
+import pytest
+
+from WeaviateGeminiInterface.conversation import is_follow_up, reusable_chunks, rewrite_query
+
+
+@pytest.mark.parametrize("query, previous, expected", [
+    # leading stopwords only: the repeated word anchors a swap
+    ("what about for hostel B?", "What are the mess timings for hostel A?", "What are the mess timings for hostel B?"),
+    ("and hostel B?", "What is the fee for hostel A?", "What is the fee for hostel B?"),
+    ("What about hostel B", "What is the fee for hostel A", "What is the fee for hostel B"),
+])
+def test_follow_up_swaps_the_repeated_phrase(query, previous, expected):
+    assert rewrite_query(query, previous) == expected
+
+
+@pytest.mark.parametrize("query, previous, expected", [
+    ("what is its fee?", "Is there a gym in block C?", "what is its fee (a gym block c)"),
+    # the follow-up's own words come before the repeated one, so they must not be swapped away
+    ("what about the timings for hostel B?", "What is the fee for hostel A?", "the timings for hostel B (fee hostel a)"),
+    ("and their timings?", "Where is the library?", "their timings (library)"),
+])
+def test_follow_up_carries_the_previous_terms(query, previous, expected):
+    assert rewrite_query(query, previous) == expected
+
+
+def test_standalone_questions_are_unchanged():
+    assert rewrite_query("Is there a gym?", "What is the fee for hostel A?") == "Is there a gym?"
+    assert rewrite_query("what is its fee?", "") == "what is its fee?"
+    assert is_follow_up("timings?") and is_follow_up("What about hostel B?")
+    assert not is_follow_up("What are the library hours?")
+
+
+def test_reusable_chunks_are_rescored_by_term_overlap():
+    chunks = [
+        {"text_chunk": "Hostel B mess timings are 7 to 9.", "score": 0.9},
+        {"text_chunk": "Library hours are 8 to 8.", "score": 0.8},
+        {"text_chunk": "Hostel fee is paid per semester.", "score": 0.7},
+    ]
+    relevant, covered = reusable_chunks("hostel B mess timings", chunks)
+    assert [chunk["text_chunk"] for chunk in relevant] == [chunks[0]["text_chunk"]]
+    assert relevant[0]["score"] == 1.0 and covered
+    relevant, covered = reusable_chunks("hostel fee refund", chunks)
+    assert [chunk["text_chunk"] for chunk in relevant] == [chunks[2]["text_chunk"]]
+    assert not covered
+    assert reusable_chunks("anything", []) == ([], False)
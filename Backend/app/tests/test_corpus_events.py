@@ -0,0 +1,39 @@
+import os
+
+from app.tests.conftest import bump_in_other_process
+from WeaviateGeminiInterface import corpus_events
+from WeaviateGeminiInterface.corpus_events import corpus_version, notify_corpus_changed
+
+
+def test_every_bump_gives_a_new_version(corpus_version_dir):
+    assert corpus_version("docs") == "0"
+    seen = {corpus_version("docs")}
+    for _ in range(50):
+        notify_corpus_changed("docs")
+        seen.add(corpus_version("docs"))
+    assert len(seen) == 51
+    bump_in_other_process("docs", corpus_version_dir)
+    assert corpus_version("docs") not in seen
+
+
+def test_version_does_not_depend_on_inode_or_mtime(corpus_version_dir):
+    notify_corpus_changed("docs")
+    before = corpus_version("docs")
+    path = corpus_events._version_path("docs")
+    stat = os.stat(path)
+
+    # a bump that lands on the same inode and mtime, as a reused inode on a coarse clock would
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("f" * 32)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(path).st_ino == stat.st_ino and os.stat(path).st_mtime_ns == stat.st_mtime_ns
+    assert corpus_version("docs") != before
+
+
+def test_versions_kept_in_process(monkeypatch):
+    monkeypatch.setattr(corpus_events, "CORPUS_VERSION_DIR", "off")
+    monkeypatch.setattr(corpus_events, "_VERSIONS", {})
+    assert corpus_version("docs") == "0"
+    notify_corpus_changed("docs")
+    assert corpus_version("docs") != "0"
+    assert corpus_version("other_docs") == "0"
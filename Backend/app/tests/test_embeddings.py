@@ -0,0 +1,56 @@
+from WeaviateGeminiInterface.embeddings import CachedEmbedder, EmbeddingCache, HashingEmbedder
+
+
+class CountingEmbedder(HashingEmbedder):
+    """HashingEmbedder that records the batches it is asked to embed."""
+
+    def __init__(self, model_id="hashing-v1"):
+        super().__init__(dim=16)
+        self.model_id = model_id
+        self.batches = []
+
+    def embed_many(self, texts):
+        self.batches.append(list(texts))
+        return [self.embed(text) for text in texts]
+
+
+def close(vector, other):
+    """Cached vectors are stored as float32."""
+    return max(abs(a - b) for a, b in zip(vector, other)) < 1e-6
+
+
+def test_only_misses_are_embedded(tmp_path):
+    model = CountingEmbedder()
+    embedder = CachedEmbedder(model, EmbeddingCache(str(tmp_path / "embeddings.sqlite3")), batch_size=2)
+    texts = ["Hostel curfew", "Mess timings", "Library hours"]
+    first = embedder.embed_many(texts)
+    assert model.batches == [["Hostel curfew", "Mess timings"], ["Library hours"]]
+    assert (embedder.hits, embedder.misses) == (0, 3)
+
+    model.batches.clear()
+    # text differing only in whitespace shares the cached vector; repeats are embedded once
+    again = embedder.embed_many(["Hostel  curfew ", "Exam fees", "Exam fees", "Library hours"])
+    assert model.batches == [["Exam fees"]]
+    assert (embedder.hits, embedder.misses) == (3, 4)
+    assert close(again[0], first[0]) and close(again[3], first[2]) and again[1] == again[2]
+    assert len(embedder.cache) == 4
+
+
+def test_cache_survives_reopening_and_is_per_model(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    CachedEmbedder(CountingEmbedder(), EmbeddingCache(path)).embed_many(["Hostel curfew"])
+
+    model = CountingEmbedder()
+    vectors = CachedEmbedder(model, EmbeddingCache(path)).embed_many(["Hostel curfew"])
+    assert model.batches == []
+    assert close(vectors[0], model.embed("Hostel curfew"))
+
+    other = CountingEmbedder(model_id="other-model")
+    CachedEmbedder(other, EmbeddingCache(path)).embed_many(["Hostel curfew"])
+    assert other.batches == [["Hostel curfew"]]
+
+
+def test_queries_bypass_the_cache(tmp_path):
+    embedder = CachedEmbedder(CountingEmbedder(), EmbeddingCache(str(tmp_path / "embeddings.sqlite3")))
+    assert embedder.embed("When is the curfew?") == HashingEmbedder(dim=16).embed("When is the curfew?")
+    assert len(embedder.cache) == 0 and (embedder.hits, embedder.misses) == (0, 0)
@@ -0,0 +1,49 @@
+import json
+import types
+
+from WeaviateGeminiInterface import gemini_handler
+from WeaviateGeminiInterface.gemini_handler import NO_CONTEXT_ANSWER, generate_answer, stream_answer
+
+
+class FakeModel:
+    """Replies with reply (JSON-encoded when it is a dict), or raises it."""
+
+    def __init__(self, reply):
+        self.reply = reply
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        text = json.dumps(self.reply) if isinstance(self.reply, dict) else self.reply
+        if stream:
+            return [types.SimpleNamespace(text=text[i:i + 7]) for i in range(0, len(text), 7)]
+        return types.SimpleNamespace(text=text, usage_metadata=None)
+
+
+CONTEXT = ["[1] The library opens at 8 AM.", "[2] Books are lent for two weeks."]
+
+
+def test_every_result_has_answer_and_cited(monkeypatch):
+    monkeypatch.delitem(vars(gemini_handler), "GEMINI_MODEL", raising=False)
+    results = [
+        generate_answer(CONTEXT, "When does the library open?",
+                        FakeModel({"answer": "At 8 AM.", "cited_sources": [1, "2"]})),
+        generate_answer(CONTEXT, "When does the library open?", FakeModel("At 8 AM, plain text.")),
+        generate_answer([], "When does the library open?", FakeModel({})),
+        generate_answer(CONTEXT, "When does the library open?", FakeModel(ValueError("bad request"))),
+        generate_answer(CONTEXT, "When does the library open?"),
+    ]
+    assert results[:3] == [
+        {"answer": "At 8 AM.", "cited": [1]},
+        {"answer": "At 8 AM, plain text.", "cited": []},
+        {"answer": NO_CONTEXT_ANSWER, "cited": []},
+    ]
+    for error in results[3:]:
+        assert error["error"] is True and error["cited"] == [] and "sources" not in error
+
+
+def test_stream_yields_deltas_then_the_result():
+    model = FakeModel({"answer": "Open \"daily\" at 8.", "cited_sources": [2]})
+    items = list(stream_answer(CONTEXT, "When does the library open?", model))
+    assert "".join(item for item in items[:-1]) == "Open \"daily\" at 8."
+    assert items[-1] == {"answer": "Open \"daily\" at 8.", "cited": [2]}
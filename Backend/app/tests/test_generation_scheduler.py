@@ -0,0 +1,197 @@
+import threading
+
+import pytest
+
+from WeaviateGeminiInterface import generation_scheduler
+from WeaviateGeminiInterface.generation_scheduler import GenerationOverloaded, GenerationScheduler, TokenBucket
+from WeaviateGeminiInterface.observability import GEMINI_REQUESTS
+
+
+class FakeClock:
+    """Stands in for the time module: sleep() only records the wait unless advance is set."""
+
+    def __init__(self, advance=False):
+        self.now = 1000.0
+        self.advance = advance
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        if self.advance:
+            self.now += seconds
+
+
+class TransientError(Exception):
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(generation_scheduler, "time", clock)
+    # the longest jittered backoff, so the sleeps are predictable
+    monkeypatch.setattr(generation_scheduler.random, "uniform", lambda low, high: high)
+    return clock
+
+
+def test_token_bucket_reserves_and_refills(clock):
+    bucket = TokenBucket(rate=1.0, burst=2)
+    assert [bucket.reserve() for _ in range(4)] == [(0.0, True), (0.0, True), (1.0, True), (2.0, True)]
+    # over max_wait: refused, and no token is taken
+    assert bucket.reserve(max_wait=2.5) == (3.0, False)
+    assert bucket.reserve(max_wait=3.0) == (3.0, True)
+
+    clock.now += 1.5
+    assert bucket.reserve() == pytest.approx((2.5, True))
+    # refills up to burst, no further
+    clock.now += 100
+    assert [bucket.reserve()[0] for _ in range(3)] == [0.0, 0.0, 1.0]
+
+
+def test_calls_are_paced_and_shed_with_retry_after(clock):
+    scheduler = GenerationScheduler(rpm=60, burst=1, max_wait=2.0)
+    assert [scheduler.call(lambda: "ok") for _ in range(3)] == ["ok"] * 3
+    assert clock.sleeps == [1.0, 2.0]
+
+    with pytest.raises(GenerationOverloaded) as overloaded:
+        scheduler.call(lambda: pytest.fail("a shed call must not reach Gemini"))
+    assert overloaded.value.retry_after == 3.0
+    assert "retry in 3s" in str(overloaded.value)
+
+
+def test_full_queue_sheds_before_reserving(clock):
+    scheduler = GenerationScheduler(rpm=30, burst=1, max_queue=4)
+    scheduler._waiting = 4
+    with pytest.raises(GenerationOverloaded) as overloaded:
+        scheduler.call(lambda: "ok")
+    # four callers ahead at one token every two seconds
+    assert overloaded.value.retry_after == 8.0
+    scheduler._waiting = 0
+    assert scheduler.call(lambda: "ok") == "ok"
+
+
+def test_transient_errors_are_retried_with_backoff(clock):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise TransientError("429")
+        return "answer"
+
+    scheduler = GenerationScheduler(retries=3, backoff=0.5, max_backoff=8,
+                                     is_transient=lambda e: isinstance(e, TransientError))
+    assert scheduler.call(flaky) == "answer"
+    assert len(attempts) == 3
+    assert clock.sleeps == [0.5, 1.0]
+
+
+def test_retries_stop_at_the_limit_and_on_other_errors(clock):
+    scheduler = GenerationScheduler(retries=3, backoff=0.5, max_backoff=0.8,
+                                    is_transient=lambda e: isinstance(e, TransientError))
+    attempts = []
+
+    def always_busy():
+        attempts.append(1)
+        raise TransientError("503")
+
+    with pytest.raises(TransientError):
+        scheduler.call(always_busy)
+    assert len(attempts) == 4
+    assert clock.sleeps == [0.5, 0.8, 0.8]
+
+    clock.sleeps.clear()
+    attempts.clear()
+
+    def broken():
+        attempts.append(1)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        scheduler.call(broken)
+    assert len(attempts) == 1
+    assert clock.sleeps == []
+
+
+def coalesced_count():
+    return GEMINI_REQUESTS._values.get(("coalesced",), 0)
+
+
+def run_together(scheduler, fn, followers):
+    """Runs the leader's call and, while it is in flight, followers more with the same key; returns every outcome."""
+    outcomes = []
+    lock = threading.Lock()
+
+    def ask():
+        try:
+            outcome = scheduler.run("same prompt", fn)
+        except Exception as e:
+            outcome = e
+        with lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=ask) for _ in range(followers + 1)]
+    threads[0].start()
+    fn.started.wait(5)
+    before = coalesced_count()
+    for thread in threads[1:]:
+        thread.start()
+    while coalesced_count() < before + followers:
+        threading.Event().wait(0.001)
+    fn.release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+class BlockingCall:
+    """The upstream call: blocks until released, then returns or raises result."""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_identical_prompts_in_flight_share_one_call():
+    scheduler = GenerationScheduler()
+    answer = {"answer": "The library opens at 8 AM."}
+    fn = BlockingCall(answer)
+
+    outcomes = run_together(scheduler, fn, followers=5)
+    assert fn.calls == 1
+    assert len(outcomes) == 6 and all(outcome is answer for outcome in outcomes)
+    assert scheduler.stats() == {"waiting": 0, "in_flight": 0}
+
+    # once answered, the same prompt is sent again
+    assert scheduler.run("same prompt", lambda: "fresh") == "fresh"
+
+
+def test_waiters_get_the_leaders_exception():
+    scheduler = GenerationScheduler()
+    error = RuntimeError("Gemini failed")
+    fn = BlockingCall(error)
+
+    outcomes = run_together(scheduler, fn, followers=3)
+    assert fn.calls == 1
+    assert len(outcomes) == 4 and all(outcome is error for outcome in outcomes)
+
+
+def test_without_coalescing_every_call_is_sent():
+    scheduler = GenerationScheduler(coalesce=False)
+    calls = []
+    for _ in range(3):
+        scheduler.run("same prompt", lambda: calls.append(1))
+    assert len(calls) == 3
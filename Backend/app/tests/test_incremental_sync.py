@@ -0,0 +1,141 @@
+import json
+import os
+
+import pytest
+
+from WeaviateGeminiInterface import incremental_sync
+from WeaviateGeminiInterface.incremental_sync import chunk_hash, chunk_uuid, sync_directory
+from WeaviateGeminiInterface.local_index import LocalIndex
+
+
+def write_pdf(directory, filename, *lines):
+    """A stand-in PDF: parse_lines below turns each line into one chunk."""
+    with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+def parse_lines(file_paths, workers=1, chunking=None):
+    for file_path in file_paths:
+        with open(file_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        filename = os.path.basename(file_path)
+        yield file_path, [{"text_chunk": line, "source_file": filename, "page_number": 1, "chunk_type": "text"}
+                          for line in lines]
+
+
+@pytest.fixture
+def pdfs(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental_sync, "iter_parsed_files", parse_lines)
+    monkeypatch.setattr(incremental_sync, "count_pages", lambda file_path: 1)
+    directory = tmp_path / "pdfs"
+    directory.mkdir()
+    return str(directory)
+
+
+@pytest.fixture
+def index(tmp_path, corpus_version_dir):
+    index = LocalIndex(str(tmp_path / "index"), "docs")
+    yield index
+    index.close()
+
+
+def stored(index):
+    """{chunk text: uuid} of everything in the index."""
+    return {chunk["text_chunk"]: chunk["uuid"] for chunk in index.retrieve("rules", limit=1000, with_metadata=True)}
+
+
+def manifest(pdfs):
+    with open(os.path.join(pdfs, ".ingest_manifest.local.docs.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_new_files_are_inserted_with_stable_ids(pdfs, index):
+    write_pdf(pdfs, "rules.pdf", "Hostel curfew is at 10 PM.", "Mess timings are 7 to 9 AM.")
+    summary = sync_directory(index, pdfs)
+    assert (summary["new"], summary["chunks_inserted"]) == (1, 2)
+
+    ids = stored(index)
+    for text, id_ in ids.items():
+        chunk = {"text_chunk": text}
+        assert id_ == str(chunk_uuid("rules.pdf", chunk_hash(chunk)))
+    record = manifest(pdfs)["files"]["rules.pdf"]
+    assert record["chunks"] == [chunk_hash({"text_chunk": text}) for text in
+                                ("Hostel curfew is at 10 PM.", "Mess timings are 7 to 9 AM.")]
+    assert record["size"] == os.path.getsize(os.path.join(pdfs, "rules.pdf"))
+
+    # nothing changed, nothing written
+    summary = sync_directory(index, pdfs)
+    assert (summary["unchanged"], summary["chunks_inserted"]) == (1, 0)
+
+
+def test_changed_file_keeps_the_ids_of_unchanged_chunks(pdfs, index):
+    write_pdf(pdfs, "rules.pdf", "Hostel curfew is at 10 PM.", "Mess timings are 7 to 9 AM.")
+    sync_directory(index, pdfs)
+    before = stored(index)
+    old_sha = manifest(pdfs)["files"]["rules.pdf"]["sha256"]
+
+    write_pdf(pdfs, "rules.pdf", "Hostel curfew is at 10 PM.", "Mess timings are 7 to 10 AM.")
+    summary = sync_directory(index, pdfs)
+    assert (summary["changed"], summary["chunks_inserted"]) == (1, 1)
+
+    after = stored(index)
+    assert after["Hostel curfew is at 10 PM."] == before["Hostel curfew is at 10 PM."]
+    assert set(after) == {"Hostel curfew is at 10 PM.", "Mess timings are 7 to 10 AM."}
+    record = manifest(pdfs)["files"]["rules.pdf"]
+    assert record["sha256"] != old_sha and len(record["chunks"]) == 2
+
+
+def test_removed_files_are_deleted_from_index_and_manifest(pdfs, index):
+    write_pdf(pdfs, "rules.pdf", "Hostel curfew is at 10 PM.")
+    write_pdf(pdfs, "library.pdf", "The library opens at 8 AM.")
+    sync_directory(index, pdfs)
+
+    os.remove(os.path.join(pdfs, "rules.pdf"))
+    summary = sync_directory(index, pdfs)
+    assert summary["removed"] == 1
+    assert set(stored(index)) == {"The library opens at 8 AM."}
+    assert set(manifest(pdfs)["files"]) == {"library.pdf"}
+
+
+class FailingDelete:
+    """Wraps a backend, recording its calls; deletes fail while `broken` is set."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name, self.kind = backend.name, backend.kind
+        self.calls = []
+        self.broken = True
+
+    def ingest(self, data_objects, uuids=None, batch_size=None):
+        self.calls.append("ingest")
+        return self.backend.ingest(data_objects, uuids=uuids, batch_size=batch_size)
+
+    def delete_by_source(self, source_file, keep_ids=None):
+        self.calls.append("delete")
+        if self.broken:
+            raise ConnectionError("connection lost")
+        return self.backend.delete_by_source(source_file, keep_ids=keep_ids)
+
+
+def test_interrupted_sync_loses_nothing_and_resumes(pdfs, index):
+    write_pdf(pdfs, "rules.pdf", "Hostel curfew is at 10 PM.", "Mess timings are 7 to 9 AM.")
+    sync_directory(index, pdfs)
+    old_record = manifest(pdfs)["files"]["rules.pdf"]
+
+    write_pdf(pdfs, "rules.pdf", "Hostel curfew is at 11 PM.", "Mess timings are 7 to 9 AM.")
+    backend = FailingDelete(index)
+    with pytest.raises(ConnectionError):
+        sync_directory(backend, pdfs)
+    # new chunks are inserted before old ones are deleted, so the file stays searchable
+    assert backend.calls == ["ingest", "delete"]
+    assert set(stored(index)) == {"Hostel curfew is at 10 PM.", "Hostel curfew is at 11 PM.",
+                                  "Mess timings are 7 to 9 AM."}
+    # and the manifest still describes the old version, so the next run redoes the file
+    assert manifest(pdfs)["files"]["rules.pdf"] == old_record
+
+    backend.broken = False
+    summary = sync_directory(backend, pdfs)
+    assert summary["changed"] == 1
+    # the new chunk is written again under the same id, overwriting rather than duplicating it
+    assert len(index) == 2
+    assert set(stored(index)) == {"Hostel curfew is at 11 PM.", "Mess timings are 7 to 9 AM."}
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from WeaviateGeminiInterface.json_stream import JSONFieldStreamer
+
+RESPONSE = {
+    "sources": [{"answer": "not this one", "title": "Hours"}],
+    "meta": {"answer": "nor this"},
+    "note": "an \"answer\": here is only text",
+    "answer": "Open 8–8 \"daily\"\\\nsee /hours \U0001F4DA\tok",
+    "confidence": 0.9,
+}
+
+
+def stream(raw, field="answer", size=1):
+    streamer = JSONFieldStreamer(field)
+    pieces = [streamer.feed(raw[i:i + size]) for i in range(0, len(raw), size)]
+    return streamer, pieces
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_field_decodes_like_json_loads_however_it_is_split(ensure_ascii):
+    raw = json.dumps(RESPONSE, ensure_ascii=ensure_ascii)
+    for size in range(1, 14):
+        streamer, pieces = stream(raw, size=size)
+        assert "".join(pieces) == RESPONSE["answer"]
+        assert streamer.value == RESPONSE["answer"]
+        assert streamer.done
+        assert streamer.result() == RESPONSE
+
+
+def test_characters_arrive_as_they_are_generated():
+    streamer = JSONFieldStreamer("answer")
+    assert streamer.feed('{"answer": "The lib') == "The lib"
+    assert streamer.feed('rary opens\\') == "rary opens"
+    assert streamer.feed('nat 8') == "\nat 8"
+    assert not streamer.done
+    assert streamer.feed('", "sources": []}') == ""
+    assert streamer.done
+    assert streamer.result() == {"answer": "The library opens\nat 8", "sources": []}
+
+
+def test_surrogate_pair_split_across_pieces():
+    streamer = JSONFieldStreamer("answer")
+    assert streamer.feed('{"answer": "books \\ud83d') == "books "
+    assert streamer.feed('\\udc') == ""
+    assert streamer.feed('da"}') == "\U0001F4DA"
+
+
+def test_same_name_inside_other_values_is_ignored():
+    raw = json.dumps({"sources": [{"answer": "nested"}], "meta": {"answer": "nested"}, "note": "answer"})
+    streamer, pieces = stream(raw)
+    assert "".join(pieces) == ""
+    assert not streamer.done
+
+
+def test_non_string_field_streams_nothing():
+    streamer, pieces = stream(json.dumps({"answer": None, "sources": [], "confidence": 1}))
+    assert "".join(pieces) == ""
+    streamer, pieces = stream(json.dumps({"answer": 3, "other": "x"}))
+    assert "".join(pieces) == ""
+
+
+def test_result_is_none_until_the_object_is_complete():
+    streamer = JSONFieldStreamer("answer")
+    streamer.feed('{"answer": "partial"')
+    assert streamer.value == "partial"
+    assert streamer.result() is None
+    streamer.feed("}")
+    assert streamer.result() == {"answer": "partial"}
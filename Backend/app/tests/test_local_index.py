@@ -0,0 +1,145 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from WeaviateGeminiInterface import corpus_events, local_index
+from WeaviateGeminiInterface.corpus_events import corpus_version
+from WeaviateGeminiInterface.local_index import LocalIndex
+
+
+def chunks(source_file, *texts):
+    return [{"text_chunk": text, "source_file": source_file, "page_number": 1} for text in texts]
+
+
+def texts(results):
+    return sorted(result["text_chunk"] for result in results)
+
+
+def meta(path, name="docs"):
+    with open(os.path.join(path, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def index(tmp_path, corpus_version_dir):
+    index = LocalIndex(str(tmp_path), "docs")
+    index.ingest(chunks("rules.pdf", "Hostel curfew is at 10 PM.", "Mess timings are 7 to 9 AM."))
+    index.ingest(chunks("library.pdf", "The library opens at 8 AM.", "Books are lent for two weeks.",
+                        "Late returns cost five rupees a day.", "The reading room is open all night."))
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize("mode", ["vector", "keyword", "hybrid"])
+def test_retrieve(index, mode):
+    results = index.retrieve("When does the library open?", limit=2, with_metadata=True, mode=mode)
+    assert results[0]["text_chunk"] == "The library opens at 8 AM."
+    assert results[0]["source_file"] == "library.pdf"
+    assert len(index) == 6
+
+
+def test_writes_append_to_the_same_generation(index, tmp_path):
+    before = meta(tmp_path)
+    vectors_file = os.path.join(tmp_path, f"docs.{before['generation']}.f32")
+    size = os.path.getsize(vectors_file)
+    index.ingest(chunks("exams.pdf", "Exam fees are paid on the portal."))
+
+    after = meta(tmp_path)
+    assert after["generation"] == before["generation"]
+    assert after["rows"] == before["rows"] + 1
+    assert os.path.getsize(vectors_file) == size + index.embedder.dim * 4
+    assert index.retrieve("exam fees portal", limit=1) == ["Exam fees are paid on the portal."]
+
+
+def test_delete_and_replace(index):
+    index.delete_by_source("rules.pdf")
+    assert len(index) == 4
+    assert "Hostel curfew is at 10 PM." not in texts(index.retrieve("hostel curfew", limit=6, with_metadata=True,
+                                                                  mode="hybrid"))
+
+    ids = [row_id for row_id, row in index._row_of.items() if index._chunks[row]["text_chunk"].startswith("Late")]
+    index.ingest(chunks("library.pdf", "Late returns cost ten rupees a day."), uuids=ids)
+    index.delete_by_source("library.pdf", keep_ids=ids)
+    assert texts(index.retrieve("late returns", limit=6, with_metadata=True, mode="keyword")) == [
+        "Late returns cost ten rupees a day."]
+
+
+def test_compaction_rewrites_without_deleted_rows(index, tmp_path):
+    index.ingest(chunks("notices.pdf", *(f"Notice number {n}." for n in range(10))))
+    generation = meta(tmp_path)["generation"]
+    # 2 of 16 rows deleted
+    index.delete_by_source("rules.pdf")
+    assert meta(tmp_path)["generation"] == generation
+
+    # 5 of 16
+    kept = [row_id for row_id, row in index._row_of.items() if index._chunks[row]["source_file"] == "library.pdf"][:1]
+    index.delete_by_source("library.pdf", keep_ids=kept)
+    after = meta(tmp_path)
+    assert after["generation"] != generation
+    assert (after["rows"], after["deleted"]) == (11, 0)
+    assert index.retrieve("notice number 3", limit=1, mode="keyword") == ["Notice number 3."]
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith("docs.")) == sorted(["docs.json"] + [f"docs.{after['generation']}.{kind}"
+                                                                   for kind in ("f32", "jsonl", "del")])
+
+
+def test_reader_picks_up_changes_without_bumping_the_version(index, tmp_path, monkeypatch):
+    reader = LocalIndex(str(tmp_path), "docs")
+    reloads = []
+    monkeypatch.setattr(corpus_events, "_LISTENERS", [reloads.append])
+
+    index.ingest(chunks("exams.pdf", "Exam fees are paid on the portal."))
+    version = corpus_version("docs")
+    assert reloads == ["docs"]
+
+    assert reader.retrieve("exam fees portal", limit=1) == ["Exam fees are paid on the portal."]
+    reader.retrieve("exam fees portal", limit=1)
+    assert corpus_version("docs") == version
+    assert reloads == ["docs", "docs"]
+
+    index.delete_by_source("exams.pdf")
+    assert "Exam fees are paid on the portal." not in reader.retrieve("exam fees portal", limit=6)
+    reader.close()
+
+
+def test_fresh_start_empties_the_index_and_bumps_the_version(index, tmp_path):
+    version = corpus_version("docs")
+    fresh = LocalIndex(str(tmp_path), "docs", fresh_start=True)
+    assert len(fresh) == 0
+    assert corpus_version("docs") != version
+    fresh.close()
+
+    # opening an index that doesn't exist yet has nothing to invalidate
+    version = corpus_version("docs")
+    LocalIndex(str(tmp_path / "new"), "docs", fresh_start=True).close()
+    assert corpus_version("docs") == version
+
+
+def test_interrupted_write_is_ignored_and_overwritten(index, tmp_path):
+    generation = meta(tmp_path)["generation"]
+    for kind in ("f32", "jsonl", "del"):
+        with open(os.path.join(tmp_path, f"docs.{generation}.{kind}"), "ab") as f:
+            f.write(b"\x00partial")
+
+    reader = LocalIndex(str(tmp_path), "docs")
+    assert len(reader) == 6
+    index.ingest(chunks("exams.pdf", "Exam fees are paid on the portal."))
+    assert reader.retrieve("exam fees portal", limit=1) == ["Exam fees are paid on the portal."]
+    assert len(reader) == 7
+
+
+def test_version_1_index_is_read_and_converted(tmp_path, corpus_version_dir):
+    index = LocalIndex(str(tmp_path), "docs")
+    old_chunks = [{**chunk, "uuid": f"id-{n}"} for n, chunk in enumerate(
+        chunks("rules.pdf", "Hostel curfew is at 10 PM.", "The library opens at 8 AM."))]
+    np.save(os.path.join(tmp_path, "docs.old.npy"), index._embed([chunk["text_chunk"] for chunk in old_chunks]))
+    with open(os.path.join(tmp_path, "docs.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "model_id": index.embedder.model_id, "dim": index.embedder.dim,
+                   "vectors_file": "docs.old.npy", "chunks": old_chunks}, f)
+
+    assert index.retrieve("library opening", limit=1) == ["The library opens at 8 AM."]
+    index.ingest(chunks("exams.pdf", "Exam fees are paid on the portal."))
+    assert meta(tmp_path)["version"] == local_index.INDEX_VERSION
+    assert not os.path.exists(os.path.join(tmp_path, "docs.old.npy"))
+    assert len(index) == 3
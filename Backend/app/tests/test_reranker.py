@@ -0,0 +1,64 @@
+import pytest
+
+from WeaviateGeminiInterface.reranker import CrossEncoderReranker, LexicalReranker, rerank, sigmoid
+
+
+class FakeCrossEncoder:
+    """Returns fixed logits, like CrossEncoder.predict on an ms-marco model."""
+
+    def __init__(self, logits):
+        self.logits = logits
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        return self.logits[:len(pairs)]
+
+
+def chunks(count):
+    return [{"text_chunk": f"chunk {n}", "score": 1.0 - n / 10} for n in range(count)]
+
+
+def kept(logits, max_chunks=5):
+    reranker = CrossEncoderReranker("cross-encoder/ms-marco-MiniLM-L-6-v2", model=FakeCrossEncoder(logits))
+    return [chunk["text_chunk"] for chunk in rerank("q", chunks(len(logits)), reranker, max_chunks,
+                                                    threshold=0.3, relative_threshold=0.8)]
+
+
+def test_sigmoid():
+    assert sigmoid(0) == 0.5
+    assert sigmoid(-1000) == 0.0
+    assert sigmoid(1000) == 1.0
+    assert sigmoid(-2) == pytest.approx(1 - sigmoid(2))
+
+
+def test_cross_encoder_scores_are_probabilities():
+    reranker = CrossEncoderReranker("m", model=FakeCrossEncoder([8.5, -0.5, -11.0]))
+    scores = reranker.score("q", ["a", "b", "c"])
+    assert all(0 < score < 1 for score in scores)
+    assert scores == pytest.approx([0.99980, 0.37754, 0.0000167], rel=1e-3)
+
+
+def test_thresholds_on_confident_logits():
+    # raw logits would put the relative floor at 6.8 and drop the third chunk (sigmoid 0.88)
+    assert kept([8.5, 7.9, 2.0, -3.0, -9.0]) == ["chunk 0", "chunk 1", "chunk 2"]
+
+
+def test_thresholds_on_negative_logits():
+    # with raw logits the floor of -0.4 is above the best score; only the best would be kept
+    assert kept([-0.7, -0.5, -4.0]) == ["chunk 1", "chunk 0"]
+    # nothing clears the threshold: the best chunk is still kept
+    assert kept([-6.0, -3.0, -5.0]) == ["chunk 1"]
+
+
+def test_rerank_keeps_retrieval_score_and_top_k():
+    reranked = rerank("q", chunks(4), CrossEncoderReranker("m", model=FakeCrossEncoder([3.0, 4.0, 3.5, 3.2])), 2)
+    assert [chunk["text_chunk"] for chunk in reranked] == ["chunk 1", "chunk 2"]
+    assert reranked[0]["retrieval_score"] == 0.9
+    assert reranked[0]["score"] == pytest.approx(sigmoid(4.0))
+
+
+def test_lexical_reranker_prefers_the_distinctive_term():
+    texts = ["Dr Asha Raman sits in cabin AB1-204.", "Dr Vikram Iyer sits in cabin AB2-110.",
+             "Cabins are in the academic blocks."]
+    scores = LexicalReranker().score("Where is Dr Asha Raman's cabin?", texts)
+    assert scores[0] == max(scores)
+    assert all(0 <= score <= 1 for score in scores)
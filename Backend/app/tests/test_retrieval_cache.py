@@ -0,0 +1,179 @@
+import threading
+import types
+
+import pytest
+
+from app.tests.conftest import bump_in_other_process
+from WeaviateGeminiInterface import corpus_events, retrieval_cache
+from WeaviateGeminiInterface.corpus_events import notify_corpus_changed
+from WeaviateGeminiInterface.retrieval_cache import CacheWarmer, RetrievalCache, load_warmup_queries, normalize_query
+
+BACKEND = types.SimpleNamespace(kind="local", name="docs")
+SETTINGS = {"limit": 5, "hybrid": True}
+
+
+class Search:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [{"text_chunk": f"result {self.calls}", "page_number": 1}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    clock.time = lambda: clock.now
+    monkeypatch.setattr(retrieval_cache, "time", clock)
+    return clock
+
+
+def test_trivial_variants_share_an_entry(corpus_version_dir):
+    cache, search = RetrievalCache(), Search()
+    first = cache.fetch(BACKEND, "What are the library hours?", SETTINGS, search)
+    again = cache.fetch(BACKEND, "  what are THE library hours ", SETTINGS, search)
+    assert search.calls == 1 and again == first
+    # callers get their own copies
+    again[0]["text_chunk"] = "edited"
+    assert cache.fetch(BACKEND, "what are the library hours", SETTINGS, search)[0]["text_chunk"] == "result 1"
+
+    cache.fetch(BACKEND, "What are the library hours?", {**SETTINGS, "limit": 10}, search)
+    cache.fetch(types.SimpleNamespace(kind="weaviate", name="docs"), "What are the library hours?", SETTINGS, search)
+    assert search.calls == 3
+    assert normalize_query("Hostel-fees, 2024?") == "hostel fees 2024"
+
+
+def test_entries_are_stale_after_a_change_in_this_process(corpus_version_dir):
+    cache, search = RetrievalCache(), Search()
+    cache.fetch(BACKEND, "hostel fees", SETTINGS, search)
+    notify_corpus_changed("other_docs")
+    cache.fetch(BACKEND, "hostel fees", SETTINGS, search)
+    assert search.calls == 1
+
+    notify_corpus_changed("docs")
+    assert cache.fetch(BACKEND, "hostel fees", SETTINGS, search)[0]["text_chunk"] == "result 2"
+    assert cache.fetch(BACKEND, "hostel fees", SETTINGS, search)[0]["text_chunk"] == "result 2"
+
+
+def test_entries_are_stale_after_a_change_in_another_process(corpus_version_dir):
+    cache, search = RetrievalCache(), Search()
+    cache.fetch(BACKEND, "hostel fees", SETTINGS, search)
+    bump_in_other_process("docs", corpus_version_dir)
+    cache.fetch(BACKEND, "hostel fees", SETTINGS, search)
+    assert search.calls == 2
+
+
+def test_a_change_during_the_search_is_not_cached_as_current(corpus_version_dir):
+    cache = RetrievalCache()
+
+    def search_while_ingesting():
+        notify_corpus_changed("docs")
+        return [{"text_chunk": "old"}]
+
+    cache.fetch(BACKEND, "hostel fees", SETTINGS, search_while_ingesting)
+    search = Search()
+    cache.fetch(BACKEND, "hostel fees", SETTINGS, search)
+    assert search.calls == 1
+
+
+def test_failed_searches_are_not_cached(corpus_version_dir):
+    cache, search = RetrievalCache(), Search()
+
+    def weaviate_down():
+        # what retrieve_chunks returns after logging a WeaviateQueryError
+        return []
+
+    assert cache.fetch(BACKEND, "hostel fees", SETTINGS, weaviate_down) == []
+    assert len(cache) == 0
+    assert cache.fetch(BACKEND, "hostel fees", SETTINGS, search)[0]["text_chunk"] == "result 1"
+
+    def timeout():
+        raise TimeoutError("backend timed out")
+
+    with pytest.raises(TimeoutError):
+        cache.fetch(BACKEND, "library hours", SETTINGS, timeout)
+    cache.fetch(BACKEND, "library hours", SETTINGS, search)
+    assert search.calls == 2
+
+
+def test_entries_expire_after_ttl(corpus_version_dir, clock):
+    cache, search = RetrievalCache(ttl=60), Search()
+    cache.fetch(BACKEND, "hostel fees", SETTINGS, search)
+    clock.now += 60
+    cache.fetch(BACKEND, "hostel fees", SETTINGS, search)
+    assert search.calls == 1
+    clock.now += 61
+    cache.fetch(BACKEND, "hostel fees", SETTINGS, search)
+    assert search.calls == 2
+
+
+def test_least_recently_used_entry_is_evicted(corpus_version_dir):
+    cache, search = RetrievalCache(max_entries=2), Search()
+    cache.fetch(BACKEND, "first", SETTINGS, search)
+    cache.fetch(BACKEND, "second", SETTINGS, search)
+    cache.fetch(BACKEND, "first", SETTINGS, search)
+    cache.fetch(BACKEND, "third", SETTINGS, search)
+    assert len(cache) == 2 and search.calls == 3
+    cache.fetch(BACKEND, "first", SETTINGS, search)
+    assert search.calls == 3
+    cache.fetch(BACKEND, "second", SETTINGS, search)
+    assert search.calls == 4
+
+
+def test_load_warmup_queries(tmp_path):
+    path = tmp_path / "warmup.txt"
+    path.write_text("# popular questions\nlibrary hours\n\n  hostel fees  \n", encoding="utf-8")
+    assert load_warmup_queries(str(path)) == ["library hours", "hostel fees"]
+    assert load_warmup_queries(str(tmp_path / "missing.txt")) == []
+
+
+class Warm:
+    """Counts warmups; the first `failures` of them raise."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.condition = threading.Condition()
+
+    def __call__(self):
+        with self.condition:
+            self.calls += 1
+            self.condition.notify_all()
+        if self.calls <= self.failures:
+            raise RuntimeError("search backend down")
+
+    def wait_for(self, calls, timeout=5):
+        with self.condition:
+            return self.condition.wait_for(lambda: self.calls >= calls, timeout)
+
+
+@pytest.fixture
+def listeners(monkeypatch):
+    monkeypatch.setattr(corpus_events, "_LISTENERS", [])
+
+
+def test_warmer_runs_at_start_and_after_each_change(corpus_version_dir, listeners):
+    warm = Warm()
+    warmer = CacheWarmer(warm, ["docs"], interval=60).start()
+    try:
+        assert warm.wait_for(1)
+        notify_corpus_changed("other_docs")
+        notify_corpus_changed("docs")
+        assert warm.wait_for(2)
+        assert not warm.wait_for(3, timeout=0.2)
+    finally:
+        warmer.stop()
+    assert warm.calls == 2
+
+
+def test_warmer_notices_other_processes_and_retries_failures(corpus_version_dir, listeners):
+    warm = Warm(failures=1)
+    warmer = CacheWarmer(warm, ["docs"], interval=0.05).start()
+    try:
+        assert warm.wait_for(2)
+        assert not warm.wait_for(3, timeout=0.2)
+        bump_in_other_process("docs", corpus_version_dir)
+        assert warm.wait_for(3)
+    finally:
+        warmer.stop()
@@ -0,0 +1,85 @@
+import contextvars
+
+import pytest
+
+from WeaviateGeminiInterface import RAG_CORE
+from WeaviateGeminiInterface.RAG_CORE import retrieve_context, search_collections
+
+REQUEST_ID = contextvars.ContextVar("request_id", default=None)
+
+
+class FakeBackend:
+    kind = "local"
+
+    def __init__(self, name, results):
+        self.name = name
+        self.results = results
+        self.request_ids = []
+
+    def retrieve(self, query_text, limit=3, with_metadata=False, **settings):
+        self.request_ids.append(REQUEST_ID.get())
+        if isinstance(self.results, Exception):
+            raise self.results
+        return [{"text_chunk": text, "score": score} for text, score in self.results][:limit]
+
+
+class FakeRuntime:
+    reranker = None
+    collection_name = "VIT_docs"
+
+    def __init__(self, *backends):
+        self.backends = {backend.name: backend for backend in backends}
+        self.unhealthy = False
+
+    def get_backend(self, name=None):
+        if (name or self.collection_name) not in self.backends:
+            raise ValueError(f"Unknown collection '{name}'")
+        return self.backends[name or self.collection_name]
+
+    def mark_unhealthy(self):
+        self.unhealthy = True
+
+
+@pytest.fixture(autouse=True)
+def no_retrieval_cache(monkeypatch):
+    monkeypatch.setattr(RAG_CORE, "RETRIEVAL_CACHE", None)
+
+
+def test_results_are_merged_by_score_without_duplicates():
+    runtime = FakeRuntime(
+        FakeBackend("VIT_docs", [("Curfew is at 10 PM.", 0.9), ("Mess opens at 7.", 0.4), ("No score.", None)]),
+        FakeBackend("hostel_docs", [("Hostel B curfew is 11 PM.", 0.8), ("Curfew is at 10 PM.", 0.7)]),
+    )
+    chunks = search_collections("curfew", ["VIT_docs", "hostel_docs"], runtime, {"limit": 10})
+    assert [(chunk["text_chunk"], chunk["collection"]) for chunk in chunks] == [
+        ("Curfew is at 10 PM.", "VIT_docs"),
+        ("Hostel B curfew is 11 PM.", "hostel_docs"),
+        ("Mess opens at 7.", "VIT_docs"),
+        ("No score.", "VIT_docs"),
+    ]
+    assert [chunk["text_chunk"] for chunk in search_collections("curfew", ["VIT_docs", "hostel_docs"], runtime,
+                                                                {"limit": 2})] == [
+        "Curfew is at 10 PM.", "Hostel B curfew is 11 PM."]
+
+
+def test_searches_run_in_the_callers_context():
+    backends = [FakeBackend(name, [(name, 0.5)]) for name in ("VIT_docs", "hostel_docs", "exam_docs")]
+    REQUEST_ID.set("req-42")
+    search_collections("curfew", [backend.name for backend in backends], FakeRuntime(*backends), {"limit": 3})
+    assert [backend.request_ids for backend in backends] == [["req-42"]] * 3
+
+
+def test_a_failing_collection_fails_the_search():
+    runtime = FakeRuntime(
+        FakeBackend("VIT_docs", [("Curfew is at 10 PM.", 0.9)]),
+        FakeBackend("hostel_docs", ConnectionError("hostel_docs unreachable")),
+    )
+    with pytest.raises(ConnectionError):
+        retrieve_context("curfew", runtime, {"collections": ["VIT_docs", "hostel_docs"]})
+    assert runtime.unhealthy
+
+    # an unknown collection is the caller's mistake, not a connection problem
+    runtime = FakeRuntime(FakeBackend("VIT_docs", [("Curfew is at 10 PM.", 0.9)]))
+    with pytest.raises(ValueError):
+        retrieve_context("curfew", runtime, {"collections": ["VIT_docs", "missing_docs"]})
+    assert not runtime.unhealthy
@@ -0,0 +1,68 @@
+import pytest
+
+from app.database import SessionStore
+from app.tests.conftest import bump_in_other_process
+from WeaviateGeminiInterface.corpus_events import corpus_version
+
+
+def chunk(text, collection="VIT_docs", **extra):
+    return {"text_chunk": text, "source_file": "rules.pdf", "page_number": 1, "collection": collection,
+            "vector": [0.1] * 8, **extra}
+
+
+@pytest.fixture
+def store(tmp_path, corpus_version_dir):
+    return SessionStore(str(tmp_path / "sessions.sqlite3"), max_turns=2, max_answer_chars=10, max_chunks=2)
+
+
+def test_turns_are_trimmed_and_chunks_compacted(store):
+    session_id = store.create()
+    for n in range(3):
+        assert store.add_turn(session_id, f"q{n}", f"standalone {n}", "a long answer " * 3, [], [
+            chunk(f"chunk {n}a"), chunk(f"chunk {n}b"), chunk(f"chunk {n}c")])
+
+    session = store.get(session_id)
+    assert [turn["query"] for turn in session["turns"]] == ["q1", "q2"]
+    assert session["turns"][-1]["answer"] == "a long ans"
+    assert [c["text_chunk"] for c in session["chunks"]] == ["chunk 2a", "chunk 2b"]
+    assert "vector" not in session["chunks"][0]
+
+
+def test_unknown_expired_and_deleted_sessions(store):
+    assert store.get("missing") is None
+    assert not store.add_turn("missing", "q", "q", "a", [], [])
+
+    session_id = store.create()
+    store.ttl = -1
+    assert store.get(session_id) is None
+    store.ttl = 86400
+    assert store.delete(session_id)
+    assert not store.delete(session_id)
+
+
+def test_chunks_are_dropped_after_ingest_in_another_process(store, corpus_version_dir):
+    session_id = store.create()
+    versions = {"VIT_docs": corpus_version("VIT_docs"), "hostel_docs": corpus_version("hostel_docs")}
+    store.add_turn(session_id, "q", "q", "a", [], [chunk("rules"), chunk("mess menu", "hostel_docs")], versions)
+    assert len(store.get(session_id)["chunks"]) == 2
+
+    bump_in_other_process("VIT_docs", corpus_version_dir)
+    session = store.get(session_id)
+    assert [c["text_chunk"] for c in session["chunks"]] == ["mess menu"]
+    # the turns themselves are kept
+    assert len(session["turns"]) == 1
+
+
+def test_chunks_keep_the_version_they_were_retrieved_under(store, corpus_version_dir):
+    session_id = store.create()
+    before = {"VIT_docs": corpus_version("VIT_docs")}
+    bump_in_other_process("VIT_docs", corpus_version_dir)
+    # retrieved before the change, stored after it
+    store.add_turn(session_id, "q", "q", "a", [], [chunk("rules")], before)
+    assert store.get(session_id)["chunks"] == []
+
+    # a chunk reused from the previous turn carries its version along
+    store.add_turn(session_id, "q", "q", "a", [], [chunk("rules")], {"VIT_docs": corpus_version("VIT_docs")})
+    reused = store.get(session_id)["chunks"]
+    store.add_turn(session_id, "q2", "q2", "a", [], reused)
+    assert [c["text_chunk"] for c in store.get(session_id)["chunks"]] == ["rules"]
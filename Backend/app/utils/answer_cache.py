@@ -0,0 +1,321 @@
+# answer cache in front of the RAG pipeline: an exact tier on normalized query text
+# and a semantic tier that reuses answers for near-identical questions
+import json
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from WeaviateGeminiInterface.observability import CACHE_LOOKUPS
+# the retrieval cache keys on the same normalization
+from WeaviateGeminiInterface.retrieval_cache import normalize_query
+
+
+class EmbeddingMatrix:
+    """
+    The semantic tier's query embeddings as the rows of one float32 matrix, so a
+    lookup scores every cached query with a single matrix-vector product instead
+    of a Python loop. Rows of removed keys are reused. NumPy is imported on first
+    use, which keeps it out of the API's import time.
+    """
+
+    def __init__(self):
+        self._rows = None  # (capacity, dim), allocated by the first add()
+        self._keys = []  # row -> key, None for a free row
+        self._row_of = {}
+        self._free = []
+
+    def keys(self):
+        return self._row_of.keys()
+
+    def add(self, key, embedding):
+        import numpy as np
+
+        if not len(embedding) or (self._rows is not None and len(embedding) != self._rows.shape[1]):
+            # no embedder, or one of another size than the rest
+            return
+        row = self._row_of.get(key)
+        if row is None:
+            row = self._free.pop() if self._free else len(self._keys)
+            if row == len(self._keys):
+                self._keys.append(None)
+            if self._rows is None:
+                self._rows = np.zeros((64, len(embedding)), dtype=np.float32)
+            elif row == len(self._rows):
+                self._rows = np.concatenate([self._rows, np.zeros_like(self._rows)])
+            self._keys[row] = key
+            self._row_of[key] = row
+        self._rows[row] = embedding
+
+    def remove(self, key):
+        row = self._row_of.pop(key, None)
+        if row is not None:
+            self._keys[row] = None
+            self._rows[row] = 0.0
+            self._free.append(row)
+
+    def clear(self):
+        self.__init__()
+
+    def nearest(self, embedding, threshold):
+        """Keys whose embedding's dot product with embedding is at least threshold, best first."""
+        import numpy as np
+
+        if not self._row_of or len(embedding) != self._rows.shape[1]:
+            return []
+        scores = self._rows[:len(self._keys)] @ np.asarray(embedding, dtype=np.float32)
+        rows = np.flatnonzero(scores >= threshold)
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return [self._keys[row] for row in rows if self._keys[row] is not None]
+
+
+class MemoryCacheBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at, corpus version)
+        self._matrix = EmbeddingMatrix()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (value, corpus version) for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[2]
+
+    def set(self, key, value, embedding, ttl, version=""):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl, version)
+            self._entries.move_to_end(key)
+            self._matrix.add(key, embedding)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def nearest(self, embedding, threshold):
+        """Keys of the entries whose query embedding scores at least threshold against embedding, best first."""
+        with self._lock:
+            return self._matrix.nearest(embedding, threshold)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        self._matrix.remove(key)
+
+
+class SQLiteCacheBackend:
+    """
+    File-backed store that survives restarts and can be shared by workers on one host.
+    Each connection keeps the semantic tier in an EmbeddingMatrix, updated by its
+    own writes and, when SQLite reports that another connection wrote, by comparing
+    its keys with the table's.
+    """
+
+    def __init__(self, path, max_entries=1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._matrix = EmbeddingMatrix()
+        # PRAGMA data_version when the matrix was last synced; None before the first sync
+        self._data_version = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answer_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                corpus_version TEXT NOT NULL DEFAULT ''
+            )"""
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(answer_cache)")]
+        if "corpus_version" not in columns:
+            # a cache file from before answers were versioned; its entries never match a version
+            self._conn.execute("ALTER TABLE answer_cache ADD COLUMN corpus_version TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+
+    def get(self, key):
+        """Returns (value, corpus version) for key, or None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, corpus_version FROM answer_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._matrix.remove(key)
+                return None
+            if row[1] < now:
+                self._delete([key])
+                return None
+            self._conn.execute("UPDATE answer_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return json.loads(row[0]), row[2]
+
+    def set(self, key, value, embedding, ttl, version=""):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answer_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(value), array("f", embedding).tobytes(), now + ttl, now, version),
+            )
+            self._matrix.add(key, embedding)
+            # evict expired entries first, then the least recently used beyond the size bound
+            expired = self._conn.execute("SELECT key FROM answer_cache WHERE expires_at < ?", (now,)).fetchall()
+            overflow = self._conn.execute(
+                "SELECT key FROM answer_cache WHERE expires_at >= ? ORDER BY last_access DESC LIMIT -1 OFFSET ?",
+                (now, self.max_entries),
+            ).fetchall()
+            self._delete([row[0] for row in expired + overflow])
+
+    def delete(self, key):
+        with self._lock:
+            self._delete([key])
+
+    def nearest(self, embedding, threshold):
+        """Keys of the entries whose query embedding scores at least threshold against embedding, best first."""
+        with self._lock:
+            self._sync_matrix()
+            return self._matrix.nearest(embedding, threshold)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answer_cache")
+            self._conn.commit()
+            self._matrix.clear()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answer_cache").fetchone()[0]
+
+    def _delete(self, keys):
+        self._conn.executemany("DELETE FROM answer_cache WHERE key = ?", [(key,) for key in keys])
+        self._conn.commit()
+        for key in keys:
+            self._matrix.remove(key)
+
+    def _sync_matrix(self):
+        """Adds the entries other connections stored to the matrix and removes those they deleted."""
+        # changes only when another connection commits, so this costs nothing while this one writes alone
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        stored = {row[0] for row in self._conn.execute("SELECT key FROM answer_cache")}
+        for key in self._matrix.keys() - stored:
+            self._matrix.remove(key)
+        added = list(stored - self._matrix.keys())
+        # in batches below SQLite's limit on query parameters
+        for start in range(0, len(added), 500):
+            batch = added[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, embedding FROM answer_cache WHERE key IN ({', '.join('?' * len(batch))})", batch
+            ).fetchall()
+            for key, blob in rows:
+                embedding = array("f")
+                embedding.frombytes(blob)
+                self._matrix.add(key, embedding)
+
+
+def _cache_key(normalized, scope):
+    # normalized queries never contain \x1f (split() treats it as whitespace)
+    return f"{scope}\x1f{normalized}" if scope else normalized
+
+
+def _key_scope(key):
+    return key.rpartition("\x1f")[0] or None
+
+
+class AnswerCache:
+    """
+    Two-tier answer cache. Lookups try the exact normalized query first, then the
+    most similar cached query whose embedding similarity reaches semantic_threshold.
+    Set semantic_threshold to None to disable the semantic tier.
+    scope separates answers produced under different settings (e.g. retrieval
+    overrides); a lookup only ever matches entries of the same scope.
+    version is the corpus version the answer was produced from (see
+    corpus_events.corpus_version); an entry stored under another version is stale,
+    since its sources may have been replaced or deleted, and is dropped on lookup.
+    """
+
+    def __init__(self, backend, embedder=None, ttl=3600, semantic_threshold=0.92):
+        self.backend = backend
+        self.embedder = embedder
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold if embedder is not None else None
+        self._counters = {"exact_hits": 0, "semantic_hits": 0, "stale": 0, "misses": 0}
+        self._counter_lock = threading.Lock()
+
+    def get(self, query, scope=None, version=""):
+        """Returns the cached answer dict for query, or None."""
+        normalized = normalize_query(query)
+        value, stale = self._lookup(_cache_key(normalized, scope), version)
+        if value is not None:
+            self._count("exact_hits")
+            return value
+
+        if self.semantic_threshold is not None:
+            query_embedding = self.embedder.embed(normalized)
+            for cached_key in self.backend.nearest(query_embedding, self.semantic_threshold):
+                if _key_scope(cached_key) != scope:
+                    continue
+                value, cached_stale = self._lookup(cached_key, version)
+                if value is not None:
+                    self._count("semantic_hits")
+                    return value
+                stale = stale or cached_stale
+
+        self._count("stale" if stale else "misses")
+        return None
+
+    def put(self, query, value, scope=None, version=""):
+        """Caches value for query; version should be taken before the answer's retrieval started."""
+        normalized = normalize_query(query)
+        embedding = self.embedder.embed(normalized) if self.embedder is not None else []
+        self.backend.set(_cache_key(normalized, scope), value, embedding, self.ttl, version)
+
+    def _lookup(self, key, version):
+        """Returns (value, stale): the value under key if it was produced from version, else None."""
+        entry = self.backend.get(key)
+        if entry is None:
+            return None, False
+        value, entry_version = entry
+        if entry_version != version:
+            self.backend.delete(key)
+            return None, True
+        return value, False
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._counter_lock:
+            counters = dict(self._counters)
+        lookups = sum(counters.values())
+        hits = counters["exact_hits"] + counters["semantic_hits"]
+        counters["entries"] = len(self.backend)
+        counters["hit_rate"] = hits / lookups if lookups else 0.0
+        return counters
+
+    def _count(self, name):
+        with self._counter_lock:
+            self._counters[name] += 1
+        CACHE_LOOKUPS.inc(result=name)
@@ -1,26 +1,327 @@
 # this is an adaptor to bridge the gemini RAG app with the backend
+import asyncio
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
+from .. import config
+from ..database import get_session_store
+
+from .answer_cache import AnswerCache, MemoryCacheBackend, SQLiteCacheBackend, normalize_query
+
+logger = logging.getLogger(__name__)
+
 try:
-    from WeaviateGeminiInterface.RAG_CORE import query as core_query  # def query(query: str, top_k: int, collections: Optional[List[str]]) -> dict
+    from WeaviateGeminiInterface.RAG_CORE import query as core_query  # def query(user_query: str, runtime=None, retrieval=None) -> dict
+    from WeaviateGeminiInterface.RAG_CORE import retrieve_context, answer_from_chunks, stream_query, sources_from_chunks
+    from WeaviateGeminiInterface.RAG_CORE import retrieve_followup_context, warm_retrieval_cache
+    from WeaviateGeminiInterface.retrieval_cache import CacheWarmer, load_warmup_queries
+    from WeaviateGeminiInterface.conversation import rewrite_query
+    from WeaviateGeminiInterface.runtime import get_runtime
+    from WeaviateGeminiInterface.corpus_events import corpus_version
+    from WeaviateGeminiInterface.embeddings import HashingEmbedder
+    from WeaviateGeminiInterface.gemini_handler import NO_CONTEXT_ANSWER
+    from WeaviateGeminiInterface.generation_scheduler import GenerationOverloaded
+    from WeaviateGeminiInterface.observability import RAG_IN_FLIGHT, span
 except Exception:
-    print("Failed to import query function")
-    
+    logger.exception("Failed to import query function")
+
+
+# the Weaviate and Gemini SDK calls are blocking, so they run on this bounded pool
+# instead of the event loop; its size is the per-worker concurrency limit
+_EXECUTOR = ThreadPoolExecutor(max_workers=config.RAG_MAX_CONCURRENCY, thread_name_prefix="rag")
+
+
+def _build_answer_cache():
+    if config.RAG_CACHE_BACKEND == "off":
+        return None
+    if config.RAG_CACHE_BACKEND == "sqlite":
+        backend = SQLiteCacheBackend(config.RAG_CACHE_PATH, max_entries=config.RAG_CACHE_MAX_ENTRIES)
+    else:
+        backend = MemoryCacheBackend(max_entries=config.RAG_CACHE_MAX_ENTRIES)
+
+    # entries are tagged with the corpus version (see _corpus_version), so answers citing
+    # chunks that were replaced or deleted, even by the ingest command, are never served
+    return AnswerCache(
+        backend,
+        embedder=HashingEmbedder(),
+        ttl=config.RAG_CACHE_TTL,
+        semantic_threshold=config.RAG_CACHE_SEMANTIC_THRESHOLD,
+    )
+
+
+ANSWER_CACHE = _build_answer_cache()
 
-def query_rag(query: str):
+
+def _cache_scope(retrieval):
+    """Requests with retrieval overrides get their own cache entries; plain requests share the default one."""
+    overrides = {key: value for key, value in (retrieval or {}).items() if value is not None}
+    return json.dumps(overrides, sort_keys=True) if overrides else None
+
+
+def searched_corpus_versions(retrieval):
+    """The corpus version of each collection a request searches (see corpus_events.corpus_version)."""
+    collections = (retrieval or {}).get("collections") or [config.RAG_DEFAULT_COLLECTION]
+    return {name: corpus_version(name) for name in collections}
+
+
+def _corpus_version(retrieval):
+    """The corpus versions of the collections a request searches, as one answer cache version."""
+    return ",".join(searched_corpus_versions(retrieval).values())
+
+
+def _cacheable(result):
+    """
+    Failed generations are not cached so the next ask gets a fresh attempt, and
+    neither are answers given without context: retrieval swallows backend errors
+    into no chunks, and the SQLite cache would keep that answer across restarts.
+    """
+    return not result.get("error") and result.get("answer") != NO_CONTEXT_ANSWER
+
+
+def query_rag(query: str, retrieval: Optional[Dict[str, Any]] = None):
     """
     Calls your RAG core and returns a normalized dict:
       { "answer": str, "sources": List[dict] }
+    retrieval holds per-request overrides of the retrieval settings (mode, limit, alpha, fusion, score_cutoff).
+    Raises GenerationOverloaded when Gemini is at capacity.
     Edit here if your RAG return shape differs.
     """
-    # Option B: class-based RAG core (uncomment and adjust if needed)
-    # from WeaviateGeminiInterface.RAG_CORE import RAGCore
-    # core = RAGCore()  # pass any constructor args your core needs
+    RAG_IN_FLIGHT.inc()
+    try:
+        with span("query"):
+            return _answer(query, retrieval)
+    finally:
+        RAG_IN_FLIGHT.dec()
+
 
-    
-    result = core_query(user_query=query)
+def _answer(query, retrieval):
+    scope = _cache_scope(retrieval)
+    # taken before retrieving: an answer from chunks that change meanwhile must not be cached as current
+    version = _corpus_version(retrieval)
+    if ANSWER_CACHE is not None:
+        with span("cache_lookup"):
+            cached = ANSWER_CACHE.get(query, scope, version)
+        if cached is not None:
+            return cached
+
+    # the runtime is created once in the app lifespan and reused across requests
+    result = core_query(user_query=query, runtime=get_runtime(), retrieval=retrieval)
 
     # Normalize result
+    if not result:
+        return {"answer": "Sorry, I encountered an error while answering your question.", "sources": []}
+
+    if ANSWER_CACHE is not None and _cacheable(result):
+        ANSWER_CACHE.put(query, result, scope, version)
+
+    return result
+
+
+def standalone_query(query: str, session: dict) -> str:
+    """The session's next query rewritten to stand on its own (see conversation.rewrite_query)."""
+    previous = session["turns"][-1]["standalone_query"] if session["turns"] else None
+    return rewrite_query(query, previous)
+
+
+def query_rag_session(session_id: str, query: str, retrieval: Optional[Dict[str, Any]] = None):
+    """
+    query_rag for one turn of a conversation session. A follow-up is rewritten into
+    a standalone question first, and chunks retrieved for earlier turns are reused
+    when they still fit, so follow-ups retrieve less. Returns the query_rag dict
+    plus "standalone_query", or None if the session does not exist.
+    """
+    store = get_session_store()
+    # taken before the session's chunks are checked and the turn retrieves more
+    versions = searched_corpus_versions(retrieval)
+    session = store.get(session_id)
+    if session is None:
+        return None
+
+    RAG_IN_FLIGHT.inc()
+    try:
+        with span("query"):
+            standalone, result, chunks = _answer_turn(query, session, retrieval)
+    finally:
+        RAG_IN_FLIGHT.dec()
+
+    if not result.get("error"):
+        store.add_turn(session_id, query, standalone, result["answer"], result.get("sources", []), chunks,
+                       corpus_versions=versions)
+    return {**result, "standalone_query": standalone}
+
+
+def _answer_turn(query, session, retrieval):
+    """Returns (standalone query, result, chunks to keep for the next turn)."""
+    standalone = standalone_query(query, session)
+    scope = _cache_scope(retrieval)
+    version = _corpus_version(retrieval)
+    if ANSWER_CACHE is not None:
+        with span("cache_lookup"):
+            cached = ANSWER_CACHE.get(standalone, scope, version)
+        if cached is not None:
+            return standalone, cached, session["chunks"]
+
+    runtime = get_runtime()
+    try:
+        chunks, _ = retrieve_followup_context(standalone, session["chunks"], runtime, retrieval)
+        result = answer_from_chunks(standalone, chunks, runtime)
+    except GenerationOverloaded:
+        raise
+    except Exception as e:
+        logger.exception(f"Error while answering session turn: {e}")
+        error = {"answer": "Sorry, I encountered an error while answering your question.", "sources": [], "error": True}
+        return standalone, error, session["chunks"]
+
+    if ANSWER_CACHE is not None and _cacheable(result):
+        ANSWER_CACHE.put(standalone, result, scope, version)
+    return standalone, result, chunks
+
+
+def get_chunk(chunk_id: int, collection_name: Optional[str] = None):
+    """
+    A chunk from the collection's local chunk store (see chunk_store.py), as a dict
+    with its text, source file, page, type and collection, or None if it is unknown
+    or was deleted. No Weaviate round trip is made.
+    """
+    runtime = get_runtime()
+    store = runtime.get_chunk_store(collection_name)
+    chunk = store.get(chunk_id) if store is not None else None
+    if chunk is None:
+        return None
+    return {**chunk, "collection": collection_name or runtime.collection_name}
+
+
+async def run_blocking(func, *args):
+    """
+    Runs a blocking RAG call on the RAG thread pool and awaits its result. The call
+    runs in a copy of the caller's context, so the request id and stage timings
+    follow it onto the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_EXECUTOR, context.run, func, *args)
+
+
+async def query_rag_async(query: str, retrieval: Optional[Dict[str, Any]] = None):
+    """Runs query_rag on the RAG thread pool so the event loop stays free for other requests."""
+    return await run_blocking(query_rag, query, retrieval)
+
+
+async def query_rag_session_async(session_id: str, query: str, retrieval: Optional[Dict[str, Any]] = None):
+    """Runs query_rag_session on the RAG thread pool."""
+    return await run_blocking(query_rag_session, session_id, query, retrieval)
+
+
+def _share_chunks(chunk_lists):
+    """
+    Makes queries that retrieved the same chunk point at one shared dict, so a batch
+    holds each chunk once. Returns the number of unique chunks.
+    """
+    pool = {}
+    for chunks in chunk_lists:
+        for i, chunk in enumerate(chunks):
+            chunks[i] = pool.setdefault(chunk.get("uuid") or chunk["text_chunk"], chunk)
+    return len(pool)
+
+
+def _cached_answers(queries, scope, version):
+    """Looks each distinct query up in the answer cache once: {normalized query: cached answer or None}."""
+    answers = {}
+    for query in queries:
+        key = normalize_query(query)
+        if key not in answers:
+            answers[key] = ANSWER_CACHE.get(query, scope, version)
+    return answers
+
+
+async def query_rag_batch(queries: List[str], retrieval: Optional[Dict[str, Any]] = None):
+    """
+    Answers several queries in one go and returns one result per query, in order:
+      { "query", "answer", "sources", "error" }  (error is None on success)
+    Cached answers are returned straight away and repeated queries are answered
+    once. Retrieval for the rest runs concurrently, then generation runs
+    concurrently with at most RAG_BATCH_CONCURRENCY Gemini calls in flight, so
+    the batch takes about as long as its slowest query rather than the sum.
+    """
+    scope = _cache_scope(retrieval)
+    version = _corpus_version(retrieval)
+    # embedding the queries and searching the cache block, so they run on the pool too
+    hits = await run_blocking(_cached_answers, queries, scope, version) if ANSWER_CACHE is not None else {}
+    results: List[Optional[dict]] = [None] * len(queries)
+    pending: Dict[str, List[int]] = {}  # normalized query -> positions asking it
+    for i, query in enumerate(queries):
+        cached = hits.get(normalize_query(query))
+        if cached is not None:
+            results[i] = {"query": query, **cached, "error": None}
+        else:
+            pending.setdefault(normalize_query(query), []).append(i)
+
+    if pending:
+        runtime = await run_blocking(get_runtime)
+        unique = [queries[positions[0]] for positions in pending.values()]
+
+        retrieved = await asyncio.gather(
+            *(run_blocking(retrieve_context, query, runtime, retrieval) for query in unique),
+            return_exceptions=True,
+        )
+        chunk_lists = [chunks for chunks in retrieved if not isinstance(chunks, BaseException)]
+        total = sum(len(chunks) for chunks in chunk_lists)
+        logger.info(f"Batch of {len(queries)} queries: {len(unique)} to answer, {total} chunk(s) retrieved, "
+                    f"{_share_chunks(chunk_lists)} unique.")
+
+        generation_slots = asyncio.Semaphore(config.RAG_BATCH_CONCURRENCY)
+
+        async def answer(query, chunks):
+            if isinstance(chunks, BaseException):
+                return {"answer": None, "sources": [], "error": f"Retrieval failed: {chunks}"}
+            try:
+                async with generation_slots:
+                    result = await run_blocking(answer_from_chunks, query, chunks, runtime)
+            except Exception as e:
+                return {"answer": None, "sources": [], "error": f"Generation failed: {e}"}
+            if result.get("error"):
+                return {"answer": None, "sources": [], "error": result["answer"]}
+            if ANSWER_CACHE is not None and _cacheable(result):
+                await run_blocking(ANSWER_CACHE.put, query, result, scope, version)
+            return {**result, "error": None}
+
+        answers = await asyncio.gather(*(answer(query, chunks) for query, chunks in zip(unique, retrieved)))
+        for positions, result in zip(pending.values(), answers):
+            for i in positions:
+                results[i] = {**result, "query": queries[i]}
+
+    return results
+
+
+_WARMER = None
+
+
+def start_retrieval_warmup():
+    """
+    Starts warming the retrieval cache with the questions in RETRIEVAL_WARMUP_FILE, now
+    and after every change to the default collection, on a background thread.
+    """
+    global _WARMER
+    queries = load_warmup_queries(config.RETRIEVAL_WARMUP_FILE)
+    if not queries:
+        return
+    _WARMER = CacheWarmer(
+        lambda: warm_retrieval_cache(queries, get_runtime()),
+        [config.RAG_DEFAULT_COLLECTION],
+        interval=config.RETRIEVAL_WARMUP_INTERVAL,
+    ).start()
+
+
+def stop_retrieval_warmup():
+    global _WARMER
+    if _WARMER is not None:
+        _WARMER.stop()
+        _WARMER = None
 
 
-    return result
\ No newline at end of file
+def shutdown_executor():
+    """Waits for in-flight RAG queries and stops the thread pool."""
+    _EXECUTOR.shutdown(wait=True)
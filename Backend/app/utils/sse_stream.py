@@ -0,0 +1,85 @@
+# Server-Sent Events streaming of RAG answers
+import json
+import logging
+import math
+
+from . import rag_adaptor
+from .rag_adaptor import run_blocking
+from ..database import get_session_store
+from WeaviateGeminiInterface.generation_scheduler import GenerationOverloaded
+from WeaviateGeminiInterface.observability import RAG_IN_FLIGHT, collect_stage_timings
+
+logger = logging.getLogger(__name__)
+
+_STREAM_DONE = object()
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Formats one SSE frame. The payload is JSON, so it never contains a raw newline."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_rag_events(query: str, retrieval=None, session_id=None):
+    """
+    Yields the SSE frames for one query:
+      sources -> {"sources": [...]}          as soon as retrieval returns (every retrieved file/page)
+      delta   -> {"text": "..."}             for every piece of the answer Gemini produces
+      done    -> {"answer": "...", "sources": [...]}   sources narrowed to what the answer cites
+    or a single error -> {"detail": "..."} if anything fails, with "retry_after"
+    (seconds) if Gemini was at capacity.
+    With a session_id the query is answered as the session's next turn, as in
+    rag_adaptor.query_rag_session, and done also carries the "standalone_query".
+    Blocking SDK calls run on the RAG thread pool, one step at a time.
+    """
+    # the HTTP middleware has already returned by the time the body streams, so the
+    # stream keeps its own stage timings and in-flight count
+    timings = collect_stage_timings()
+    RAG_IN_FLIGHT.inc()
+    try:
+        runtime = await run_blocking(rag_adaptor.get_runtime)
+        # the question actually answered: a session follow-up is rewritten to stand alone
+        question = query
+        session = None
+        if session_id:
+            # taken before the session's chunks are checked and the turn retrieves more
+            versions = rag_adaptor.searched_corpus_versions(retrieval)
+            session = await run_blocking(get_session_store().get, session_id)
+            if session is None:
+                yield format_sse("error", {"detail": "Session not found."})
+                return
+            question = rag_adaptor.standalone_query(query, session)
+            chunks, _ = await run_blocking(rag_adaptor.retrieve_followup_context, question,
+                                           session["chunks"], runtime, retrieval)
+        else:
+            chunks = await run_blocking(rag_adaptor.retrieve_context, query, runtime, retrieval)
+        sources = rag_adaptor.sources_from_chunks(chunks)
+        yield format_sse("sources", {"sources": sources})
+
+        events = await run_blocking(rag_adaptor.stream_query, question, chunks, runtime)
+        answer_parts = []
+        final = None
+        while True:
+            item = await run_blocking(next, events, _STREAM_DONE)
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, dict):
+                final = item
+                continue
+            answer_parts.append(item)
+            yield format_sse("delta", {"text": item})
+
+        if final is None:
+            final = {"answer": "".join(answer_parts), "sources": sources}
+        if session is not None:
+            await run_blocking(get_session_store().add_turn, session_id, query, question,
+                               final["answer"], final["sources"], chunks, versions)
+            final = {**final, "standalone_query": question}
+        yield format_sse("done", final)
+        logger.info("Stream finished", extra={"stages_ms": timings})
+    except GenerationOverloaded as e:
+        yield format_sse("error", {"detail": str(e), "retry_after": math.ceil(e.retry_after)})
+    except Exception as e:
+        logger.exception(f"Error while streaming answer: {e}")
+        yield format_sse("error", {"detail": f"RAG query failed: {e}"})
+    finally:
+        RAG_IN_FLIGHT.dec()
@@ -0,0 +1,71 @@
+"""
+Answer cache benchmark: what a lookup that misses costs each uncached request
+before its retrieval can start.
+
+Fills an AnswerCache (HashingEmbedder, RAG_CACHE_SEMANTIC_THRESHOLD) with
+--entries distinct questions, then times lookups of other questions, so every
+one is scored against the whole semantic tier and misses. With the SQLite
+backend, a second connection to the file stores an answer before every lookup
+when --other-writer is given, as another API worker would.
+
+Run from the Backend directory:
+    python -m benchmarks.answer_cache_bench --entries 1000 --lookups 200
+    python -m benchmarks.answer_cache_bench --entries 100 1000 5000 --other-writer
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app import config
+from app.utils.answer_cache import AnswerCache, MemoryCacheBackend, SQLiteCacheBackend
+from WeaviateGeminiInterface.embeddings import HashingEmbedder
+
+from .suite import latency_stats, make_queries
+
+ANSWER = {"answer": "Synthetic answer.", "sources": []}
+
+
+def run(backend_kind, entries, lookups, other_writer, path):
+    make_backend = {
+        "memory": lambda: MemoryCacheBackend(max_entries=entries + lookups),
+        "sqlite": lambda: SQLiteCacheBackend(path, max_entries=entries + lookups),
+    }[backend_kind]
+    cache = AnswerCache(make_backend(), embedder=HashingEmbedder(), semantic_threshold=config.RAG_CACHE_SEMANTIC_THRESHOLD)
+    for query in make_queries(entries):
+        cache.put(query, ANSWER)
+    writer = AnswerCache(make_backend(), embedder=HashingEmbedder()) if other_writer else None
+
+    misses = [f"Which {query[len('What are the '):]}" for query in make_queries(lookups, seed=1)]
+    # the first lookup pays for loading the semantic tier
+    cache.get("warm up")
+    seconds = []
+    for n, query in enumerate(misses):
+        if writer is not None:
+            writer.put(f"another worker's question {n}", ANSWER)
+        start = time.perf_counter()
+        cache.get(query)
+        seconds.append(time.perf_counter() - start)
+    return {"hits": cache.stats()["semantic_hits"], "miss": latency_stats(seconds)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--other-writer", action="store_true", help="have another connection write before every lookup")
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'entries':>7} {'p50':>9} {'p95':>9} {'max':>9} {'hits':>5}")
+    for backend_kind in ("memory", "sqlite"):
+        for entries in args.entries:
+            with tempfile.TemporaryDirectory(prefix="bench_answer_cache_") as directory:
+                row = run(backend_kind, entries, args.lookups, args.other_writer and backend_kind == "sqlite",
+                          os.path.join(directory, "answers.sqlite3"))
+            miss = row["miss"]
+            print(f"{backend_kind:<8} {entries:>7} {miss['p50_ms']:>7.2f}ms {miss['p95_ms']:>7.2f}ms "
+                  f"{miss['max_ms']:>7.2f}ms {row['hits']:>5}")
+
+
+if __name__ == "__main__":
+    main()
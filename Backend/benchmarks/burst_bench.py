@@ -0,0 +1,131 @@
+"""
+Burst benchmark for the Gemini scheduler: what happens when a circular goes out
+and many students ask the same thing at once.
+
+Sends a burst of POST /retrieve/ requests through the real FastAPI app, with fake
+Weaviate and a fake Gemini that rejects calls beyond its per-minute quota (see
+fakes.py). A share of the burst asks one identical question; the rest are
+distinct. The answer cache is off unless noted, so the scheduler is measured
+alone. Each setup reports the Gemini calls made, how many requests got an answer,
+were shed with 429 or got the error answer, and the latency of the answered ones.
+
+  passthrough      no coalescing, no rate limit, no retries (the old behaviour)
+  scheduled        coalescing, a token bucket at the quota, shedding and retries
+  scheduled+cache  the same with the answer cache on, as the API runs by default
+
+Run from the Backend directory:
+    python -m benchmarks.burst_bench --requests 200 --duplicate-share 0.7 --quota-rpm 60
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+# the passthrough run logs every quota error; the table says it all
+os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+
+from WeaviateGeminiInterface import gemini_handler
+from WeaviateGeminiInterface import runtime as runtime_module
+from WeaviateGeminiInterface.generation_scheduler import GenerationScheduler
+
+from .fakes import FakeCollection, FakeGeminiModel, FakeRuntime
+from .suite import latency_stats, make_queries
+from .synthetic_corpus import synthetic_chunks
+
+
+def make_setups(args):
+    """(name, scheduler, use the answer cache) per setup."""
+    def scheduled():
+        return GenerationScheduler(
+            rpm=args.quota_rpm, burst=args.burst, max_queue=args.max_queue, max_wait=args.max_wait,
+            retries=3, backoff=0.2, is_transient=gemini_handler.is_transient_error,
+        )
+    return [
+        ("passthrough", GenerationScheduler(retries=0, coalesce=False), False),
+        ("scheduled", scheduled(), False),
+        ("scheduled+cache", scheduled(), True),
+    ]
+
+
+async def _burst(client, queries):
+    async def ask(query):
+        start = time.perf_counter()
+        response = await client.post("/retrieve/", json={"query": query})
+        return response, time.perf_counter() - start
+
+    return await asyncio.gather(*(ask(query) for query in queries))
+
+
+async def _run(args, name, scheduler, use_cache, queries, chunks):
+    import httpx
+
+    from app.main import app
+    from app.utils import rag_adaptor
+
+    collection = FakeCollection(query_latency=args.weaviate_latency)
+    collection.index.ingest(chunks)
+    model = FakeGeminiModel(latency=args.gemini_latency, quota_rpm=args.quota_rpm)
+    runtime_module._RUNTIME = FakeRuntime(collection, model)
+    cache = rag_adaptor.ANSWER_CACHE
+    rag_adaptor.ANSWER_CACHE = rag_adaptor._build_answer_cache() if use_cache else None
+    default_scheduler, gemini_handler.SCHEDULER = gemini_handler.SCHEDULER, scheduler
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            start = time.perf_counter()
+            results = await _burst(client, queries)
+            elapsed = time.perf_counter() - start
+    finally:
+        rag_adaptor.ANSWER_CACHE = cache
+        gemini_handler.SCHEDULER = default_scheduler
+        runtime_module._RUNTIME = None
+        collection.close()
+
+    answered = [seconds for response, seconds in results
+                if response.status_code == 200 and not response.json()["answer"].startswith("Sorry")]
+    shed = sum(1 for response, _ in results if response.status_code == 429)
+    return {
+        "name": name,
+        "requests": len(queries),
+        "answered": len(answered),
+        "shed_429": shed,
+        "failed": len(queries) - len(answered) - shed,
+        "gemini_calls": model.calls,
+        "quota_rejections": model.rejected,
+        "seconds": elapsed,
+        **latency_stats(answered),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests in the burst (default: %(default)s)")
+    parser.add_argument("--duplicate-share", type=float, default=0.7, help="share asking the same question")
+    parser.add_argument("--quota-rpm", type=int, default=60, help="fake Gemini quota per minute")
+    parser.add_argument("--burst", type=int, default=10, help="token bucket size")
+    parser.add_argument("--max-queue", type=int, default=100)
+    parser.add_argument("--max-wait", type=float, default=5.0, help="longest wait for a token before shedding")
+    parser.add_argument("--gemini-latency", type=float, default=0.3)
+    parser.add_argument("--weaviate-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    duplicates = int(args.requests * args.duplicate_share)
+    distinct = make_queries(args.requests - duplicates)
+    queries = ["When is the last date to register for the re-exam?"] * duplicates + distinct
+    # spread the identical question over the burst
+    random.Random(0).shuffle(queries)
+    chunks = synthetic_chunks(2000)
+
+    print(f"{'setup':<16} {'answered':>8} {'429':>5} {'failed':>6} {'calls':>6} {'quota err':>9} "
+          f"{'p50_ms':>8} {'p99_ms':>8} {'seconds':>8}")
+    for name, scheduler, use_cache in make_setups(args):
+        row = asyncio.run(_run(args, name, scheduler, use_cache, queries, chunks))
+        p50 = f"{row['p50_ms']:.0f}" if row["p50_ms"] is not None else "-"
+        p99 = f"{row['p99_ms']:.0f}" if row["p99_ms"] is not None else "-"
+        print(f"{name:<16} {row['answered']:>8} {row['shed_429']:>5} {row['failed']:>6} {row['gemini_calls']:>6} "
+              f"{row['quota_rejections']:>9} {p50:>8} {p99:>8} {row['seconds']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Chunking benchmark: chunk counts, prompt size and throughput per strategy.
+
+Extracts the page texts of every PDF in a directory once (PyMuPDF only, no table
+detection), then runs each chunking strategy over them. Prompt size is the
+estimated number of context tokens Gemini would receive for top_k retrieved
+chunks of average size, which is what drives generation latency and cost.
+
+Run from the Backend directory:
+    python -m benchmarks.chunking_bench --dir data --max-tokens 150 300 500 --top-k 5
+"""
+import argparse
+import statistics
+import time
+
+import fitz
+
+from WeaviateGeminiInterface.chunking import STRATEGIES, chunk_spans, estimate_tokens
+from WeaviateGeminiInterface.parallel_ingest import list_pdf_files
+
+
+def load_pages(directory_path):
+    """Returns the text of every page of every PDF in directory_path."""
+    pages = []
+    for file_path in list_pdf_files(directory_path):
+        with fitz.open(file_path) as doc:
+            pages.extend(page.get_text() for page in doc)
+    return pages
+
+
+def run(pages, strategy, max_tokens, overlap_tokens, top_k, repeat):
+    chunk_tokens = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        chunk_tokens = []
+        for text in pages:
+            for chunk_start, chunk_end in chunk_spans(text, strategy, max_tokens, overlap_tokens):
+                chunk_tokens.append(estimate_tokens(text[chunk_start:chunk_end]))
+    elapsed = (time.perf_counter() - start) / repeat
+
+    if not chunk_tokens:
+        return None
+    chunk_tokens.sort()
+    characters = sum(len(text) for text in pages)
+    return {
+        "strategy": strategy,
+        "max_tokens": max_tokens if strategy != "page" else None,
+        "chunks": len(chunk_tokens),
+        "avg_tokens": statistics.mean(chunk_tokens),
+        "p95_tokens": chunk_tokens[int(0.95 * (len(chunk_tokens) - 1))],
+        "prompt_tokens": top_k * statistics.mean(chunk_tokens),
+        "pages_per_s": len(pages) / elapsed if elapsed else float("inf"),
+        "mb_per_s": characters / elapsed / 1e6 if elapsed else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default="data", help="folder of sample PDFs (default: %(default)s)")
+    parser.add_argument("--max-tokens", type=int, nargs="+", default=[150, 300, 500])
+    parser.add_argument("--overlap", type=int, default=50, help="overlap tokens (default: %(default)s)")
+    parser.add_argument("--top-k", type=int, default=5, help="chunks per prompt (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions (default: %(default)s)")
+    args = parser.parse_args()
+
+    pages = load_pages(args.dir)
+    print(f"{len(pages)} page(s), {estimate_tokens(''.join(pages))} estimated tokens\n")
+    print(f"{'strategy':<11} {'max':>5} {'chunks':>7} {'avg tok':>8} {'p95 tok':>8} {'prompt tok':>11} {'pages/s':>9} {'MB/s':>7}")
+
+    runs = [("page", None)] + [(strategy, size) for strategy in STRATEGIES if strategy != "page" for size in args.max_tokens]
+    for strategy, size in runs:
+        row = run(pages, strategy, size or 0, min(args.overlap, (size or 0) // 2), args.top_k, args.repeat)
+        if row is None:
+            continue
+        print(f"{row['strategy']:<11} {row['max_tokens'] or '-':>5} {row['chunks']:>7} {row['avg_tokens']:>8.0f} "
+              f"{row['p95_tokens']:>8} {row['prompt_tokens']:>11.0f} {row['pages_per_s']:>9.0f} {row['mb_per_s']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compares two benchmarks.suite result files row by row and flags regressions.
+
+Latencies and durations (*_ms, *_s, seconds) are better when lower; rates
+(*_per_s, *_rps) are better when higher. Other fields are ignored. Exits with
+status 1 if any metric got worse by more than --threshold percent, so it can
+gate a CI job.
+
+Run from the Backend directory:
+    python -m benchmarks.compare baseline.json results.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+
+def direction(metric):
+    """+1 if a higher value is better, -1 if lower is better, 0 if the metric isn't compared."""
+    if metric.endswith(("_per_s", "_rps")):
+        return 1
+    if metric.endswith(("_ms", "_s")) or metric == "seconds":
+        return -1
+    return 0
+
+
+def compare(baseline, current, threshold):
+    """Returns (rows, regressions); rows are (section, name, metric, old, new, change_percent)."""
+    rows, regressions = [], []
+    for section, current_rows in current.items():
+        if section == "meta" or section not in baseline:
+            continue
+        old_rows = {row["name"]: row for row in baseline[section]}
+        for row in current_rows:
+            old = old_rows.get(row["name"])
+            if old is None:
+                continue
+            for metric, value in row.items():
+                sign = direction(metric)
+                old_value = old.get(metric)
+                if not sign or not isinstance(value, (int, float)) or not isinstance(old_value, (int, float)) or not old_value:
+                    continue
+                change = (value - old_value) / old_value * 100
+                entry = (section, row["name"], metric, old_value, value, change)
+                rows.append(entry)
+                if change * sign < -threshold:
+                    regressions.append(entry)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent (default: %(default)s)")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows, regressions = compare(baseline, current, args.threshold)
+    print(f"baseline {baseline['meta'].get('commit')} -> current {current['meta'].get('commit')}\n")
+    print(f"{'section':<10} {'row':<20} {'metric':<16} {'old':>10} {'new':>10} {'change':>8}")
+    for section, name, metric, old, new, change in rows:
+        flag = "  <-- regression" if (section, name, metric, old, new, change) in regressions else ""
+        print(f"{section:<10} {name:<20} {metric:<16} {old:>10.2f} {new:>10.2f} {change:>+7.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0f}%.")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
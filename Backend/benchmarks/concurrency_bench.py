@@ -0,0 +1,92 @@
+"""
+Concurrency benchmark for the /retrieve query path.
+
+Replaces the RAG core with a blocking stand-in that sleeps for a fixed retrieval +
+generation time, then compares calling it directly on the event loop (the old
+behaviour) with the thread-pool offload in query_rag_async. For every level of
+in-flight requests it reports throughput, latency and the worst event-loop stall,
+which is what a concurrent "/" health check would have to wait for.
+
+Run from the Backend directory:
+    python -m benchmarks.concurrency_bench --latency 0.2 --levels 1 2 4 8 16
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.utils import rag_adaptor
+
+
+def _fake_core_query(latency):
+    def core_query(user_query, runtime=None, retrieval=None):
+        time.sleep(latency)  # stands in for near_text + generate_content, both blocking
+        return {"answer": f"answer to {user_query}", "sources": []}
+    return core_query
+
+
+async def _blocking_query(query):
+    # what the old `async def retrieve` did: a sync call straight on the event loop
+    return rag_adaptor.query_rag(query)
+
+
+async def _watch_loop_lag(stop, interval=0.01):
+    """Measures how late a periodic tick fires, i.e. how long the loop was blocked."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def _run_level(query_fn, in_flight, total):
+    latencies = []
+    pending = iter(range(total))
+
+    async def client():
+        for i in pending:
+            start = time.perf_counter()
+            await query_fn(f"question {i}")
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(_watch_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(in_flight)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    loop_lag = await watcher
+
+    latencies.sort()
+    return {
+        "in_flight": in_flight,
+        "throughput_rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "max_loop_lag_ms": loop_lag * 1000,
+    }
+
+
+async def main(latency, levels, requests_per_level):
+    rag_adaptor.core_query = _fake_core_query(latency)
+    rag_adaptor.get_runtime = lambda: None
+
+    for name, query_fn in (("blocking", _blocking_query), ("offloaded", rag_adaptor.query_rag_async)):
+        print(f"\n{name} (pool size {rag_adaptor.config.RAG_MAX_CONCURRENCY}, simulated latency {latency * 1000:.0f} ms)")
+        print(f"{'in-flight':>10} {'req/s':>8} {'p50 ms':>8} {'max ms':>8} {'loop lag ms':>12}")
+        for level in levels:
+            row = await _run_level(query_fn, level, max(requests_per_level, level))
+            print(f"{row['in_flight']:>10} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.1f} "
+                  f"{row['max_ms']:>8.1f} {row['max_loop_lag_ms']:>12.1f}")
+
+    rag_adaptor.shutdown_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated seconds per RAG query")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="in-flight request counts")
+    parser.add_argument("--requests", type=int, default=32, help="requests sent per level")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.levels, args.requests))
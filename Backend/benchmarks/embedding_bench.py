@@ -0,0 +1,76 @@
+"""
+Embedding benchmark: what client-side embedding costs on a first ingest, on a
+re-ingest of the same content, and per query.
+
+Embeds synthetic chunks twice through a CachedEmbedder backed by a fresh cache
+file, so the first pass embeds every chunk and the second should be answered
+entirely from the cache, then times single query embeddings.
+
+Run from the Backend directory:
+    python -m benchmarks.embedding_bench --model hashing --chunks 5000
+    python -m benchmarks.embedding_bench --model sentence-transformers/all-MiniLM-L6-v2 --batch-sizes 16 64
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from WeaviateGeminiInterface.embeddings import CachedEmbedder, EmbeddingCache, HashingEmbedder, SentenceTransformerEmbedder
+
+from .suite import latency_stats, make_queries
+from .synthetic_corpus import synthetic_chunks
+
+
+def run(embedder, texts, queries, batch_size):
+    with tempfile.TemporaryDirectory(prefix="bench_embeddings_") as path:
+        cache = EmbeddingCache(os.path.join(path, "cache.sqlite3"))
+        cached = CachedEmbedder(embedder, cache, batch_size=batch_size)
+        try:
+            passes = []
+            for _ in range(2):
+                misses = cached.misses
+                start = time.perf_counter()
+                cached.embed_many(texts)
+                passes.append((time.perf_counter() - start, cached.misses - misses))
+        finally:
+            cache.close()
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embedder.embed(query)
+        latencies.append(time.perf_counter() - start)
+
+    (cold_seconds, cold_embedded), (warm_seconds, warm_embedded) = passes
+    return {
+        "batch_size": batch_size,
+        "cold_s": cold_seconds,
+        "cold_texts_per_s": len(texts) / cold_seconds,
+        "warm_s": warm_seconds,
+        "warm_embedded": warm_embedded,
+        "query": latency_stats(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="hashing", help='"hashing" or a sentence-transformers model name')
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[64])
+    args = parser.parse_args()
+
+    embedder = HashingEmbedder() if args.model == "hashing" else SentenceTransformerEmbedder(args.model)
+    texts = [chunk["text_chunk"] for chunk in synthetic_chunks(args.chunks)]
+    queries = make_queries(args.queries)
+
+    print(f"{embedder.model_id}, {len(texts)} chunk(s)\n")
+    print(f"{'batch':>6} {'first ingest':>13} {'texts/s':>9} {'re-ingest':>10} {'re-embedded':>12} {'query p50':>10} {'p95':>8}")
+    for batch_size in args.batch_sizes:
+        row = run(embedder, texts, queries, batch_size)
+        print(f"{batch_size:>6} {row['cold_s']:>12.2f}s {row['cold_texts_per_s']:>9.0f} {row['warm_s']:>9.2f}s "
+              f"{row['warm_embedded']:>12} {row['query']['p50_ms']:>8.2f}ms {row['query']['p95_ms']:>6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
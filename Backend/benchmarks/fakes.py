@@ -0,0 +1,230 @@
+"""
+Local stand-ins for Weaviate and Gemini with configurable latency, so the API and
+RAG pipeline can be load-tested offline and reproducibly.
+
+FakeCollection mimics the parts of a Weaviate v4 collection the app uses
+(query.near_text / bm25 / hybrid, batch.dynamic / fixed_size, name) and answers
+queries from an in-memory LocalIndex, so retrieve_chunks and ingest_data run
+their real code paths. FakeGeminiModel mimics GenerativeModel.generate_content,
+plain and streamed, and returns schema-shaped JSON with usage metadata.
+FakeRuntime plugs both into RAG_CORE in place of RAGRuntime.
+"""
+import json
+import tempfile
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+from google.api_core.exceptions import ResourceExhausted
+
+from WeaviateGeminiInterface.local_index import LocalIndex
+from WeaviateGeminiInterface.retrieval_backends import WeaviateBackend
+
+
+class _FakeQuery:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def near_text(self, query, limit, return_metadata=None):
+        return self._search(query, limit, "vector")
+
+    def bm25(self, query, limit, return_metadata=None):
+        return self._search(query, limit, "keyword")
+
+    def hybrid(self, query, alpha, fusion_type, limit, return_metadata=None, vector=None):
+        fusion = "ranked" if "RANKED" in str(fusion_type).upper() else "relative_score"
+        return self._search(query, limit, "hybrid", alpha=alpha, fusion=fusion)
+
+    def _search(self, query, limit, mode, **search):
+        time.sleep(self._collection.query_latency)
+        results = self._collection.index.retrieve(query, limit=limit, with_metadata=True, mode=mode, **search)
+        objects = []
+        for result in results:
+            properties = {key: value for key, value in result.items() if key not in ("uuid", "score")}
+            if mode == "vector":
+                metadata = SimpleNamespace(distance=1.0 - result["score"], score=None)
+            else:
+                metadata = SimpleNamespace(distance=None, score=result["score"])
+            objects.append(SimpleNamespace(properties=properties, uuid=result["uuid"], metadata=metadata))
+        return SimpleNamespace(objects=objects)
+
+
+class _FakeBatcher:
+    def __init__(self, collection, batch_size):
+        self._collection = collection
+        self._batch_size = batch_size
+        self._objects = []
+        self._uuids = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._flush()
+        return False
+
+    def add_object(self, properties, uuid=None, vector=None):
+        # the in-memory index embeds texts itself; supplied vectors are ignored
+        self._objects.append(properties)
+        self._uuids.append(uuid)
+        if len(self._objects) >= self._batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._objects:
+            return
+        time.sleep(self._collection.batch_latency)
+        uuids = self._uuids if all(self._uuids) else None
+        self._collection.index.ingest(self._objects, uuids=uuids)
+        self._objects, self._uuids = [], []
+
+
+class _FakeBatch:
+    failed_objects = []
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def dynamic(self):
+        return _FakeBatcher(self._collection, batch_size=100)
+
+    def fixed_size(self, batch_size=100):
+        return _FakeBatcher(self._collection, batch_size=batch_size)
+
+
+class FakeCollection:
+    """
+    In-memory Weaviate collection. query_latency is added to every search and
+    batch_latency to every batch sent, standing in for the network round trip.
+    """
+
+    def __init__(self, name="VIT_docs", query_latency=0.0, batch_latency=0.0, index_path=None):
+        self.name = name
+        self.query_latency = query_latency
+        self.batch_latency = batch_latency
+        self._tmp = None if index_path else tempfile.TemporaryDirectory(prefix="fake_weaviate_")
+        self.index = LocalIndex(index_path or self._tmp.name, name, fresh_start=True)
+        self.query = _FakeQuery(self)
+        self.batch = _FakeBatch(self)
+
+    def close(self):
+        self.index.close()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+
+class _FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeStream:
+    """A streamed response: iterating it yields the reply in pieces; usage_metadata is set once it is consumed."""
+
+    def __init__(self, model, reply, usage):
+        self._model = model
+        self._reply = reply
+        self._usage = usage
+        self.usage_metadata = None
+
+    def __iter__(self):
+        time.sleep(self._model.first_token_latency + self._model.prompt_latency(self._usage))
+        step = self._model.stream_chunk_chars
+        pieces = [self._reply[i:i + step] for i in range(0, len(self._reply), step)]
+        per_piece = self._model.remaining_latency / max(len(pieces), 1)
+        for piece in pieces:
+            time.sleep(per_piece)
+            yield _FakeChunk(piece)
+        self.usage_metadata = self._usage
+
+
+class FakeGeminiModel:
+    """
+    Stand-in for genai.GenerativeModel. A reply takes latency seconds in total;
+    streamed replies send their first piece after first_token_latency and spread
+    the rest over the remaining time. Answers cite passage 1 of the prompt.
+    With quota_rpm, calls beyond that many in any 60 seconds fail with
+    ResourceExhausted, like Gemini's 429. prompt_latency_per_1k_tokens adds time
+    for reading the prompt, so replies to longer contexts take longer.
+    """
+
+    def __init__(self, latency=0.0, first_token_latency=None, answer_words=60, stream_chunk_chars=40, quota_rpm=None,
+                 prompt_latency_per_1k_tokens=0.0):
+        self.latency = latency
+        self.prompt_latency_per_1k_tokens = prompt_latency_per_1k_tokens
+        self.quota_rpm = quota_rpm
+        self.rejected = 0
+        self._call_times = deque()
+        self._lock = threading.Lock()
+        self.first_token_latency = latency / 4 if first_token_latency is None else min(first_token_latency, latency)
+        self.answer_words = answer_words
+        self.stream_chunk_chars = stream_chunk_chars
+        self.calls = 0
+
+    @property
+    def remaining_latency(self):
+        return self.latency - self.first_token_latency
+
+    def prompt_latency(self, usage):
+        return usage.prompt_token_count / 1000 * self.prompt_latency_per_1k_tokens
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self._check_quota()
+        self.calls += 1
+        words = prompt.split()
+        answer = " ".join((words * (self.answer_words // max(len(words), 1) + 1))[:self.answer_words])
+        reply = json.dumps({"answer": answer, "cited_sources": [1] if "[1]" in prompt else []})
+        usage = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(reply) // 4)
+        if stream:
+            return _FakeStream(self, reply, usage)
+        time.sleep(self.latency + self.prompt_latency(usage))
+        return SimpleNamespace(text=reply, usage_metadata=usage)
+
+    def _check_quota(self):
+        if self.quota_rpm is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            while self._call_times and now - self._call_times[0] >= 60:
+                self._call_times.popleft()
+            if len(self._call_times) >= self.quota_rpm:
+                self.rejected += 1
+                raise ResourceExhausted("Quota exceeded for generate_content requests per minute.")
+            self._call_times.append(now)
+
+
+class FakeRuntime:
+    """
+    What RAG_CORE needs from RAGRuntime: a model and backends over fake collections.
+    collection is the default one; more can be passed to test routing across several.
+    reranker is an optional reranker.LexicalReranker or CrossEncoderReranker, and
+    chunk_stores maps collection names to chunk_store.ChunkStore instances.
+    """
+
+    def __init__(self, collection, model, collections=(), reranker=None, chunk_stores=None):
+        self.collection = collection
+        self.collection_name = collection.name
+        self.model = model
+        self.reranker = reranker
+        self.collections = {c.name: c for c in (collection, *collections)}
+        self.chunk_stores = chunk_stores or {}
+
+    def get_backend(self, collection_name=None):
+        return WeaviateBackend(self.get_collection(collection_name))
+
+    def get_collection(self, collection_name=None):
+        collection_name = collection_name or self.collection_name
+        if collection_name not in self.collections:
+            raise ValueError(f"Unknown collection '{collection_name}'.")
+        return self.collections[collection_name]
+
+    def get_chunk_store(self, collection_name=None):
+        return self.chunk_stores.get(self.get_collection(collection_name).name)
+
+    def mark_unhealthy(self):
+        pass
+
+    def close(self):
+        for collection in self.collections.values():
+            collection.close()
@@ -0,0 +1,109 @@
+"""
+Import-time benchmark for the API process.
+
+Imports the app in fresh interpreters with `python -X importtime`, reports the
+median import time and which top-level packages it is spent in, and fails
+(exit status 1) if the median is over --budget-ms or if any module the serving
+path must not load was imported. The ingestion stack (PyMuPDF, Camelot with
+OpenCV, pandas) belongs to `python -m WeaviateGeminiInterface.ingest` only, and
+NumPy is loaded when the local backend starts, not at import.
+
+Run from the Backend directory:
+    python -m benchmarks.import_bench --budget-ms 2500
+    python -m benchmarks.import_bench --module WeaviateGeminiInterface.ingest --allow-all
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORBIDDEN = ("fitz", "pymupdf", "camelot", "cv2", "pandas", "numpy",
+             "WeaviateGeminiInterface.pdf_processor", "WeaviateGeminiInterface.parallel_ingest",
+             "WeaviateGeminiInterface.incremental_sync", "WeaviateGeminiInterface.local_index")
+
+
+def measure(module):
+    """
+    Imports module once in a fresh interpreter. Returns (total_us, {module: (self_us, cumulative_us)}),
+    total_us being the cumulative import time of module itself.
+    """
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR, "LOG_LEVEL": "WARNING"}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    modules = {}
+    for line in completed.stderr.splitlines():
+        # "import time:       123 |        456 |     package.module"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules[module][1], modules
+
+
+def by_package(modules):
+    """Self time summed per top-level package, slowest first."""
+    totals = {}
+    for name, (self_us, _) in modules.items():
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="module to import (default: %(default)s)")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to time (default: %(default)s)")
+    parser.add_argument("--budget-ms", type=float, default=2500, help="allowed median import time (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=10, help="packages to list (default: %(default)s)")
+    parser.add_argument("--allow-all", action="store_true", help="don't check for forbidden modules")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    totals, modules = [], {}
+    for _ in range(args.runs):
+        total_us, modules = measure(args.module)
+        totals.append(total_us / 1000)
+    median_ms = statistics.median(totals)
+    forbidden = [] if args.allow_all else [name for name in FORBIDDEN if name in modules]
+
+    print(f"import {args.module}: median {median_ms:.0f} ms over {args.runs} run(s) "
+          f"({', '.join(f'{t:.0f}' for t in totals)}), budget {args.budget_ms:.0f} ms, {len(modules)} modules\n")
+    print(f"{'package':<28} {'self ms':>8}")
+    for package, self_us in by_package(modules)[:args.top]:
+        print(f"{package:<28} {self_us / 1000:>8.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "module": args.module,
+                "median_ms": median_ms,
+                "runs_ms": totals,
+                "budget_ms": args.budget_ms,
+                "modules": len(modules),
+                "forbidden_loaded": forbidden,
+                "packages_ms": {package: self_us / 1000 for package, self_us in by_package(modules)},
+            }, f, indent=2)
+
+    failed = False
+    if forbidden:
+        print(f"\nFAIL: serving path imported {', '.join(forbidden)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"\nFAIL: median import time {median_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Rerank benchmark: how much context reaches Gemini, and how fast the answer comes,
+with and without the rerank stage.
+
+Answers two sets of questions over a fake collection of synthetic chunks, with a
+fake Gemini whose reply time grows with the prompt (see fakes.py):
+
+  lookup     "Where is Dr X's cabin?": exactly one chunk (a cabin entry) answers it
+  broad      "What are the hostel ... rules?": every chunk about the topic is relevant
+
+once per setup:
+
+  off        the top-k retrieved chunks all go to Gemini (the old behaviour)
+  lexical    RERANK_CANDIDATES chunks are retrieved and LexicalReranker keeps the relevant ones
+  <model>    the same with a cross-encoder, if --cross-encoder is given
+
+"relevant" is the share of the chunks sent that answer the question (the cabin
+entry, or chunks about the topic), and "hit" the share of questions where at least
+one of them was sent.
+
+Run from the Backend directory:
+    python -m benchmarks.rerank_bench --queries 100
+    python -m benchmarks.rerank_bench --cross-encoder cross-encoder/ms-marco-MiniLM-L-6-v2
+"""
+import argparse
+import random
+import time
+
+from WeaviateGeminiInterface import RAG_CORE
+from WeaviateGeminiInterface.context_builder import build_context
+from WeaviateGeminiInterface.embeddings import tokenize
+from WeaviateGeminiInterface.reranker import get_reranker
+from WeaviateGeminiInterface.weaviate_handler import DEFAULT_RETRIEVAL
+
+from .fakes import FakeCollection, FakeGeminiModel, FakeRuntime
+from .suite import latency_stats, make_queries
+from .synthetic_corpus import TOPICS, synthetic_chunks
+
+
+FIRST_NAMES = ("Asha", "Vikram", "Meera", "Arjun", "Kavya", "Rahul", "Divya", "Karthik", "Nisha", "Suresh")
+LAST_NAMES = ("Raman", "Iyer", "Nair", "Menon", "Reddy", "Pillai", "Kumar", "Rao", "Das", "Joshi")
+DEPARTMENTS = ("SCOPE", "SENSE", "SMEC", "SAS", "VITBS")
+
+
+def cabin_chunks(count, seed=0):
+    """count cabin entries, one per faculty member, and the question each one answers."""
+    rng = random.Random(seed)
+    names = rng.sample([(first, last) for first in FIRST_NAMES for last in LAST_NAMES], count)
+    chunks, questions = [], []
+    for i, (first, last) in enumerate(names):
+        chunks.append({
+            "text_chunk": f"Dr {first} {last} ({rng.choice(DEPARTMENTS)}) sits in cabin AB{rng.randint(1, 3)}-"
+                          f"{rng.randint(100, 999)}. Consultation hours are {rng.randint(9, 16)}:00 to "
+                          f"{rng.randint(10, 17)}:00 on weekdays.",
+            "source_file": "cabin_list.pdf",
+            "page_number": i // 20 + 1,
+            "chunk_type": "text",
+        })
+        questions.append((f"Where is Dr {first} {last}'s cabin?", f"{first} {last}"))
+    return chunks, questions
+
+
+def run(runtime, questions):
+    """questions are (query, is_relevant(chunk text)) pairs."""
+    chunks_sent, tokens, relevant_share, hits = [], [], [], 0
+    retrieve_seconds, generate_seconds, total_seconds = [], [], []
+    for query, is_relevant in questions:
+        start = time.perf_counter()
+        chunks = RAG_CORE.retrieve_context(query, runtime)
+        retrieved = time.perf_counter()
+        RAG_CORE.answer_from_chunks(query, chunks, runtime)
+        done = time.perf_counter()
+
+        context = build_context(chunks)
+        relevant = [is_relevant(chunk["text_chunk"]) for chunk in context["chunks"]]
+        chunks_sent.append(len(context["chunks"]))
+        tokens.append(context["tokens_out"])
+        relevant_share.append(sum(relevant) / len(relevant) if relevant else 0.0)
+        hits += any(relevant)
+        retrieve_seconds.append(retrieved - start)
+        generate_seconds.append(done - retrieved)
+        total_seconds.append(done - start)
+
+    return {
+        "chunks": sum(chunks_sent) / len(questions),
+        "tokens": sum(tokens) / len(questions),
+        "relevant": sum(relevant_share) / len(questions),
+        "hit": hits / len(questions),
+        "retrieve": latency_stats(retrieve_seconds),
+        "generate": latency_stats(generate_seconds),
+        "total": latency_stats(total_seconds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50, help="questions per set (at most 100 lookups)")
+    parser.add_argument("--cross-encoder", help="also run a sentence-transformers cross-encoder")
+    parser.add_argument("--weaviate-latency", type=float, default=0.02)
+    parser.add_argument("--gemini-latency", type=float, default=0.4, help="reply time without the prompt")
+    parser.add_argument("--prompt-latency", type=float, default=0.3, help="extra seconds per 1000 prompt tokens")
+    args = parser.parse_args()
+
+    cabins, lookups = cabin_chunks(min(args.queries, 100))
+    collection = FakeCollection(query_latency=args.weaviate_latency)
+    collection.index.ingest(synthetic_chunks(args.chunks) + cabins)
+    model = FakeGeminiModel(latency=args.gemini_latency, prompt_latency_per_1k_tokens=args.prompt_latency)
+    question_sets = {
+        "lookup": [(query, lambda text, name=name: name in text) for query, name in lookups],
+        "broad": [(query, lambda text, topic=_topic(query): topic in tokenize(text)) for query in make_queries(args.queries)],
+    }
+    # every question is new; measure retrieval, not the retrieval cache
+    RAG_CORE.RETRIEVAL_CACHE = None
+
+    setups = [("off", None), ("lexical", get_reranker("lexical"))]
+    if args.cross_encoder:
+        setups.append((args.cross_encoder.rsplit("/", 1)[-1], get_reranker(args.cross_encoder)))
+
+    print(f"top-k {DEFAULT_RETRIEVAL['limit']}, {args.chunks + len(cabins)} chunk(s)\n")
+    print(f"{'questions':<9} {'setup':<24} {'chunks':>6} {'tokens':>7} {'relevant':>8} {'hit':>5} "
+          f"{'retrieve p50':>12} {'generate p50':>12} {'total p50':>10} {'p95':>8}")
+    try:
+        for set_name, questions in question_sets.items():
+            for name, reranker in setups:
+                row = run(FakeRuntime(collection, model, reranker=reranker), questions)
+                print(f"{set_name:<9} {name:<24} {row['chunks']:>6.1f} {row['tokens']:>7.0f} {row['relevant']:>8.0%} "
+                      f"{row['hit']:>5.0%} {row['retrieve']['p50_ms']:>10.1f}ms {row['generate']['p50_ms']:>10.1f}ms "
+                      f"{row['total']['p50_ms']:>8.1f}ms {row['total']['p95_ms']:>6.1f}ms")
+    finally:
+        collection.close()
+
+
+def _topic(query):
+    return next(term for term in tokenize(query) if term in TOPICS)
+
+
+if __name__ == "__main__":
+    main()
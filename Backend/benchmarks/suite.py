@@ -0,0 +1,324 @@
+"""
+Reproducible performance suite, run against local stand-ins for Weaviate and
+Gemini (see fakes.py) and a generated PDF corpus (see synthetic_corpus.py), so it
+needs no network or API keys and two runs of the same tree are comparable.
+
+Sections:
+  api        POST /retrieve/ through the real FastAPI app at several concurrency
+             levels: throughput, p50/p95/p99 latency and errors
+  ingestion  PDF extraction pages/s (table scan, Camelot, redaction, text,
+             chunking; pages Camelot skipped) and objects/s written through
+             the batcher into the fake collection
+  chunking   chunks and pages/s per chunking strategy over the corpus pages
+  retrieval  local index top-k latency per search mode and k
+
+Results are written as JSON; compare two result files with benchmarks.compare.
+
+Run from the Backend directory:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --sections api retrieval --levels 1 8 32 --gemini-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# the app logs every request at INFO; keep the timing runs quiet unless asked
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from WeaviateGeminiInterface.chunking import STRATEGIES
+from WeaviateGeminiInterface.local_index import LocalIndex
+from WeaviateGeminiInterface.parallel_ingest import list_pdf_files
+from WeaviateGeminiInterface.pdf_processor import count_pages, extract_pdf_pages
+from WeaviateGeminiInterface.weaviate_handler import ingest_data
+
+from . import chunking_bench
+from .fakes import FakeCollection, FakeGeminiModel, FakeRuntime
+from .synthetic_corpus import TOPICS, WORDS, generate_corpus, synthetic_chunks
+
+SECTIONS = ("api", "ingestion", "chunking", "retrieval")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def latency_stats(seconds):
+    """p50/p95/p99/max of a list of durations, in milliseconds."""
+    values = sorted(s * 1000 for s in seconds)
+    return {
+        "p50_ms": percentile(values, 0.50),
+        "p95_ms": percentile(values, 0.95),
+        "p99_ms": percentile(values, 0.99),
+        "max_ms": values[-1] if values else None,
+    }
+
+
+def make_queries(count, seed=0):
+    """Distinct student-style questions over the synthetic corpus vocabulary."""
+    rng = random.Random(seed)
+    return [
+        f"What are the {rng.choice(TOPICS)} {rng.choice(WORDS)} {rng.choice(WORDS)} rules? ({i})"
+        for i in range(count)
+    ]
+
+
+# --- api -------------------------------------------------------------------------
+
+async def _api_level(client, queries, in_flight, path):
+    latencies, errors = [], 0
+    pending = iter(queries)
+
+    async def worker():
+        nonlocal errors
+        for query in pending:
+            start = time.perf_counter()
+            response = await client.post(path, json={"query": query})
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(in_flight)))
+    elapsed = time.perf_counter() - start
+    return {
+        "name": f"concurrency={in_flight}",
+        "concurrency": in_flight,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        **latency_stats(latencies),
+    }
+
+
+async def _run_api(levels, requests_per_level, chunks, args):
+    import httpx
+
+    from WeaviateGeminiInterface import RAG_CORE
+    from WeaviateGeminiInterface import runtime as runtime_module
+    from app.main import app
+    from app.utils import rag_adaptor
+
+    collection = FakeCollection(query_latency=args.weaviate_latency, batch_latency=args.weaviate_latency)
+    collection.index.ingest(chunks)
+    runtime_module._RUNTIME = FakeRuntime(collection, FakeGeminiModel(latency=args.gemini_latency))
+    # measure the full pipeline, not the answer and retrieval caches
+    cache, rag_adaptor.ANSWER_CACHE = rag_adaptor.ANSWER_CACHE, None
+    retrieval_cache, RAG_CORE.RETRIEVAL_CACHE = RAG_CORE.RETRIEVAL_CACHE, None
+
+    rows = []
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await _api_level(client, make_queries(2, seed=-1), 1, "/retrieve/")  # warm-up
+            for level in levels:
+                queries = make_queries(max(requests_per_level, level), seed=level)
+                rows.append(await _api_level(client, queries, level, "/retrieve/"))
+    finally:
+        rag_adaptor.ANSWER_CACHE = cache
+        RAG_CORE.RETRIEVAL_CACHE = retrieval_cache
+        runtime_module._RUNTIME = None
+        collection.close()
+    return rows
+
+
+def bench_api(args, chunks):
+    """Throughput and latency percentiles of POST /retrieve/ per concurrency level."""
+    return asyncio.run(_run_api(args.levels, args.requests, chunks, args))
+
+
+# --- ingestion -------------------------------------------------------------------
+
+def bench_ingestion(args, file_paths):
+    """Serial extraction of every corpus file, then writing the objects through the fake batcher."""
+    pages = sum(count_pages(path) for path in file_paths)
+    data_objects = []
+    stage_totals = {}
+    skipped_pages = 0
+    start = time.perf_counter()
+    for path in file_paths:
+        result = extract_pdf_pages(path)
+        data_objects.extend(result["tables"] + result["texts"])
+        skipped_pages += len(result["skipped_pages"])
+        for stage, seconds in result["timings"].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+    elapsed = time.perf_counter() - start
+
+    rows = [{
+        "name": "extract",
+        "files": len(file_paths),
+        "pages": pages,
+        "camelot_skipped_pages": skipped_pages,
+        "objects": len(data_objects),
+        "seconds": elapsed,
+        "pages_per_s": pages / elapsed,
+        **{f"{stage}_s": seconds for stage, seconds in stage_totals.items()},
+    }]
+
+    collection = FakeCollection(batch_latency=args.weaviate_latency)
+    try:
+        start = time.perf_counter()
+        ok = ingest_data(collection, data_objects, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+    finally:
+        collection.close()
+    rows.append({
+        "name": "write",
+        "objects": len(data_objects),
+        "ok": ok,
+        "seconds": elapsed,
+        "objects_per_s": len(data_objects) / elapsed if elapsed else None,
+    })
+    return rows, data_objects
+
+
+# --- chunking --------------------------------------------------------------------
+
+def bench_chunking(args, pages):
+    """chunking_bench.run for every strategy at the configured size."""
+    rows = []
+    for strategy in STRATEGIES:
+        size = 0 if strategy == "page" else args.max_tokens
+        row = chunking_bench.run(pages, strategy, size, min(args.overlap, size // 2), args.top_k, args.repeat)
+        if row is not None:
+            rows.append({"name": f"{strategy}" + (f" max={size}" if size else ""), **row})
+    return rows
+
+
+# --- retrieval -------------------------------------------------------------------
+
+def bench_retrieval(args):
+    """Local index top-k latency per search mode and k, over an index of args.index_size chunks."""
+    rows = []
+    queries = make_queries(args.queries)
+    with tempfile.TemporaryDirectory(prefix="bench_index_") as path:
+        index = LocalIndex(path, "bench")
+        start = time.perf_counter()
+        index.ingest(synthetic_chunks(args.index_size))
+        build_seconds = time.perf_counter() - start
+        try:
+            for mode in ("vector", "keyword", "hybrid"):
+                index.retrieve(queries[0], limit=1, mode=mode)  # builds the BM25 postings once
+                for top_k in args.top_ks:
+                    latencies = []
+                    for query in queries:
+                        start = time.perf_counter()
+                        index.retrieve(query, limit=top_k, with_metadata=True, mode=mode)
+                        latencies.append(time.perf_counter() - start)
+                    rows.append({
+                        "name": f"{mode} k={top_k}",
+                        "mode": mode,
+                        "top_k": top_k,
+                        "index_size": args.index_size,
+                        "queries_per_s": len(latencies) / sum(latencies),
+                        **latency_stats(latencies),
+                    })
+        finally:
+            index.close()
+    rows.insert(0, {"name": "build", "index_size": args.index_size, "seconds": build_seconds})
+    return rows
+
+
+# --- driver ----------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_rows(section, rows):
+    print(f"\n{section}")
+    for row in rows:
+        metrics = ", ".join(
+            f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in row.items() if key != "name"
+        )
+        print(f"  {row['name']:<20} {metrics}")
+
+
+def run_suite(args):
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench_corpus_") as tmp:
+        corpus_dir = args.corpus or tmp
+        if not args.corpus:
+            generate_corpus(corpus_dir, args.files, args.pages, args.seed)
+        file_paths = sorted(list_pdf_files(corpus_dir))
+
+        chunks = None
+        if "ingestion" in args.sections:
+            results["ingestion"], chunks = bench_ingestion(args, file_paths)
+            _print_rows("ingestion", results["ingestion"])
+        if "chunking" in args.sections:
+            results["chunking"] = bench_chunking(args, chunking_bench.load_pages(corpus_dir))
+            _print_rows("chunking", results["chunking"])
+
+    if "retrieval" in args.sections:
+        results["retrieval"] = bench_retrieval(args)
+        _print_rows("retrieval", results["retrieval"])
+    if "api" in args.sections:
+        results["api"] = bench_api(args, chunks or synthetic_chunks(args.pages * args.files * 3, args.seed))
+        _print_rows("api", results["api"])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="benchmark_results.json", help="result file (default: %(default)s)")
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    corpus = parser.add_argument_group("corpus")
+    corpus.add_argument("--corpus", help="use the PDFs in this folder instead of generating them")
+    corpus.add_argument("--files", type=int, default=4, help="generated PDFs (default: %(default)s)")
+    corpus.add_argument("--pages", type=int, default=20, help="pages per generated PDF (default: %(default)s)")
+    fakes = parser.add_argument_group("stand-ins")
+    fakes.add_argument("--weaviate-latency", type=float, default=0.02, help="seconds per fake Weaviate call")
+    fakes.add_argument("--gemini-latency", type=float, default=0.3, help="seconds per fake Gemini reply")
+    api = parser.add_argument_group("api")
+    api.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 32], help="concurrent clients")
+    api.add_argument("--requests", type=int, default=64, help="requests per level (default: %(default)s)")
+    ingestion = parser.add_argument_group("ingestion")
+    ingestion.add_argument("--batch-size", type=int, default=100, help="objects per batch (default: %(default)s)")
+    chunking = parser.add_argument_group("chunking")
+    chunking.add_argument("--max-tokens", type=int, default=300)
+    chunking.add_argument("--overlap", type=int, default=50)
+    chunking.add_argument("--top-k", type=int, default=5, help="chunks per prompt for prompt size")
+    chunking.add_argument("--repeat", type=int, default=3)
+    retrieval = parser.add_argument_group("retrieval")
+    retrieval.add_argument("--index-size", type=int, default=20000, help="chunks in the local index")
+    retrieval.add_argument("--top-ks", type=int, nargs="+", default=[3, 10, 50])
+    retrieval.add_argument("--queries", type=int, default=200, help="queries per mode and k")
+    args = parser.parse_args()
+
+    results = run_suite(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Synthetic PDF corpus for benchmarks: university-handbook-like pages with numbered
+headings, paragraphs and, on some pages, ruled tables that Camelot's lattice mode
+detects. The same seed always produces byte-identical files, so runs are comparable.
+
+Run from the Backend directory:
+    python -m benchmarks.synthetic_corpus --out /tmp/bench_corpus --files 4 --pages 25
+"""
+import argparse
+import os
+import random
+
+import fitz
+
+TOPICS = (
+    "hostel", "mess", "fee", "library", "attendance", "examination", "laboratory", "transport",
+    "scholarship", "placement", "club", "sports", "canteen", "medical", "admission", "semester",
+)
+WORDS = (
+    "students", "must", "submit", "the", "form", "before", "deadline", "office", "block", "timings",
+    "are", "from", "morning", "evening", "during", "weekdays", "and", "weekends", "rules", "apply",
+    "to", "all", "residents", "warden", "approval", "is", "required", "for", "late", "entry", "fine",
+    "will", "be", "charged", "per", "day", "registration", "portal", "opens", "in", "first", "week",
+    "of", "each", "academic", "year", "faculty", "advisor", "signs", "request", "minimum", "percent",
+    "classes", "eligible", "payment", "online", "receipt", "issued", "within", "working", "days",
+)
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+
+
+def _sentence(rng, topic):
+    words = rng.choices(WORDS, k=rng.randint(8, 18))
+    words.insert(rng.randrange(len(words)), topic)
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng, topic):
+    return " ".join(_sentence(rng, topic) for _ in range(rng.randint(3, 6)))
+
+
+def _draw_table(page, rng, top, topic, rows=5, cols=3):
+    """Draws a ruled table starting at y=top and returns its bottom edge."""
+    row_height = 20
+    col_width = (PAGE_WIDTH - 2 * MARGIN) / cols
+    bottom = top + rows * row_height
+    for r in range(rows + 1):
+        y = top + r * row_height
+        page.draw_line((MARGIN, y), (PAGE_WIDTH - MARGIN, y))
+    for c in range(cols + 1):
+        x = MARGIN + c * col_width
+        page.draw_line((x, top), (x, bottom))
+
+    header = [topic.capitalize(), "Timing", "Fee (INR)"][:cols]
+    for r in range(rows):
+        cells = header if r == 0 else [f"{topic} {r}", f"{rng.randint(6, 11)}:00 - {rng.randint(1, 9)}:00",
+                                       str(rng.randint(5, 90) * 100)][:cols]
+        for c, cell in enumerate(cells):
+            page.insert_text((MARGIN + c * col_width + 4, top + r * row_height + 14), cell, fontsize=9)
+    return bottom
+
+
+def write_pdf(path, pages, rng, table_every=4):
+    """Writes one PDF with the given number of pages; every table_every-th page gets a table."""
+    doc = fitz.open()
+    for page_number in range(1, pages + 1):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        topic = rng.choice(TOPICS)
+        top = MARGIN
+        for section in range(1, 3):
+            heading = f"{page_number}.{section} {topic.upper()} {rng.choice(('RULES', 'GUIDELINES', 'PROCEDURE'))}"
+            page.insert_text((MARGIN, top + 14), heading, fontsize=13)
+            top += 26
+            box = fitz.Rect(MARGIN, top, PAGE_WIDTH - MARGIN, top + 150)
+            page.insert_textbox(box, _paragraph(rng, topic), fontsize=10)
+            top += 160
+        if table_every and page_number % table_every == 0:
+            _draw_table(page, rng, top + 10, topic)
+    doc.set_metadata({"title": os.path.basename(path), "creationDate": "", "modDate": ""})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def generate_corpus(directory, files=4, pages=25, seed=0, table_every=4):
+    """Writes files PDFs of pages pages each into directory; returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"synthetic_{i:03d}.pdf")
+        write_pdf(path, pages, rng, table_every)
+        paths.append(path)
+    return paths
+
+
+def synthetic_chunks(count, seed=0):
+    """count chunk dicts shaped like ingestion output, without going through PDFs (for large indexes)."""
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(count):
+        topic = rng.choice(TOPICS)
+        chunks.append({
+            "text_chunk": _paragraph(rng, topic),
+            "source_file": f"synthetic_{i // 200:03d}.pdf",
+            "page_number": i % 200 + 1,
+            "chunk_type": "text",
+        })
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="directory to write the PDFs to")
+    parser.add_argument("--files", type=int, default=4, help="number of PDFs (default: %(default)s)")
+    parser.add_argument("--pages", type=int, default=25, help="pages per PDF (default: %(default)s)")
+    parser.add_argument("--table-every", type=int, default=4, help="put a table on every n-th page, 0 for none")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.out, args.files, args.pages, args.seed, args.table_every)
+    print(f"Wrote {len(paths)} PDF(s) with {args.pages} page(s) each to {args.out}")
+
+
+if __name__ == "__main__":
+    main()